@@ -0,0 +1,5 @@
+#!/usr/bin/env python3
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+"""benchmark_airconnect.py: Serves synthetic NMEA/FLARM batches (10 Hz GNSS) to one fast and one stalled AirConnect
+client (the latter never reads), once with the original per-item writes and once with the coalesced writes and
+backpressure of output_network_airconnect. Verifies that the fast client receives every sentence in order and compares
+CPU time, write calls and the data buffered for the stalled client. Afterwards, reports the data rate per profile.
+
+Run from repository root: python3 -m benchmarks.benchmark_airconnect"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import time
+
+from data_hub.data_hub_item import DataHubItem, SOURCE_TEST
+from output.output_network_airconnect import AirConnectServerClientProtocol, DEFAULT_PROFILE, create_profiles, encode_items
+from utils.flarm_sentence import encode_pflaa, encode_pflau
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class LegacyClientProtocol(asyncio.Protocol):
+    """
+    Original client handling: unbounded write buffer, one write call per sentence.
+    """
+
+    def __init__(self, clients):
+        self._clients = clients
+        self._transport = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._clients.add(self)
+
+    def connection_lost(self, exc):
+        self._clients.discard(self)
+
+    def send_data(self, data):
+        self._transport.write(data)
+
+    def get_buffered_bytes(self):
+        return self._transport.get_write_buffer_size()
+
+
+class CountingTransport(object):
+    """
+    Wraps a transport and counts write calls.
+    """
+
+    write_calls = 0
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
+
+    def write(self, data):
+        CountingTransport.write_calls += 1
+        self._transport.write(data)
+
+    def writelines(self, chunks):
+        CountingTransport.write_calls += 1
+        self._transport.writelines(chunks)
+
+
+def wrap_connection_made(protocol, peers):
+    connection_made = protocol.connection_made
+
+    def counting_connection_made(transport):
+        peers[transport.get_extra_info('peername')] = protocol
+        connection_made(CountingTransport(transport))
+
+    protocol.connection_made = counting_connection_made
+    return protocol
+
+
+def generate_batches(batch_count, targets):
+    batches = []
+    for i in range(batch_count):
+        # one GNSS epoch every 0.1 s, FLARM sentences with every epoch
+        timestamp = i * 0.1
+        items = [
+            DataHubItem('nmea', '$GNRMC,{:06d}.00,A,4807.038,N,01131.000,E,022.4,084.4,230394,003.1,W*6A'.format(i), timestamp=timestamp, source_id=SOURCE_TEST),
+            DataHubItem('nmea', '$GNVTG,084.4,T,,M,022.4,N,041.5,K,A*25', timestamp=timestamp, source_id=SOURCE_TEST),
+            DataHubItem('nmea', '$GNGGA,{:06d}.00,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47'.format(i), timestamp=timestamp, source_id=SOURCE_TEST),
+            DataHubItem('nmea', '$GPGSV,3,1,11,10,63,137,17,07,61,098,15,05,59,290,20,08,54,157,30*70', timestamp=timestamp, source_id=SOURCE_TEST),
+            DataHubItem('nmea', '$GNGLL,4807.038,N,01131.000,E,{:06d}.00,A,A*6C'.format(i), timestamp=timestamp, source_id=SOURCE_TEST)
+        ]
+        items.append(DataHubItem('flarm', encode_pflau(str(targets), '1', '2', '1', '0', '', '0', '', '', ''), timestamp=timestamp, source_id=SOURCE_TEST))
+        for target in range(targets):
+            items.append(DataHubItem('flarm', encode_pflaa('0', str(target * 10), str(i), '100', '2', '{:06X}'.format(target), '90', '', '50', '0', '8'), timestamp=timestamp, source_id=SOURCE_TEST))
+        batches.append(items)
+
+    return batches
+
+
+def send_legacy(clients, data_hub_items):
+    for data_hub_item in data_hub_items:
+        content_data = data_hub_item.get_content_data()
+        for client in clients:
+            if isinstance(content_data, bytes):
+                client.send_data(content_data)
+            else:
+                client.send_data(str.encode(content_data + '\r\n'))
+
+
+def send_coalesced(clients, data_hub_items):
+    encoded_items = encode_items(data_hub_items)
+
+    clients_by_profile = {}
+    for client in clients:
+        clients_by_profile.setdefault(client.get_profile(), []).append(client)
+
+    for profile, profile_clients in clients_by_profile.items():
+        chunks, non_traffic_chunks, traffic_count = profile.select(encoded_items)
+        for client in profile_clients:
+            client.send_data_chunks(chunks, non_traffic_chunks, traffic_count)
+
+
+@asyncio.coroutine
+def read_all(reader, received):
+    while True:
+        data = yield from reader.read(65536)
+        if not data:
+            break
+        received.append(data)
+
+
+def run(name, protocol_factory, send, batches, interval):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    clients = set()
+    peers = {}
+    server = loop.run_until_complete(loop.create_server(lambda: wrap_connection_made(protocol_factory(loop, clients), peers), host='127.0.0.1', port=0))
+    port = server.sockets[0].getsockname()[1]
+
+    # stalled client: small receive buffer, never reads
+    stalled_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    stalled_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    stalled_socket.connect(('127.0.0.1', port))
+
+    # fast client: reads everything
+    reader, writer = loop.run_until_complete(asyncio.open_connection('127.0.0.1', port))
+    received = []
+    read_task = loop.create_task(read_all(reader, received))
+
+    while len(clients) < 2:
+        loop.run_until_complete(asyncio.sleep(0.01))
+    stalled_client = peers[stalled_socket.getsockname()]
+
+    CountingTransport.write_calls = 0
+    cpu_time = 0.0
+    max_buffered = 0
+    for data_hub_items in batches:
+        start = time.process_time()
+        send(clients, data_hub_items)
+        cpu_time += time.process_time() - start
+
+        max_buffered = max(max_buffered, sum(client.get_buffered_bytes() for client in clients))
+        loop.run_until_complete(asyncio.sleep(interval))
+
+    stalled_connected = stalled_client in clients
+    stalled_buffered = stalled_client.get_buffered_bytes() if stalled_connected else 0
+
+    # let fast client receive remaining data
+    loop.run_until_complete(asyncio.sleep(0.2))
+    writer.close()
+    loop.run_until_complete(read_task)
+
+    stalled_socket.close()
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+
+    print('{:<12} CPU {:6.1f} us/batch, {:>7d} write calls, max buffered {:>9d} bytes, stalled client {}'.format(
+        name, cpu_time / len(batches) * 1e6, CountingTransport.write_calls, max_buffered,
+        'connected ({} bytes buffered)'.format(stalled_buffered) if stalled_connected else 'disconnected'))
+
+    return b''.join(received)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of AirConnect fan-out with a stalled client.')
+    arg_parser.add_argument('--batches', dest='batches', type=int, default=3000, help='number of batches')
+    arg_parser.add_argument('--targets', dest='targets', type=int, default=30, help='traffic sentences per batch')
+    arg_parser.add_argument('--interval', dest='interval', type=float, default=0.001, help='time in seconds between batches')
+    arg_parser.add_argument('--pause-timeout', dest='pause_timeout', type=float, default=1.0, help='time in seconds after which a stalled client is disconnected')
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    batches = generate_batches(args.batches, args.targets)
+    expected = b''.join(b''.join(chunk for is_traffic, sentence_type, timestamp, chunk in encode_items(data_hub_items)) for data_hub_items in batches)
+
+    legacy_received = run('original', lambda loop, clients: LegacyClientProtocol(clients), send_legacy, batches, args.interval)
+    profiles = create_profiles()
+    received = run('coalesced', lambda loop, clients: AirConnectServerClientProtocol(loop=loop, clients=clients, profiles=profiles, profile_name=DEFAULT_PROFILE, pause_timeout=args.pause_timeout), send_coalesced, batches, args.interval)
+
+    print('Fast client (original): {}'.format('OK' if legacy_received == expected else 'FAILED'))
+    print('Fast client (coalesced): {}'.format('OK (all {} bytes in order)'.format(len(expected)) if received == expected else 'FAILED ({} of {} bytes)'.format(len(received), len(expected))))
+    print()
+
+    # data rate per profile (batches are 0.1 s apart)
+    duration = len(batches) * 0.1
+    encoded_batches = [encode_items(data_hub_items) for data_hub_items in batches]
+    for name, profile in sorted(create_profiles().items()):
+        start = time.process_time()
+        selected = [profile.select(encoded_items) for encoded_items in encoded_batches]
+        cpu_time = time.process_time() - start
+
+        byte_count = sum(len(chunk) for chunks, non_traffic_chunks, traffic_count in selected for chunk in chunks)
+        nmea_count = sum(len(non_traffic_chunks) for chunks, non_traffic_chunks, traffic_count in selected)
+        print('Profile {:<15} {:>8.0f} bytes/s, {:>5.1f} NMEA sentences/s, select {:5.1f} us/batch ({})'.format(name, byte_count / duration, nmea_count / duration, cpu_time / len(batches) * 1e6, profile.get_description()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""benchmark_aircraft_store.py: Compares memory and per tick time of the original aircraft dictionary (plain
+AircraftInfo objects, sorted iteration, expiry check of every entry) with the AircraftStore at a given number of
+concurrent targets.
+
+Run from repository root: python3 -m benchmarks.benchmark_aircraft_store"""
+
+import argparse
+import time
+import tracemalloc
+
+from transformation.aircraft_store import AircraftStore
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+class LegacyAircraftInfo(object):
+    """
+    Original AircraftInfo (plain object with instance dict).
+    """
+
+    def __init__(self):
+        self.aircraft_type = '0'
+        self.signallevel = 0
+        self.identifier = None
+        self.callsign = None
+        self.latitude = None
+        self.longitude = None
+        self.altitude = None
+        self.h_speed = None
+        self.v_speed = None
+        self.course = None
+        self.last_seen = None
+        self.datatype = None
+
+
+def fill(aircraft):
+    aircraft.callsign = 'SWR123'
+    aircraft.latitude = 47.45
+    aircraft.longitude = 8.56
+    aircraft.altitude = 5000.0
+    aircraft.h_speed = 250.0
+    aircraft.v_speed = 0.0
+    aircraft.course = 90.0
+
+
+def legacy_update(aircraft, icao_id):
+    if icao_id not in aircraft.keys():
+        aircraft[icao_id] = LegacyAircraftInfo()
+        aircraft[icao_id].identifier = icao_id
+        aircraft[icao_id].datatype = 'A'
+
+    aircraft[icao_id].last_seen = time.time()
+
+    return aircraft[icao_id]
+
+
+def legacy_tick(aircraft):
+    # original iteration of data_processor (without message generation)
+    count = 0
+
+    for icao_id in sorted(aircraft.keys()):
+        current_aircraft = aircraft[icao_id]
+
+        age_in_seconds = time.time() - current_aircraft.last_seen
+        count += 1
+
+        if age_in_seconds > 30.0:
+            del aircraft[icao_id]
+
+    return count
+
+
+def store_tick(aircraft_store):
+    aircraft_store.expire()
+
+    count = 0
+    for current_aircraft in aircraft_store.snapshot():
+        count += 1
+
+    return count
+
+
+def measure_memory(create, targets):
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+
+    table = create(targets)
+
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in end.compare_to(start, 'filename'))
+
+    return table, size
+
+
+def create_legacy(targets):
+    aircraft = {}
+    for i in range(targets):
+        fill(legacy_update(aircraft, '{:06X}'.format(i)))
+
+    return aircraft
+
+
+def create_store(targets):
+    aircraft_store = AircraftStore()
+    for i in range(targets):
+        fill(aircraft_store.update('{:06X}'.format(i), 'A'))
+
+    return aircraft_store
+
+
+def measure_time(name, function, repetitions):
+    start = time.perf_counter()
+    for i in range(repetitions):
+        function()
+    duration = (time.perf_counter() - start) / repetitions
+
+    print('{:<40} {:>10.2f} us'.format(name, duration * 1e6))
+
+    return duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of aircraft state table.')
+    arg_parser.add_argument('--targets', dest='targets', type=int, default=500, help='number of concurrent targets')
+    arg_parser.add_argument('--repetitions', dest='repetitions', type=int, default=1000, help='number of ticks')
+    args = arg_parser.parse_args()
+
+    # memory (all attributes set)
+    legacy_aircraft, legacy_size = measure_memory(create_legacy, args.targets)
+    aircraft_store, store_size = measure_memory(create_store, args.targets)
+
+    print('{} targets'.format(args.targets))
+    print('{:<40} {:>10d} bytes ({:.0f} bytes/target)'.format('memory original dict', legacy_size, legacy_size / args.targets))
+    print('{:<40} {:>10d} bytes ({:.0f} bytes/target)'.format('memory AircraftStore', store_size, store_size / args.targets))
+    print()
+
+    # tick time (no aircraft expires)
+    legacy_duration = measure_time('tick original dict', lambda: legacy_tick(legacy_aircraft), args.repetitions)
+    store_duration = measure_time('tick AircraftStore', lambda: store_tick(aircraft_store), args.repetitions)
+    print('Speed-up: {:.1f}x'.format(legacy_duration / store_duration))
+    print()
+
+    # update time (one message per target)
+    identifiers = ['{:06X}'.format(i) for i in range(args.targets)]
+    measure_time('update all targets original dict', lambda: [legacy_update(legacy_aircraft, icao_id) for icao_id in identifiers], args.repetitions // 10)
+    measure_time('update all targets AircraftStore', lambda: [aircraft_store.update(icao_id, 'A') for icao_id in identifiers], args.repetitions // 10)
+    print()
+
+    # expiry of all targets at once
+    assert aircraft_store.expire(time.monotonic() + 60.0) == args.targets
+    assert len(aircraft_store) == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+"""benchmark_baro_altitude.py: Drives the BaroAltitudeProvider with the FakeBaroSensor (no smbus required) and verifies
+that the median and EMA filter rejects outliers of a noisy sensor, that the sample rate is kept with a slow sensor
+(slower sensors are sampled back to back, without bursts afterwards) while readers do not block, and that
+get_altitude() returns None once the latest sample is older than max_age (sensor fails or provider is stopped).
+
+Run from repository root: python3 -m benchmarks.benchmark_baro_altitude [--samples 2000] [--duration 2]"""
+
+import argparse
+import logging
+import time
+
+from utils.baro_altitude import BaroAltitudeProvider, FakeBaroSensor
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+class CountingSensor(object):
+    """
+    Wraps a sensor, counts reads and fails all reads while failing is set.
+    """
+
+    def __init__(self, sensor):
+        self._sensor = sensor
+        self.reads = 0
+        self.failing = False
+
+    def read_altitude(self):
+        self.reads += 1
+
+        if self.failing:
+            raise OSError('sensor not responding')
+
+        return self._sensor.read_altitude()
+
+
+def verify_filter(sample_count, noise, outlier_probability, outlier_offset, seed):
+    """
+    :return: Tuple of number of outliers, maximum error of raw samples and of filtered altitude (after the median
+    window has been filled) in meters
+    """
+
+    altitude = 500.0
+    sensor = FakeBaroSensor(altitude=altitude, noise=noise, outlier_probability=outlier_probability, outlier_offset=outlier_offset, seed=seed)
+
+    # samples of reference sensor (same seed) to find raw errors
+    reference_sensor = FakeBaroSensor(altitude=altitude, noise=noise, outlier_probability=outlier_probability, outlier_offset=outlier_offset, seed=seed)
+
+    # sampled synchronously (no thread) for reproducible results
+    baro_altitude_provider = BaroAltitudeProvider(sensor, window=5)
+
+    outlier_count = 0
+    raw_error = 0.0
+    filtered_error = 0.0
+    for index in range(sample_count):
+        raw_sample = reference_sensor.read_altitude()
+        if abs(raw_sample - altitude) > outlier_offset / 2.0:
+            outlier_count += 1
+        raw_error = max(raw_error, abs(raw_sample - altitude))
+
+        baro_altitude_provider.sample()
+        if index >= 5:
+            filtered_error = max(filtered_error, abs(baro_altitude_provider.get_altitude() - altitude))
+
+    return outlier_count, raw_error, filtered_error
+
+
+def measure_rate(sample_rate, read_duration, duration):
+    """
+    :return: Tuple of samples per second and maximum duration of get_altitude() calls in seconds
+    """
+
+    sensor = CountingSensor(FakeBaroSensor(read_duration=read_duration))
+    baro_altitude_provider = BaroAltitudeProvider(sensor, sample_rate=sample_rate)
+
+    # read altitude like processing cycles while sensor is sampled
+    read_duration_max = 0.0
+    baro_altitude_provider.start()
+    start_time = time.monotonic()
+    while time.monotonic() - start_time < duration:
+        call_time = time.perf_counter()
+        baro_altitude_provider.get_altitude()
+        read_duration_max = max(read_duration_max, time.perf_counter() - call_time)
+
+        time.sleep(0.01)
+
+    # first sample is taken at start
+    reads = sensor.reads - 1
+    elapsed = time.monotonic() - start_time
+    baro_altitude_provider.stop()
+
+    return reads / elapsed, read_duration_max
+
+
+def verify_max_age(max_age, sample_rate):
+    """
+    :return: Dictionary of check to result (True if altitude is available or unavailable as expected)
+    """
+
+    sensor = CountingSensor(FakeBaroSensor())
+    baro_altitude_provider = BaroAltitudeProvider(sensor, sample_rate=sample_rate, max_age=max_age)
+
+    results = {'none_before_first_sample': baro_altitude_provider.get_altitude() is None}
+
+    baro_altitude_provider.start()
+    time.sleep(2.0 / sample_rate)
+    results['available_while_sampling'] = baro_altitude_provider.get_altitude() is not None
+
+    # sensor fails: last altitude is kept until it is older than max_age
+    sensor.failing = True
+    time.sleep(max_age / 2.0)
+    results['kept_within_max_age'] = baro_altitude_provider.get_altitude() is not None
+    time.sleep(max_age)
+    results['none_after_max_age_sensor_failing'] = baro_altitude_provider.get_altitude() is None and baro_altitude_provider.get()[0] is not None
+
+    # sensor recovers
+    sensor.failing = False
+    time.sleep(2.0 / sample_rate)
+    results['available_after_recovery'] = baro_altitude_provider.get_altitude() is not None
+
+    # provider stopped
+    baro_altitude_provider.stop()
+    time.sleep(max_age * 1.5)
+    results['none_after_max_age_stopped'] = baro_altitude_provider.get_altitude() is None
+
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of the barometric altitude provider.')
+    arg_parser.add_argument('--samples', dest='samples', type=int, default=2000, help='samples of filter verification')
+    arg_parser.add_argument('--noise', dest='noise', type=float, default=2.0, help='standard deviation of sensor noise in meters')
+    arg_parser.add_argument('--outlier-probability', dest='outlier_probability', type=float, default=0.02, help='probability of a sample being an outlier')
+    arg_parser.add_argument('--outlier-offset', dest='outlier_offset', type=float, default=300.0, help='offset of outliers in meters')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=1, help='seed of sensor noise')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=2.0, help='seconds of sampling per rate measurement')
+    args = arg_parser.parse_args()
+
+    # failing sensor is expected below
+    logging.getLogger('BaroAltitudeProvider').setLevel(logging.ERROR)
+
+    # filter: single outliers have to be removed by the median, remaining error is in the order of the noise
+    outlier_count, raw_error, filtered_error = verify_filter(args.samples, args.noise, args.outlier_probability, args.outlier_offset, args.seed)
+    ok = filtered_error <= 3.0 * args.noise
+    print('Filter: {:d} samples with {:d} outliers, maximum error raw {:.1f} m, filtered {:.1f} m, {}'.format(args.samples, outlier_count, raw_error, filtered_error, 'OK' if ok else 'FAILED'))
+
+    # rate: sensor faster or slower than sample rate (slow sensor is sampled back to back)
+    for sample_rate, read_duration in ((10.0, 0.0), (10.0, 0.05), (10.0, 0.15)):
+        rate, read_duration_max = measure_rate(sample_rate, read_duration, args.duration)
+        expected_rate = min(sample_rate, 1.0 / read_duration) if read_duration > 0.0 else sample_rate
+        ok = abs(rate - expected_rate) <= 0.15 * expected_rate and read_duration_max < 0.001
+        print('Rate: {:.0f} samples/s configured, sensor read {:.0f} ms: {:.1f} samples/s (expected {:.1f}), get_altitude() max {:.3f} ms, {}'.format(
+            sample_rate, read_duration * 1e3, rate, expected_rate, read_duration_max * 1e3, 'OK' if ok else 'FAILED'))
+
+    # maximum age
+    results = verify_max_age(0.5, 10.0)
+    print('Max age: ' + ', '.join('{} {}'.format(check, 'OK' if result else 'FAILED') for check, result in sorted(results.items())))
+
+
+if __name__ == "__main__":
+    main()
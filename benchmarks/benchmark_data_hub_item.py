@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""benchmark_data_hub_item.py: Compares size and (de-)serialization speed of the original DataHubItem with the
+slotted DataHubItem (pickle and compact byte encoding).
+
+Run from repository root: python3 -m benchmarks.benchmark_data_hub_item"""
+
+import pickle
+import time
+
+from data_hub.data_hub_batch import DataHubBatch
+from data_hub.data_hub_item import DataHubItem, SOURCE_INPUT_SBS1
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+SBS1_MESSAGE = 'MSG,3,111,11111,4B1805,111111,2017/06/25,12:34:56.789,2017/06/25,12:34:56.789,,6525,,,47.45631,8.55513,,,0,,0,0'
+ITERATIONS = 100000
+BATCH_SIZE = 64
+
+
+def sbs1_message():
+    # create new string object for every item (pickle would otherwise reference identical strings only once)
+    return SBS1_MESSAGE[:-1] + SBS1_MESSAGE[-1]
+
+
+class LegacyDataHubItem(object):
+    """
+    Original DataHubItem (plain object with instance dict).
+    """
+
+    def __init__(self, content_type, content_data):
+        self.__content_type = content_type
+        self.__content_data = content_data
+
+    def get_content_type(self):
+        return self.__content_type
+
+    def get_content_data(self):
+        return self.__content_data
+
+
+def measure(name, create, encode, decode):
+    item = create()
+    encoded_size = len(encode(item))
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        decode(encode(create()))
+    duration = time.perf_counter() - start
+
+    print('{:<40} {:>8d} bytes/item {:>12.0f} items/s'.format(name, encoded_size, ITERATIONS / duration))
+
+
+def measure_batch(name, create, wrap):
+    batch = wrap([create() for i in range(BATCH_SIZE)])
+    encoded_size = len(pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL))
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS // BATCH_SIZE):
+        pickle.loads(pickle.dumps(wrap([create() for j in range(BATCH_SIZE)]), protocol=pickle.HIGHEST_PROTOCOL))
+    duration = time.perf_counter() - start
+
+    print('{:<40} {:>8.1f} bytes/item {:>12.0f} items/s'.format(name, encoded_size / BATCH_SIZE, (ITERATIONS // BATCH_SIZE) * BATCH_SIZE / duration))
+
+
+def main():
+    print('Payload: {} bytes (SBS1 MSG,3)'.format(len(SBS1_MESSAGE)))
+    print()
+
+    measure('legacy item, pickle',
+            lambda: LegacyDataHubItem('sbs1', sbs1_message()),
+            lambda item: pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL),
+            pickle.loads)
+    measure('slotted item, pickle (__reduce__)',
+            lambda: DataHubItem('sbs1', sbs1_message(), source_id=SOURCE_INPUT_SBS1),
+            lambda item: pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL),
+            pickle.loads)
+    measure('slotted item, to_bytes/from_bytes',
+            lambda: DataHubItem('sbs1', sbs1_message(), source_id=SOURCE_INPUT_SBS1),
+            lambda item: item.to_bytes(),
+            DataHubItem.from_bytes)
+
+    print()
+
+    measure_batch('legacy items, pickled frame of {}'.format(BATCH_SIZE),
+                  lambda: LegacyDataHubItem('sbs1', sbs1_message()),
+                  DataHubBatch)
+    measure_batch('slotted items, pickled frame of {}'.format(BATCH_SIZE),
+                  lambda: DataHubItem('sbs1', sbs1_message(), source_id=SOURCE_INPUT_SBS1),
+                  DataHubBatch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+"""benchmark_flarm_scheduler.py: Simulates traffic around a stationary own position (ADS-B position updates every
+0.5 s, straight flight) and compares the original fixed one second sweep over all targets with the FlarmScheduler.
+Reports emitted target reports per second and latency percentiles between reception of an update that crosses an
+alarm threshold and its emission.
+
+Run from repository root: python3 -m benchmarks.benchmark_flarm_scheduler"""
+
+import argparse
+import bisect
+import math
+import random
+
+from transformation.flarm_scheduler import FlarmScheduler, percentile
+from utils.traffic_geometry import RelativePosition
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+FLARM_RANGE_M = 45000.0
+
+# horizontal alarm thresholds of generate_flarm_messages (same altitude assumed)
+ALARM_DISTANCES = ((1852.0, '3'), (5100.0, '2'), (9700.0, '1'))
+
+
+def alarm_level(distance):
+    for alarm_distance, level in ALARM_DISTANCES:
+        if distance <= alarm_distance:
+            return level
+
+    return '0'
+
+
+def generate_updates(targets, duration, update_interval, seed):
+    # per target list of (receive time, RelativePosition) tuples, a quarter of the targets flies towards own position
+    rng = random.Random(seed)
+    updates = []
+
+    for i in range(targets):
+        distance = FLARM_RANGE_M * math.sqrt(rng.random())
+        bearing = rng.uniform(0.0, 2.0 * math.pi)
+        x, y = distance * math.sin(bearing), distance * math.cos(bearing)
+
+        speed = rng.uniform(30.0, 250.0)
+        if i % 4 == 0:
+            course = bearing + math.pi + rng.uniform(-0.2, 0.2)
+        else:
+            course = rng.uniform(0.0, 2.0 * math.pi)
+        vx, vy = speed * math.sin(course), speed * math.cos(course)
+
+        target_updates = []
+        t = rng.uniform(0.0, update_interval)
+        while t < duration:
+            receive_time = t + rng.uniform(0.0, 0.05)
+            north, east = y + vy * t, x + vx * t
+            target_updates.append((receive_time, RelativePosition(north, east, 0.0, math.hypot(north, east), None)))
+            t += update_interval
+
+        updates.append(target_updates)
+
+    return updates
+
+
+def crossings(target_updates):
+    # receive times of updates that change the alarm level
+    result = []
+    previous_level = '0'
+
+    for receive_time, relative_position in target_updates:
+        level = alarm_level(relative_position.distance)
+        if level != previous_level:
+            result.append(receive_time)
+        previous_level = level
+
+    return result
+
+
+def simulate(updates, duration, tick_interval, decide):
+    # emissions per target: sorted list of (emission time, receive time of emitted data)
+    emissions = [[] for target_updates in updates]
+    positions = [0] * len(updates)
+
+    ticks = int(duration / tick_interval)
+    for tick in range(1, ticks + 1):
+        now = tick * tick_interval
+
+        for index, target_updates in enumerate(updates):
+            # newest update received before processing cycle
+            position = positions[index]
+            while position < len(target_updates) and target_updates[position][0] <= now:
+                position += 1
+            positions[index] = position
+
+            if position == 0:
+                continue
+
+            last_seen, relative_position = target_updates[position - 1]
+            if decide(index, last_seen, relative_position, now):
+                emissions[index].append((now, last_seen))
+
+    return emissions
+
+
+def crossing_latencies(updates, emissions):
+    latencies = []
+
+    for target_updates, target_emissions in zip(updates, emissions):
+        emission_times = [emission_time for emission_time, last_seen in target_emissions]
+        for receive_time in crossings(target_updates):
+            # first emission of data that includes crossing update
+            position = bisect.bisect_left(emission_times, receive_time)
+            while position < len(target_emissions) and target_emissions[position][1] < receive_time:
+                position += 1
+            if position < len(target_emissions):
+                latencies.append(target_emissions[position][0] - receive_time)
+
+    return sorted(latencies)
+
+
+def report(name, updates, emissions, duration):
+    latencies = crossing_latencies(updates, emissions)
+    count = sum(len(target_emissions) for target_emissions in emissions)
+
+    print('{:<20} {:>8.1f} reports/s, {} alarm level changes, latency p50/p90/p99/max: {}'.format(
+        name, count / duration, len(latencies), '/'.join('{:.3f}'.format(percentile(latencies, fraction)) for fraction in (0.5, 0.9, 0.99, 1.0))))
+
+    return count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Simulation of FLARM target emission.')
+    arg_parser.add_argument('--targets', dest='targets', type=int, default=200, help='number of concurrent targets')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=600.0, help='simulated time in seconds')
+    arg_parser.add_argument('--tick-interval', dest='tick_interval', type=float, default=0.2, help='processing cycle of scheduler in seconds')
+    args = arg_parser.parse_args()
+
+    updates = generate_updates(args.targets, args.duration, 0.5, 1)
+
+    # original: every target in every one second sweep
+    legacy_count = report('fixed 1 s sweep', updates, simulate(updates, args.duration, 1.0, lambda index, last_seen, relative_position, now: True), args.duration)
+
+    # scheduler: alarm level of due targets (as derived from generated messages)
+    flarm_scheduler = FlarmScheduler(tick_interval=args.tick_interval)
+    generated = [0]
+
+    def decide(index, last_seen, relative_position, now):
+        if not flarm_scheduler.is_due(index, last_seen, relative_position, now):
+            return False
+        generated[0] += 1
+        return flarm_scheduler.decide(index, last_seen, relative_position, alarm_level(relative_position.distance), now)
+
+    scheduler_count = report('FlarmScheduler', updates, simulate(updates, args.duration, args.tick_interval, decide), args.duration)
+
+    statistics = flarm_scheduler.get_statistics()
+    print('Reports: {:.0f}% of original, messages generated for {:.1f} targets/s, data latency p50/p90/p99/max: {}'.format(100.0 * scheduler_count / legacy_count, generated[0] / args.duration, '/'.join('{:.3f}'.format(latency) for latency in statistics['latency'])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""benchmark_flarm_sentence.py: Compares FLARM sentence generation with pynmea2.ProprietarySentence (original
+implementation, rendered and encoded for sending) with utils.flarm_sentence. Verifies that the output is byte-identical
+for randomly generated PFLAA and PFLAU field values before measuring sentences per second.
+
+Requires pynmea2 for the reference implementation. Run from repository root: python3 -m benchmarks.benchmark_flarm_sentence"""
+
+import argparse
+import random
+import time
+
+import pynmea2
+
+import utils.flarm_sentence
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+def generate_pflaa_fields(rng):
+    # field values as formatted by generate_flarm_messages (including empty fields)
+    identifier = '{:06X}'.format(rng.randrange(1 << 24))
+    if rng.random() < 0.5:
+        identifier += '!' + rng.choice(['SWR123', 'Mode-F', 'HBABC', 'Mode-C'])
+
+    return (
+        rng.choice(['0', '1', '2', '3']),
+        '{:.0f}'.format(rng.uniform(-45000, 45000)),
+        rng.choice(['', '{:.0f}'.format(rng.uniform(-45000, 45000))]),
+        rng.choice(['0', '{:.0f}'.format(rng.uniform(-3000, 3000))]),
+        rng.choice(['1', '2']),
+        identifier,
+        rng.choice(['', '{:.0f}'.format(rng.uniform(0, 359))]),
+        '',
+        rng.choice(['', '{:.0f}'.format(rng.uniform(0, 300))]),
+        rng.choice(['', '{:.1f}'.format(rng.uniform(-32.7, 32.7))]),
+        rng.choice(['0', '1', '3', '8', '9', 'B']),
+    )
+
+
+def generate_pflau_fields(rng):
+    return (
+        '1', '0', '2', '1',
+        rng.choice(['0', '1', '2', '3']),
+        rng.choice(['', '{:.0f}'.format(rng.uniform(-180, 180))]),
+        rng.choice(['0', '2']),
+        '{:.0f}'.format(rng.uniform(-3000, 3000)),
+        rng.choice(['', '{:.0f}'.format(rng.uniform(0, 45000))]),
+        rng.choice(['', '{:06X}'.format(rng.randrange(1 << 24))]),
+    )
+
+
+def legacy_pflaa(fields):
+    # original: generic sentence, converted to string, line terminator added and encoded by output module
+    return str.encode(str(pynmea2.ProprietarySentence('F', ['LAA'] + list(fields))) + '\r\n')
+
+
+def legacy_pflau(fields):
+    return str.encode(str(pynmea2.ProprietarySentence('F', ['LAU'] + list(fields))) + '\r\n')
+
+
+def measure(name, function, field_sets):
+    start = time.perf_counter()
+    for fields in field_sets:
+        function(*fields)
+    duration = time.perf_counter() - start
+
+    print('{:<30} {:>10.0f} sentences/s'.format(name, len(field_sets) / duration))
+
+    return duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Golden test and benchmark of FLARM sentence encoding.')
+    arg_parser.add_argument('--sentences', dest='sentences', type=int, default=100000, help='number of sentences per type')
+    args = arg_parser.parse_args()
+
+    rng = random.Random(1)
+    pflaa_field_sets = [generate_pflaa_fields(rng) for i in range(args.sentences)]
+    pflau_field_sets = [generate_pflau_fields(rng) for i in range(args.sentences)]
+
+    # golden test: byte-identical output
+    mismatches = 0
+    for fields in pflaa_field_sets:
+        if utils.flarm_sentence.encode_pflaa(*fields) != legacy_pflaa(fields):
+            mismatches += 1
+    for fields in pflau_field_sets:
+        if utils.flarm_sentence.encode_pflau(*fields) != legacy_pflau(fields):
+            mismatches += 1
+
+    print('{} sentences: {}'.format(2 * args.sentences, 'OK (byte-identical to pynmea2)' if mismatches == 0 else 'FAILED ({} differ)'.format(mismatches)))
+    print()
+
+    legacy_duration = measure('PFLAA pynmea2', lambda *fields: legacy_pflaa(fields), pflaa_field_sets)
+    encoder_duration = measure('PFLAA flarm_sentence', utils.flarm_sentence.encode_pflaa, pflaa_field_sets)
+    print('Speed-up: {:.1f}x'.format(legacy_duration / encoder_duration))
+    print()
+
+    legacy_duration = measure('PFLAU pynmea2', lambda *fields: legacy_pflau(fields), pflau_field_sets)
+    encoder_duration = measure('PFLAU flarm_sentence', utils.flarm_sentence.encode_pflau, pflau_field_sets)
+    print('Speed-up: {:.1f}x'.format(legacy_duration / encoder_duration))
+
+
+if __name__ == "__main__":
+    main()
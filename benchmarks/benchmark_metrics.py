@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+"""benchmark_metrics.py: Cost of metric updates (enabled and disabled, compared with incrementing a local attribute),
+verification that counters and timers updated concurrently by several processes are summed up exactly, and a scrape of
+the /metrics endpoint of the metrics output module, verified against the collected values.
+
+Run from repository root: python3 -m benchmarks.benchmark_metrics [--processes 4] [--updates 1000000]"""
+
+import argparse
+from multiprocessing import Event, Process, Queue
+import socket
+import time
+import urllib.error
+import urllib.request
+
+from output.output_metrics_http import OutputMetricsHttp
+from utils.metrics import NULL_METRICS, MetricsRegistry, format_value
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class LocalCounter(object):
+    """
+    Reference: counter as attribute of a local object.
+    """
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+def measure(function, count):
+    # time per call in nanoseconds
+    start_time = time.perf_counter()
+    function(count)
+    return (time.perf_counter() - start_time) * 1e9 / count
+
+
+def measure_updates(count):
+    metrics = MetricsRegistry()
+
+    local_counter = LocalCounter()
+    counter = metrics.counter('flightbox_messages_in_total', process='Benchmark')
+    gauge = metrics.gauge('flightbox_clients', process='Benchmark')
+    timer = metrics.timer('flightbox_tick_duration_seconds', process='Benchmark')
+    null_counter = NULL_METRICS.counter('flightbox_messages_in_total', process='Benchmark')
+    null_timer = NULL_METRICS.timer('flightbox_tick_duration_seconds', process='Benchmark')
+
+    def loop_local(count):
+        for i in range(count):
+            local_counter.inc()
+
+    def loop_counter(count):
+        for i in range(count):
+            counter.inc()
+
+    def loop_gauge(count):
+        for i in range(count):
+            gauge.set(i)
+
+    def loop_timer(count):
+        for i in range(count):
+            timer.observe(0.001)
+
+    def loop_null_counter(count):
+        for i in range(count):
+            null_counter.inc()
+
+    def loop_null_timer(count):
+        for i in range(count):
+            null_timer.observe(0.001)
+
+    def loop_empty(count):
+        for i in range(count):
+            pass
+
+    results = dict([(name, measure(function, count)) for name, function in (('loop', loop_empty), ('local attribute', loop_local), ('counter', loop_counter), ('gauge', loop_gauge), ('timer', loop_timer), ('disabled counter', loop_null_counter), ('disabled timer', loop_null_timer))])
+
+    ok = counter.get() == count and timer.get()[0] == count
+
+    metrics.close()
+    metrics.unlink()
+
+    return results, ok
+
+
+def update(metrics, index, count, start_event):
+    # shared series (same name and labels in all processes) and series of this process
+    shared_counter = metrics.counter('flightbox_messages_in_total', process='Benchmark')
+    own_counter = metrics.counter('flightbox_messages_out_total', process='Benchmark{:d}'.format(index))
+    timer = metrics.timer('flightbox_tick_duration_seconds', process='Benchmark')
+
+    start_event.wait()
+    for i in range(count):
+        shared_counter.inc()
+        own_counter.inc(2)
+        timer.observe(0.5)
+
+
+def verify_aggregation(process_count, count):
+    metrics = MetricsRegistry()
+    start_event = Event()
+
+    processes = [Process(target=update, args=(metrics, index, count, start_event)) for index in range(process_count)]
+    for process in processes:
+        process.start()
+
+    start_time = time.monotonic()
+    start_event.set()
+    for process in processes:
+        process.join()
+    duration = time.monotonic() - start_time
+
+    collected = metrics.collect()
+    ok = collected['flightbox_messages_in_total']['process="Benchmark"'] == [process_count * count, 0.0]
+    ok = ok and collected['flightbox_tick_duration_seconds']['process="Benchmark"'] == [process_count * count, process_count * count * 0.5]
+    ok = ok and all(collected['flightbox_messages_out_total']['process="Benchmark{:d}"'.format(index)][0] == 2 * count for index in range(process_count))
+
+    return metrics, ok, process_count * count * 3 / duration
+
+
+def get_free_port():
+    with socket.socket() as free_socket:
+        free_socket.bind(('127.0.0.1', 0))
+        return free_socket.getsockname()[1]
+
+
+def parse_exposition(text):
+    # samples of Prometheus text format (name with labels -> value)
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = value
+
+    return samples
+
+
+def scrape(metrics):
+    port = get_free_port()
+
+    data_input_queue = Queue()
+    queue = Queue()
+    queue.put('item')
+
+    output_metrics_http = OutputMetricsHttp(metrics, port=port, queues={'Benchmark': queue})
+    output_metrics_http.set_data_input_queue(data_input_queue)
+    output_metrics_http.start()
+
+    try:
+        # wait for server
+        text = None
+        for attempt in range(50):
+            try:
+                start_time = time.perf_counter()
+                text = urllib.request.urlopen('http://127.0.0.1:{:d}/metrics'.format(port), timeout=5.0).read().decode('utf-8')
+                duration = time.perf_counter() - start_time
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        try:
+            urllib.request.urlopen('http://127.0.0.1:{:d}/other'.format(port), timeout=5.0)
+            not_found = False
+        except urllib.error.HTTPError as e:
+            not_found = e.code == 404
+
+    finally:
+        data_input_queue.put(None)
+        output_metrics_http.join()
+
+    # all collected series and the sampled queue depth have to be exported
+    samples = parse_exposition(text)
+    ok = not_found and samples.get('flightbox_queue_depth{queue="Benchmark"}') == '1'
+    for name, series in metrics.collect().items():
+        for label_string, values in series.items():
+            if name == 'flightbox_tick_duration_seconds':
+                ok = ok and samples.get('{}_count{{{}}}'.format(name, label_string)) == format_value(values[0])
+                ok = ok and samples.get('{}_sum{{{}}}'.format(name, label_string)) == format_value(values[1])
+            else:
+                ok = ok and samples.get('{}{{{}}}'.format(name, label_string)) == format_value(values[0])
+
+    return text, ok, duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of runtime metrics.')
+    arg_parser.add_argument('--processes', dest='processes', type=int, default=4, help='number of concurrently updating processes')
+    arg_parser.add_argument('--updates', dest='updates', type=int, default=1000000, help='updates per measurement and process')
+    arg_parser.add_argument('--show', dest='show', action='store_true', help='print scraped metrics')
+    args = arg_parser.parse_args()
+
+    results, ok = measure_updates(args.updates)
+    print('Update cost (ns per call including loop): ' + ', '.join('{} {:.0f}'.format(name, value) for name, value in sorted(results.items(), key=lambda item: item[1])) + ', values {}'.format('OK' if ok else 'FAILED'))
+
+    metrics, ok, rate = verify_aggregation(args.processes, args.updates // 10)
+    print('{:d} processes: {:.1f} M updates/s, sums {}'.format(args.processes, rate / 1e6, 'OK' if ok else 'FAILED'))
+
+    try:
+        text, ok, duration = scrape(metrics)
+        print('Scrape of /metrics: {:d} bytes in {:.1f} ms, exported values {}'.format(len(text), duration * 1e3, 'OK' if ok else 'FAILED'))
+        if args.show:
+            print(text)
+    finally:
+        metrics.close()
+        metrics.unlink()
+
+
+if __name__ == "__main__":
+    main()
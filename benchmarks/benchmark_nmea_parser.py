@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""benchmark_nmea_parser.py: Parses a recorded NMEA log (u-blox 8 style, talker GN, 10 Hz) with pynmea2 and with
+utils.nmea_parser. Verifies that both accept the same GGA/GLL/VTG/RMC sentences (checksum) and yield the same own-ship
+values, and compares throughput.
+
+Requires pynmea2 for the reference implementation. Run from repository root: python3 -m benchmarks.benchmark_nmea_parser [log]"""
+
+import argparse
+import os
+import time
+
+import pynmea2
+
+import utils.conversion
+import utils.nmea_parser
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gnss_nmea.txt')
+TOLERANCE = 1e-9
+
+
+def pynmea2_coordinate(value, direction, negative_direction):
+    if not value:
+        return None
+
+    degrees = utils.conversion.nmea_coord_to_degrees(float(value))
+    if direction == negative_direction:
+        degrees = -degrees
+
+    return degrees
+
+
+def pynmea2_number(value):
+    if not value:
+        return None
+
+    return float(value)
+
+
+def parse_pynmea2(sentence):
+    # reference: pynmea2 with checksum check, converted to tuples of utils.nmea_parser
+    sentence_type = utils.nmea_parser.get_sentence_type(sentence)
+    if sentence_type not in utils.nmea_parser.SENTENCE_TYPES:
+        return None
+
+    message = pynmea2.parse(sentence, check=True)
+
+    if sentence_type == 'GGA':
+        if not message.gps_qual:
+            return ('GGA', None, None, None)
+        altitude = pynmea2_number(message.altitude) if message.altitude_units == 'M' else None
+        return ('GGA', pynmea2_coordinate(message.lat, message.lat_dir, 'S'), pynmea2_coordinate(message.lon, message.lon_dir, 'W'), altitude)
+    elif sentence_type == 'GLL':
+        if message.status != 'A':
+            return ('GLL', None, None)
+        return ('GLL', pynmea2_coordinate(message.lat, message.lat_dir, 'S'), pynmea2_coordinate(message.lon, message.lon_dir, 'W'))
+    elif sentence_type == 'VTG':
+        return ('VTG', pynmea2_number(message.true_track), pynmea2_number(message.spd_over_grnd_kts))
+    elif sentence_type == 'RMC':
+        if message.status != 'A':
+            return ('RMC', None, None, None, None)
+        return ('RMC', pynmea2_coordinate(message.lat, message.lat_dir, 'S'), pynmea2_coordinate(message.lon, message.lon_dir, 'W'), pynmea2_number(message.true_course), pynmea2_number(message.spd_over_grnd))
+
+
+def parse_all(parse, sentences):
+    records = []
+    for sentence in sentences:
+        try:
+            records.append(parse(sentence))
+        except (ValueError, pynmea2.ParseError):
+            records.append('invalid')
+
+    return records
+
+
+def equal(record, reference):
+    if record == reference:
+        return True
+    if not isinstance(record, tuple) or not isinstance(reference, tuple) or len(record) != len(reference) or record[0] != reference[0]:
+        return False
+
+    for value, reference_value in zip(record[1:], reference[1:]):
+        if (value is None) != (reference_value is None):
+            return False
+        if value is not None and abs(value - reference_value) > TOLERANCE:
+            return False
+
+    return True
+
+
+def measure(name, parse, sentences, repetitions):
+    start = time.perf_counter()
+    for i in range(repetitions):
+        parse_all(parse, sentences)
+    duration = (time.perf_counter() - start) / repetitions
+
+    print('{:<30} {:>10.0f} sentences/s'.format(name, len(sentences) / duration))
+
+    return duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Verification and benchmark of own-ship NMEA parsing.')
+    arg_parser.add_argument('log', nargs='?', default=DEFAULT_LOG, help='recorded NMEA log')
+    arg_parser.add_argument('--repetitions', dest='repetitions', type=int, default=5, help='number of parser runs')
+    args = arg_parser.parse_args()
+
+    with open(args.log) as log_file:
+        sentences = [line.strip() for line in log_file if line.strip()]
+
+    records = parse_all(utils.nmea_parser.parse_nmea_sentence, sentences)
+    references = parse_all(parse_pynmea2, sentences)
+
+    mismatches = sum(1 for record, reference in zip(records, references) if not equal(record, reference))
+    used = sum(1 for record in records if isinstance(record, tuple))
+    invalid = sum(1 for record in records if record == 'invalid')
+    legacy_used = sum(1 for sentence in sentences if sentence.startswith(('$GPGGA', '$GPGLL', '$GPVTG')))
+
+    print('{} sentences: {} used, {} rejected (checksum), {} ignored; original handler used {} ($GP only)'.format(len(sentences), used, invalid, len(sentences) - used - invalid, legacy_used))
+    print('Comparison with pynmea2: {}'.format('OK' if mismatches == 0 else 'FAILED ({} sentences differ)'.format(mismatches)))
+    print()
+
+    pynmea2_duration = measure('pynmea2', parse_pynmea2, sentences, args.repetitions)
+    parser_duration = measure('nmea_parser', utils.nmea_parser.parse_nmea_sentence, sentences, args.repetitions)
+    print('Speed-up: {:.1f}x'.format(pynmea2_duration / parser_duration))
+
+
+if __name__ == "__main__":
+    main()
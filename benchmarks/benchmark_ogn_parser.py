@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+"""benchmark_ogn_parser.py: Compares the OGN beacon parser with the original per-call regex implementation on a corpus
+of APRS lines. Verifies that both yield identical aircraft data before measuring throughput.
+
+Run from repository root: python3 -m benchmarks.benchmark_ogn_parser [corpus]"""
+
+import argparse
+import os
+import re
+import time
+
+import utils.conversion
+import utils.ogn_parser
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ogn_aprs.txt')
+
+
+def legacy_parse(data):
+    """
+    Original parsing code of handle_ogn_data, with aircraft updates recorded in a dict.
+    """
+
+    state = {}
+
+    try:
+        data_parts = data.split(' ')
+        beacon_data = data_parts[0]
+        position_data = data_parts[1:len(data_parts)]
+
+        m = re.match(r"^(.+?)>APRS,(.+?):/(\d{6})+h(\d{4}\.\d{2})(N|S)(.)(\d{5}\.\d{2})(E|W)(.)((\d{3})/(\d{3}))?/A=(\d{6})", beacon_data)
+
+        if m:
+            identifier = m.group(1)[-6:]
+
+            latitude = utils.conversion.ogn_coord_to_degrees(float(m.group(4)))
+            if m.group(5) == "S":
+                latitude = -1.0 * latitude
+
+            longitude = utils.conversion.ogn_coord_to_degrees(float(m.group(7)))
+            if m.group(8) == "W":
+                longitude = -1.0 * longitude
+
+            track = 0
+            h_speed = 0
+            if m.group(10) is not None:
+                track = int(m.group(11))
+                h_speed = int(m.group(12))
+
+            state = {'identifier': identifier, 'latitude': latitude, 'longitude': longitude, 'altitude': int(m.group(13)), 'h_speed': h_speed, 'course': track, 'unknown_tokens': []}
+
+        address_pattern = re.compile(r"id(\S{2})(\S{6})")
+        climb_rate_pattern = re.compile(r"([\+\-]\d+)fpm")
+        turn_rate_pattern = re.compile(r"([\+\-]\d+\.\d+)rot")
+        signal_strength_pattern = re.compile(r"(\d+\.\d+)dB")
+        error_count_pattern = re.compile(r"(\d+)e")
+        coordinates_extension_pattern = re.compile(r"\!W(.)(.)!")
+        hear_ID_pattern = re.compile(r"hear(\w{4})")
+        frequency_offset_pattern = re.compile(r"([\+\-]\d+\.\d+)kHz")
+        gps_status_pattern = re.compile(r"gps(\d+x\d+)")
+        software_version_pattern = re.compile(r"s(\d+\.\d+)")
+        hardware_version_pattern = re.compile(r"h(\d+)")
+        real_id_pattern = re.compile(r"r(\w{6})")
+        flightlevel_pattern = re.compile(r"FL(\d{3}\.\d{2})")
+        ogn_decode_version_pattern = re.compile(r"v(\d\.\d\.\d\.\w+)")
+        load_pattern = re.compile(r"CPU:([\d\.]+)")
+        ram_pattern = re.compile(r"RAM:([\d\.]+)/([\d\.]+)(\w+)")
+        ntp_pattern = re.compile(r"NTP:([\d\.-]+)ms/([\d\.-]+)ppm")
+        temperature_pattern = re.compile(r"([\d\.+-]+)C")
+        rf_pattern = re.compile(r"RF:([\w\d\.+-/]+)")
+
+        for position_data_part in position_data:
+            address_match = address_pattern.match(position_data_part)
+            climb_rate_match = climb_rate_pattern.match(position_data_part)
+            turn_rate_match = turn_rate_pattern.match(position_data_part)
+            signal_strength_match = signal_strength_pattern.match(position_data_part)
+            error_count_match = error_count_pattern.match(position_data_part)
+            coordinates_extension_match = coordinates_extension_pattern.match(position_data_part)
+            hear_ID_match = hear_ID_pattern.match(position_data_part)
+            frequency_offset_match = frequency_offset_pattern.match(position_data_part)
+            gps_status_match = gps_status_pattern.match(position_data_part)
+            software_version_match = software_version_pattern.match(position_data_part)
+            hardware_version_match = hardware_version_pattern.match(position_data_part)
+            real_id_match = real_id_pattern.match(position_data_part)
+            flightlevel_match = flightlevel_pattern.match(position_data_part)
+            ogn_decode_version_match = ogn_decode_version_pattern.match(position_data_part)
+            load_match = load_pattern.match(position_data_part)
+            ram_match = ram_pattern.match(position_data_part)
+            ntp_match = ntp_pattern.match(position_data_part)
+            temperature_match = temperature_pattern.match(position_data_part)
+            rf_match = rf_pattern.match(position_data_part)
+
+            if address_match is not None:
+                aircraft_type = (int(address_match.group(1), 16) & 0b01111100) >> 2
+                identifier
+                state['aircraft_type'] = aircraft_type
+            elif climb_rate_match is not None:
+                climb_rate = int(climb_rate_match.group(1))
+                identifier
+                state['v_speed'] = climb_rate
+            elif turn_rate_match is not None:
+                float(turn_rate_match.group(1))
+            elif signal_strength_match is not None:
+                float(signal_strength_match.group(1))
+            elif error_count_match is not None:
+                int(error_count_match.group(1))
+            elif coordinates_extension_match is not None:
+                latitude += int(coordinates_extension_match.group(1)) / 1000.0 / 60.0
+                longitude += int(coordinates_extension_match.group(2)) / 1000.0 / 60.0
+                identifier
+                state['latitude'] = latitude
+                state['longitude'] = longitude
+            elif hear_ID_match is not None:
+                pass
+            elif frequency_offset_match is not None:
+                float(frequency_offset_match.group(1))
+            elif gps_status_match is not None:
+                pass
+            elif software_version_match is not None:
+                float(software_version_match.group(1))
+            elif hardware_version_match is not None:
+                int(hardware_version_match.group(1))
+            elif real_id_match is not None:
+                pass
+            elif flightlevel_match is not None:
+                float(flightlevel_match.group(1))
+            elif ogn_decode_version_match is not None:
+                pass
+            elif load_match is not None:
+                float(load_match.group(1))
+            elif ram_match is not None:
+                float(ram_match.group(1))
+                float(ram_match.group(2))
+            elif ntp_match is not None:
+                float(ntp_match.group(1))
+                float(ntp_match.group(2))
+            elif temperature_match is not None:
+                float(temperature_match.group(1))
+            elif rf_match is not None:
+                pass
+            elif state:
+                state['unknown_tokens'].append(position_data_part)
+
+    except ValueError:
+        state['error'] = True
+    except NameError:
+        # original code fails when accessing aircraft of a beacon that could not be parsed
+        pass
+
+    return state
+
+
+def parse(data):
+    beacon = utils.ogn_parser.parse_ogn_beacon(data)
+    if beacon is None:
+        return {}
+
+    state = {'identifier': beacon.identifier, 'latitude': beacon.latitude, 'longitude': beacon.longitude, 'altitude': beacon.altitude, 'h_speed': beacon.h_speed, 'course': beacon.track, 'unknown_tokens': beacon.unknown_tokens}
+    if beacon.aircraft_type is not None:
+        state['aircraft_type'] = beacon.aircraft_type
+    if beacon.climb_rate is not None:
+        state['v_speed'] = beacon.climb_rate
+    if beacon.error:
+        state['error'] = True
+
+    return state
+
+
+def measure(name, function, lines, repetitions):
+    start = time.perf_counter()
+    for i in range(repetitions):
+        for line in lines:
+            function(line)
+    duration = time.perf_counter() - start
+
+    messages_per_second = repetitions * len(lines) / duration
+    print('{:<30} {:>10.0f} messages/s'.format(name, messages_per_second))
+
+    return messages_per_second
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of OGN beacon parsing.')
+    arg_parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS, help='file with one APRS line per line')
+    arg_parser.add_argument('--repetitions', dest='repetitions', type=int, default=20, help='number of passes over corpus')
+    args = arg_parser.parse_args()
+
+    with open(args.corpus) as corpus_file:
+        lines = [line.rstrip('\r\n') for line in corpus_file if line.strip()]
+
+    # verify identical results
+    mismatches = 0
+    for line in lines:
+        if legacy_parse(line) != parse(line):
+            print('Mismatch: {}'.format(line))
+            mismatches += 1
+    print('{} lines, {} mismatches'.format(len(lines), mismatches))
+
+    legacy_rate = measure('original implementation', legacy_parse, lines, args.repetitions)
+    parser_rate = measure('ogn_parser', parse, lines, args.repetitions)
+    print('Speed-up: {:.1f}x'.format(parser_rate / legacy_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+"""benchmark_pipeline.py: Runs the FlightBox process graph (as built by flightbox.py) with synthetic traffic of the
+scenario generator instead of live inputs: airliners reported as SBS1 messages at dump1090 rates, gliders thermalling
+around the own position reported as OGN beacons, and own-ship NMEA at 5 Hz. One AirConnect client counts the received
+sentences.
+
+For each number of aircraft (or a scenario file), measures throughput, CPU per process (from /proc) and latency
+histograms per stage (input to hub, input to transformation, transformation to AirConnect socket, and duration of
+processing cycles) after a warm-up period. With --metrics, runtime metrics are enabled (e.g., for comparing CPU with
+and without) and scraped at the end of each run. Results are written as JSON, e.g., for comparing commits.
+
+Run from repository root: python3 -m benchmarks.benchmark_pipeline [--aircraft 50,100,200,400] [--output results.json]"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+
+from flightbox import FlightBoxPipeline, create_arg_parser
+from input.input_scenario_generator import InputScenarioGenerator, create_aircraft, load_scenario
+from utils.latency import read_latency_files
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+# results are written into this directory by default (ignored by git)
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def create_scenario(aircraft_count, glider_count):
+    # airliners reported by SBS1, gliders by OGN, own-ship turning slowly
+    return {'seed': 1,
+            'own_ship': {'latitude': 47.45, 'longitude': 8.55, 'model': 'turn', 'altitude': 1000.0, 'speed': 40.0, 'turn_rate': 0.75, 'nmea_rate': 5.0},
+            'traffic': [{'count': aircraft_count, 'model': 'cruise', 'source': 'sbs1'}, {'count': glider_count, 'model': 'thermal', 'source': 'ogn'}]}
+
+
+class AirConnectClient(threading.Thread):
+    """
+    Client that counts received lines and FLARM traffic sentences.
+    """
+
+    def __init__(self, port):
+        super().__init__(daemon=True)
+
+        self._socket = socket.create_connection(('127.0.0.1', port))
+        self.bytes = 0
+        self.lines = 0
+        self.traffic = 0
+
+    def run(self):
+        pending = b''
+        while True:
+            try:
+                data = self._socket.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+
+            self.bytes += len(data)
+            self.lines += data.count(b'\n')
+
+            # count PFLAA sentences across chunk borders
+            pending += data
+            self.traffic += pending.count(b'$PFLAA,')
+            pending = pending[-6:] if not pending.endswith(b'\n') else b''
+
+    def close(self):
+        self._socket.close()
+
+    def get_counters(self):
+        return {'bytes': self.bytes, 'lines': self.lines, 'traffic': self.traffic}
+
+
+def get_cpu_time(pid):
+    # user and system time of process (all threads) in seconds
+    with open('/proc/{:d}/stat'.format(pid)) as stat_file:
+        fields = stat_file.read().rsplit(')', 1)[1].split()
+
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def get_free_port():
+    with socket.socket() as free_socket:
+        free_socket.bind(('127.0.0.1', 0))
+        return free_socket.getsockname()[1]
+
+
+def scrape_metrics(port):
+    # samples of Prometheus text format (name with labels -> value)
+    samples = {}
+    for line in urllib.request.urlopen('http://127.0.0.1:{:d}/metrics'.format(port), timeout=5.0).read().decode('utf-8').splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+
+    return samples
+
+
+def take_snapshot(processes, latency_directory, client):
+    return {'time': time.monotonic(),
+            'cpu': dict([(process.name, get_cpu_time(process.pid)) for process in processes if process.is_alive()]),
+            'latency': read_latency_files(latency_directory),
+            'client': client.get_counters()}
+
+
+def run(scenario, args):
+    latency_directory = tempfile.mkdtemp(prefix='flightbox_latency_')
+    port = get_free_port()
+
+    flightbox_argv = ['--data-hub', args.data_hub, '--baro-sensor', 'fake', '--airconnect-ports', '{:d}:all'.format(port), '--latency-dir', latency_directory, '--web-log-file', '']
+    metrics_port = None
+    if args.metrics:
+        metrics_port = get_free_port()
+        flightbox_argv += ['--metrics-port', str(metrics_port)]
+
+    pipeline = FlightBoxPipeline(create_arg_parser().parse_args(flightbox_argv), live_inputs=False)
+
+    # generator terminates after measurement
+    pipeline.add_input_module(InputScenarioGenerator(pipeline.data_hub, scenario, duration=args.warm_up + args.duration + 1.0, metrics=pipeline.metrics))
+
+    # name processes by module for reporting
+    for process in pipeline.processes:
+        process.name = type(process).__name__
+
+    try:
+        pipeline.start(hub_delay=0.5, processing_delay=2.0, input_delay=0.0)
+
+        client = AirConnectClient(port)
+        client.start()
+
+        time.sleep(args.warm_up)
+        start = take_snapshot(pipeline.processes, latency_directory, client)
+        time.sleep(args.duration)
+        end = take_snapshot(pipeline.processes, latency_directory, client)
+
+        metrics = scrape_metrics(metrics_port) if metrics_port else None
+
+        client.close()
+
+    finally:
+        # wait for inputs, then stop processing modules (transformation does not terminate by itself)
+        for input_module in pipeline.input_modules:
+            input_module.join(5.0)
+        pipeline.stop()
+        for process in pipeline.processes:
+            process.join(2.0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        pipeline.close()
+        shutil.rmtree(latency_directory)
+
+    duration = end['time'] - start['time']
+
+    latency = {}
+    for process_name, stages in end['latency'].items():
+        for stage, histogram in stages.items():
+            start_histogram = start['latency'].get(process_name, {}).get(stage)
+            if start_histogram is not None:
+                histogram = histogram.subtract(start_histogram)
+            latency.setdefault(process_name, {})[stage] = histogram.to_dict()
+
+    # messages handled by the transformation (all SBS1, OGN and NMEA messages of the scenario)
+    own_ship, aircraft = create_aircraft(scenario)
+    transformation_latency = latency.get('transformation_sbs1ognnmea_flarm', {}).get('input_to_transformation', {'count': 0})
+
+    return {'aircraft': sum(1 for current_aircraft in aircraft if current_aircraft.source == 'sbs1'),
+            'gliders': sum(1 for current_aircraft in aircraft if current_aircraft.source == 'ogn'),
+            'duration': duration,
+            'input_messages_per_second': transformation_latency['count'] / duration,
+            'airconnect_lines_per_second': (end['client']['lines'] - start['client']['lines']) / duration,
+            'airconnect_traffic_per_second': (end['client']['traffic'] - start['client']['traffic']) / duration,
+            'airconnect_bytes_per_second': (end['client']['bytes'] - start['client']['bytes']) / duration,
+            'cpu_percent': dict([(process_name, (cpu_time - start['cpu'][process_name]) * 100.0 / duration) for process_name, cpu_time in end['cpu'].items() if process_name in start['cpu']]),
+            'latency': latency,
+            'metrics': metrics}
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_stage(latency, process_name, stage):
+    histogram = latency.get(process_name, {}).get(stage)
+    if histogram is None or not histogram['count']:
+        return '{:>15}'.format('-')
+
+    return '{:>6.1f}/{:>7.1f}'.format(histogram['p50'] * 1e3, histogram['p99'] * 1e3)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of the FlightBox pipeline with synthetic traffic.')
+    arg_parser.add_argument('--aircraft', dest='aircraft', default='50,100,200,400', help='comma-separated numbers of ADS-B aircraft (one run each)')
+    arg_parser.add_argument('--glider-ratio', dest='glider_ratio', type=float, default=0.25, help='number of OGN gliders relative to number of aircraft')
+    arg_parser.add_argument('--scenario', dest='scenario', help='scenario file that is run instead of numbers of aircraft (see input/scenarios)')
+    arg_parser.add_argument('--data-hub', dest='data_hub', choices=['queue', 'shm'], default='queue', help='data hub backend')
+    arg_parser.add_argument('--warm-up', dest='warm_up', type=float, default=5.0, help='seconds before measurement')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=20.0, help='seconds of measurement per run')
+    arg_parser.add_argument('--metrics', dest='metrics', action='store_true', help='enable runtime metrics (scraped at the end of each run)')
+    arg_parser.add_argument('--output', dest='output', default=os.path.join(RESULTS_DIRECTORY, 'benchmark_pipeline.json'), help='JSON file of results (default: benchmarks/results/benchmark_pipeline.json)')
+    args = arg_parser.parse_args()
+
+    results = {'benchmark': 'pipeline', 'time': datetime.datetime.utcnow().isoformat() + 'Z', 'commit': get_commit(), 'python': platform.python_version(), 'machine': platform.machine(), 'cpu_count': os.cpu_count(), 'parameters': vars(args), 'runs': []}
+
+    print('aircraft gliders  msgs/s  FLARM/s  input->hub ms  input->trans ms  trans->socket ms  tick ms    CPU % (hub/trans/AirConnect/input)')
+    print('                                    p50/    p99     p50/    p99      p50/    p99    p50/    p99')
+
+    if args.scenario:
+        scenarios = [load_scenario(args.scenario)]
+    else:
+        scenarios = [create_scenario(int(value), int(int(value) * args.glider_ratio)) for value in args.aircraft.split(',')]
+
+    for scenario in scenarios:
+        result = run(scenario, args)
+        results['runs'].append(result)
+
+        latency = result['latency']
+        cpu = result['cpu_percent']
+        print('{:>8d} {:>7d} {:>7.0f} {:>8.0f} {} {}  {}  {}    {}'.format(
+            result['aircraft'], result['gliders'], result['input_messages_per_second'], result['airconnect_traffic_per_second'],
+            format_stage(latency, 'datahubworker', 'input_to_hub'), format_stage(latency, 'transformation_sbs1ognnmea_flarm', 'input_to_transformation'),
+            format_stage(latency, 'output_network_airconnect', 'transformation_to_airconnect'), format_stage(latency, 'transformation_sbs1ognnmea_flarm', 'tick'),
+            '/'.join('{:.0f}'.format(cpu.get(process_name, 0.0)) for process_name in ('DataHubWorker', 'Sbs1OgnNmeaToFlarmTransformation', 'OutputNetworkAirConnect', 'InputScenarioGenerator'))))
+
+    output_directory = os.path.dirname(args.output)
+    if output_directory:
+        os.makedirs(output_directory, exist_ok=True)
+
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True)
+
+    print('Results written to {}'.format(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""benchmark_queue_bridge.py: Compares thread count and per-item latency of reading a data input queue into an asyncio
+loop with one executor per item (original input processors) and with the DataHubQueueBridge, under a synthetic load.
+
+Run from repository root: python3 -m benchmarks.benchmark_queue_bridge"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process, Queue
+import threading
+import time
+
+from data_hub.data_hub_item import DataHubItem, SOURCE_TEST
+from data_hub.data_hub_queue_bridge import DataHubQueueBridge
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+def produce(data_input_queue, rate, duration):
+    # put items with constant rate, then send poison pill
+    interval = 1.0 / rate
+    start = time.monotonic()
+    count = 0
+
+    while count < rate * duration:
+        due = start + count * interval
+        delay = due - time.monotonic()
+        if delay > 0.0:
+            time.sleep(delay)
+
+        data_input_queue.put(DataHubItem('test', 'MSG,3,{:d}'.format(count), source_id=SOURCE_TEST))
+        count += 1
+
+    data_input_queue.put(None)
+
+
+class Statistics(object):
+    def __init__(self):
+        self.latencies = []
+        self.thread_counts = []
+
+    def add(self, data_hub_item):
+        self.latencies.append(time.monotonic() - data_hub_item.get_timestamp())
+
+        if len(self.latencies) % 100 == 0:
+            self.thread_counts.append(threading.active_count())
+
+    def report(self, name):
+        latencies = sorted(self.latencies)
+        half = len(self.thread_counts) // 2
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000.0
+
+        print('{:<22} items={:<7d} latency p50={:6.2f} ms p90={:6.2f} ms p99={:6.2f} ms max={:7.2f} ms   threads first half max={:<4d} second half max={:d}'.format(
+            name, len(latencies), percentile(0.5), percentile(0.9), percentile(0.99), latencies[-1] * 1000.0,
+            max(self.thread_counts[:half] or [0]), max(self.thread_counts[half:] or [0])))
+
+
+@asyncio.coroutine
+def executor_processor(loop, data_input_queue, statistics):
+    while True:
+        # original implementation: new executor for every item
+        executor = ThreadPoolExecutor(max_workers=1)
+
+        data_hub_item = yield from loop.run_in_executor(executor, data_input_queue.get)
+        if data_hub_item is None:
+            break
+
+        statistics.add(data_hub_item)
+
+
+@asyncio.coroutine
+def bridge_processor(loop, data_input_queue, statistics):
+    data_hub_queue_bridge = DataHubQueueBridge(loop, data_input_queue)
+    data_hub_queue_bridge.start()
+
+    while True:
+        data_hub_items = yield from data_hub_queue_bridge.get()
+        if data_hub_items is None:
+            break
+
+        for data_hub_item in data_hub_items:
+            statistics.add(data_hub_item)
+
+
+def run(name, processor, rate, duration):
+    data_input_queue = Queue()
+    statistics = Statistics()
+
+    producer = Process(target=produce, args=(data_input_queue, rate, duration))
+    producer.start()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(processor(loop, data_input_queue, statistics))
+    loop.close()
+
+    producer.join()
+
+    statistics.report(name)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of data input queue to asyncio loop bridging.')
+    arg_parser.add_argument('--rate', dest='rate', type=int, default=2000, help='items per second')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=10.0, help='duration in seconds')
+    args = arg_parser.parse_args()
+
+    run('executor per item', executor_processor, args.rate, args.duration)
+    run('DataHubQueueBridge', bridge_processor, args.rate, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+"""benchmark_recording.py: Records a synthetic flight (SBS1, OGN and NMEA items at a given rate) with the recording
+writer for each available compression. Verifies that all items are read back unchanged and compares write throughput,
+size on disk, and the time of seeking to a random minute via the index versus scanning all blocks.
+
+Run from repository root: python3 -m benchmarks.benchmark_recording [--hours 3]"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from data_hub.data_hub_item import DataHubItem, SOURCE_INPUT_GNSS, SOURCE_INPUT_OGN, SOURCE_INPUT_SBS1
+from utils.recording import RecordingBlock, RecordingReader, RecordingWriter, list_segments, zstandard
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+def generate_items(hours, rate):
+    # items of one second repeat with changing values
+    items = []
+    count = int(hours * 3600 * rate)
+    for i in range(count):
+        timestamp = 1000.0 + i / rate
+        kind = i % 10
+        if kind < 7:
+            items.append(DataHubItem('sbs1', 'MSG,3,111,11111,{:06X},111111,2017/06/01,12:00:{:02d}.000,2017/06/01,12:00:{:02d}.000,,{:d},,,47.{:05d},8.{:05d},,,0,0,0,0'.format(i % 50, i % 60, i % 60, 5000 + i % 300, i % 99999, (i * 7) % 99999), timestamp=timestamp, source_id=SOURCE_INPUT_SBS1))
+        elif kind < 9:
+            items.append(DataHubItem('ogn', 'FLR{:06X}>APRS,qAS,Station:/120000h4723.{:02d}N/00832.{:02d}E\'180/045/A=002000 !W12! id06{:06X} +000fpm +0.0rot'.format(i % 20, i % 60, i % 60, i % 20), timestamp=timestamp, source_id=SOURCE_INPUT_OGN))
+        else:
+            items.append(DataHubItem('nmea', '$GNGGA,{:06d}.00,4723.{:03d},N,00832.{:03d},E,1,08,0.9,545.4,M,46.9,M,,*47'.format(i % 240000, i % 1000, i % 1000), timestamp=timestamp, source_id=SOURCE_INPUT_GNSS))
+
+    return items
+
+
+def write_recording(directory, items, compression, block_interval, rate):
+    recording_writer = RecordingWriter(directory, compression=compression)
+
+    start = time.perf_counter()
+    block = RecordingBlock()
+    block_items = int(block_interval * rate)
+    for data_hub_item in items:
+        block.add(data_hub_item)
+        if block.count >= block_items:
+            recording_writer.write_block(block)
+            block = RecordingBlock()
+    recording_writer.write_block(block)
+    recording_writer.close()
+    duration = time.perf_counter() - start
+
+    return duration, recording_writer.get_statistics()
+
+
+def read_recording(directory):
+    items = []
+    for segment_path in list_segments(directory):
+        with RecordingReader(segment_path) as recording_reader:
+            items.extend(recording_reader.iter_items())
+
+    return items
+
+
+def measure_seek(segment_path, seek_count, use_index):
+    # read one second of items at random minutes
+    with RecordingReader(segment_path, use_index=use_index) as recording_reader:
+        min_timestamp, max_timestamp = recording_reader.get_time_range()
+        minutes = int((max_timestamp - min_timestamp) / 60)
+
+        random.seed(1)
+        start = time.perf_counter()
+        count = 0
+        for i in range(seek_count):
+            seek_timestamp = min_timestamp + random.randrange(minutes) * 60.0
+            count += sum(1 for data_hub_item in recording_reader.iter_items(seek_timestamp, seek_timestamp + 1.0))
+
+        return (time.perf_counter() - start) / seek_count, count / seek_count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of recording data hub items.')
+    arg_parser.add_argument('--hours', dest='hours', type=float, default=3.0, help='duration of recorded flight in hours')
+    arg_parser.add_argument('--rate', dest='rate', type=float, default=100.0, help='items per second')
+    arg_parser.add_argument('--block-interval', dest='block_interval', type=float, default=1.0, help='block interval in seconds')
+    arg_parser.add_argument('--seeks', dest='seeks', type=int, default=20, help='number of random seeks')
+    args = arg_parser.parse_args()
+
+    items = generate_items(args.hours, args.rate)
+    raw_text_size = sum(len(str(data_hub_item.get_content_data())) + 1 for data_hub_item in items)
+    print('{} items ({:.1f} h at {:.0f} items/s), {:.1f} MB as text'.format(len(items), args.hours, args.rate, raw_text_size / 1e6))
+
+    compressions = ['none', 'gzip']
+    if zstandard is not None:
+        compressions.append('zstd')
+
+    for compression in compressions:
+        directory = tempfile.mkdtemp(prefix='flightbox_recording_')
+        try:
+            duration, statistics = write_recording(directory, items, compression, args.block_interval, args.rate)
+            read_items = read_recording(directory)
+            ok = len(read_items) == len(items) and all(a.get_content_type() == b.get_content_type() and a.get_content_data() == b.get_content_data() and a.get_timestamp() == b.get_timestamp() and a.get_source_id() == b.get_source_id() for a, b in zip(read_items, items))
+
+            segment_path = list_segments(directory)[0]
+            index_size = os.path.getsize(segment_path + '.idx')
+            seek_duration, seek_items = measure_seek(segment_path, args.seeks, use_index=True)
+            scan_duration, scan_items = measure_seek(segment_path, max(args.seeks // 10, 1), use_index=False)
+
+            print('{:<5} write {:>8.0f} items/s, {:>6.2f} MB on disk ({:4.1f}% of text), index {:>6d} bytes, read back {}, seek to minute {:7.2f} ms (without index {:6.2f} ms, {:.0f} items)'.format(
+                compression, len(items) / duration, statistics['stored_bytes'] / 1e6, statistics['stored_bytes'] * 100.0 / raw_text_size, index_size,
+                'OK' if ok and seek_items == scan_items else 'FAILED', seek_duration * 1e3, scan_duration * 1e3, seek_items))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""benchmark_replay.py: Replays the raw captures in benchmarks/data (SBS1, OGN and NMEA merged by time) and, optionally,
+a recording with the replay input module into a data hub queue that is drained by another process. Verifies that all
+messages arrive in order of their time offsets and measures throughput as fast as possible (speed 0) and the timing
+error at a given speed factor.
+
+Run from repository root: python3 -m benchmarks.benchmark_replay [--recording dir]"""
+
+import argparse
+from multiprocessing import Process, Queue
+import os
+import time
+
+from data_hub.data_hub_batch import DataHubBatch
+from input.input_replay import InputReplay, merge_sources, parse_source
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_SOURCES = ['sbs1:' + os.path.join(DATA_DIRECTORY, 'sbs1_30003.txt'), 'ogn:' + os.path.join(DATA_DIRECTORY, 'ogn_aprs.txt'), 'nmea:' + os.path.join(DATA_DIRECTORY, 'gnss_nmea.txt')]
+
+
+def consume(data_hub, result_queue):
+    # collect content data and arrival time of all items until poison pill
+    items = []
+    while True:
+        data_hub_item = data_hub.get()
+        if data_hub_item is None:
+            break
+
+        now = time.monotonic()
+        data_hub_items = data_hub_item.get_items() if type(data_hub_item) is DataHubBatch else [data_hub_item]
+        for data_hub_item in data_hub_items:
+            items.append((data_hub_item.get_content_data(), now))
+
+    result_queue.put(items)
+
+
+def run(sources, speed):
+    data_hub = Queue()
+    result_queue = Queue()
+    consumer = Process(target=consume, args=(data_hub, result_queue))
+    consumer.start()
+
+    input_replay = InputReplay(data_hub, sources, speed=speed)
+
+    start_time = time.monotonic()
+    input_replay.start()
+    input_replay.join()
+    duration = time.monotonic() - start_time
+
+    data_hub.put(None)
+    items = result_queue.get()
+    consumer.join()
+
+    return items, start_time, duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of replaying captures and recordings.')
+    arg_parser.add_argument('--recording', dest='recording', help='recording (segment or directory) replayed instead of the raw captures')
+    arg_parser.add_argument('--speed', dest='speed', type=float, default=10.0, help='speed factor of timing test')
+    args = arg_parser.parse_args()
+
+    sources = [args.recording] if args.recording else DEFAULT_SOURCES
+
+    expected = list(merge_sources([parse_source(source) for source in sources]))
+    max_offset = expected[-1][0]
+    print('{} messages spanning {:.1f} s'.format(len(expected), max_offset))
+
+    # as fast as possible
+    items, start_time, duration = run(sources, 0.0)
+    ok = [content_data for content_data, arrival_time in items] == [content_data for offset, content_type, content_data, source_id in expected]
+    print('speed 0      {:>9.0f} items/s, order {}'.format(len(items) / duration, 'OK' if ok else 'FAILED'))
+
+    # original timing scaled by speed factor (error of arrival time relative to schedule)
+    items, start_time, duration = run(sources, args.speed)
+    ok = [content_data for content_data, arrival_time in items] == [content_data for offset, content_type, content_data, source_id in expected]
+    errors = sorted(abs(arrival_time - start_time - offset / args.speed) for (content_data, arrival_time), (offset, content_type, expected_data, source_id) in zip(items, expected))
+    print('speed {:<6g} {:>7.2f} s for {:.2f} s of scaled time, timing error p50 {:.1f} ms, p99 {:.1f} ms (includes process start), order {}'.format(
+        args.speed, duration, max_offset / args.speed, errors[len(errors) // 2] * 1e3, errors[int(len(errors) * 0.99)] * 1e3, 'OK' if ok else 'FAILED'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""benchmark_sbs1_coalescer.py: Replays an SBS1 capture in one second processing cycles (based on message time stamps)
+and compares applying every message to the aircraft table (original behavior, lock per message and field) with the
+Sbs1Coalescer, which hands over only the newest update per aircraft and category once per cycle. Verifies that the
+aircraft table is identical at the end of every cycle and reports collapsed versus applied updates.
+
+Run from repository root: python3 -m benchmarks.benchmark_sbs1_coalescer [capture]"""
+
+import argparse
+import os
+import time
+from threading import Lock
+
+from transformation.aircraft_store import AircraftStore
+from transformation.sbs1_coalescer import Sbs1Coalescer
+import utils.sbs1_parser
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+DEFAULT_CAPTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sbs1_30003.txt')
+
+# compared attributes (aircraft type depends on speed at time of MSG,5 and may differ)
+ATTRIBUTES = ('identifier', 'callsign', 'latitude', 'longitude', 'altitude', 'h_speed', 'v_speed', 'course', 'signallevel')
+
+
+def apply_record(record, aircraft_store, aircraft_lock, timestamp):
+    # field updates of handle_sbs1_record() (lock is a no-op context if held by caller)
+    with aircraft_lock:
+        current_aircraft = aircraft_store.update(record[1], 'A', timestamp)
+
+    msg_type = record[0]
+    if msg_type == utils.sbs1_parser.MSG_IDENTIFICATION:
+        with aircraft_lock:
+            current_aircraft.callsign = record[2]
+    elif msg_type == utils.sbs1_parser.MSG_SURFACE_POSITION or msg_type == utils.sbs1_parser.MSG_AIRBORNE_POSITION:
+        with aircraft_lock:
+            current_aircraft.latitude, current_aircraft.longitude, current_aircraft.altitude = record[2:5]
+    elif msg_type == utils.sbs1_parser.MSG_VELOCITY:
+        with aircraft_lock:
+            current_aircraft.h_speed, current_aircraft.v_speed, current_aircraft.course = record[2:5]
+    elif msg_type == utils.sbs1_parser.MSG_SURVEILLANCE:
+        with aircraft_lock:
+            current_aircraft.signallevel = record[3]
+            current_aircraft.altitude = record[4]
+
+
+class NoLock(object):
+    """
+    Context manager used while the caller already holds the aircraft lock.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def load_cycles(capture):
+    # group parsed messages by second of generation time stamp
+    cycles = []
+    current_second = None
+
+    with open(capture) as capture_file:
+        for line in capture_file:
+            fields = line.split(',')
+            if len(fields) < 8:
+                continue
+
+            try:
+                record = utils.sbs1_parser.parse_sbs1_message(line.strip())
+            except ValueError:
+                continue
+            if record is None:
+                continue
+
+            second = fields[7][:8]
+            if second != current_second:
+                cycles.append([])
+                current_second = second
+
+            cycles[-1].append(record)
+
+    return cycles
+
+
+def state(aircraft_store):
+    return sorted(tuple(getattr(aircraft, attribute) for attribute in ATTRIBUTES) for aircraft in aircraft_store.snapshot())
+
+
+def replay_direct(cycles, states=None):
+    aircraft_store = AircraftStore()
+    aircraft_lock = Lock()
+
+    for cycle in cycles:
+        for record in cycle:
+            apply_record(record, aircraft_store, aircraft_lock, None)
+
+        if states is not None:
+            with aircraft_lock:
+                states.append(state(aircraft_store))
+
+
+def replay_coalesced(cycles, states=None, sbs1_coalescer=None):
+    aircraft_store = AircraftStore()
+    aircraft_lock = Lock()
+    no_lock = NoLock()
+
+    if sbs1_coalescer is None:
+        sbs1_coalescer = Sbs1Coalescer()
+
+    for cycle in cycles:
+        for record in cycle:
+            sbs1_coalescer.put(record)
+
+        with aircraft_lock:
+            for record, timestamp in sbs1_coalescer.drain():
+                apply_record(record, aircraft_store, no_lock, timestamp)
+
+            if states is not None:
+                states.append(state(aircraft_store))
+
+
+def measure(name, function, repetitions, messages):
+    start = time.perf_counter()
+    for i in range(repetitions):
+        function()
+    duration = (time.perf_counter() - start) / repetitions
+
+    print('{:<30} {:>8.2f} ms ({:.2f} us/message)'.format(name, duration * 1e3, duration / messages * 1e6))
+
+    return duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Replay and benchmark of SBS1 update coalescing.')
+    arg_parser.add_argument('capture', nargs='?', default=DEFAULT_CAPTURE, help='captured SBS1 stream')
+    arg_parser.add_argument('--repetitions', dest='repetitions', type=int, default=20, help='number of replays')
+    args = arg_parser.parse_args()
+
+    cycles = load_cycles(args.capture)
+    messages = sum(len(cycle) for cycle in cycles)
+
+    # verify aircraft table at end of every cycle
+    direct_states = []
+    coalesced_states = []
+    sbs1_coalescer = Sbs1Coalescer()
+    replay_direct(cycles, direct_states)
+    replay_coalesced(cycles, coalesced_states, sbs1_coalescer)
+
+    mismatches = sum(1 for direct_state, coalesced_state in zip(direct_states, coalesced_states) if direct_state != coalesced_state)
+    print('{} messages in {} cycles: aircraft table {}'.format(messages, len(cycles), 'OK (identical after every cycle)' if mismatches == 0 else 'FAILED ({} cycles differ)'.format(mismatches)))
+
+    statistics = sbs1_coalescer.get_statistics()
+    print('received={}, collapsed={}, applied={} ({:.0f}% of updates applied)'.format(statistics['received'], statistics['collapsed'], statistics['applied'], 100.0 * statistics['applied'] / statistics['received']))
+    print()
+
+    direct_duration = measure('apply every message', lambda: replay_direct(cycles), args.repetitions, messages)
+    coalesced_duration = measure('Sbs1Coalescer', lambda: replay_coalesced(cycles), args.repetitions, messages)
+    print('Speed-up: {:.1f}x'.format(direct_duration / coalesced_duration))
+
+
+if __name__ == "__main__":
+    main()
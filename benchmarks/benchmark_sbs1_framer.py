@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""benchmark_sbs1_framer.py: Replays an SBS1 stream (port 30003 of dump1090) in random chunk sizes through the
+original data_received() implementation and through the Sbs1LineFramer. Verifies that the framer delivers every line
+of a desired message type exactly once, and compares throughput.
+
+Run from repository root: python3 -m benchmarks.benchmark_sbs1_framer [capture]"""
+
+import argparse
+import os
+import random
+import time
+
+from utils.line_framer import Sbs1LineFramer
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+DEFAULT_CAPTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sbs1_30003.txt')
+MESSAGE_TYPES = ['1', '2', '3', '4', '5']
+
+
+class LegacyFramer(object):
+    """
+    Original NetworkSbs1ClientProtocol.data_received() (without data hub items).
+    """
+
+    def __init__(self, message_types):
+        self._message_types = message_types
+
+    def feed(self, data):
+        result = []
+
+        data_string = data.decode().strip()
+
+        messages = data_string.splitlines()
+        for message in messages:
+            try:
+                message_type = message.split(',')[1]
+                if message_type in self._message_types:
+                    result.append(message)
+            except:
+                pass
+
+        return result
+
+
+def split(data, rng, min_size, max_size):
+    # split stream into chunks of random size
+    chunks = []
+    position = 0
+
+    while position < len(data):
+        size = rng.randint(min_size, max_size)
+        chunks.append(data[position:position + size])
+        position += size
+
+    return chunks
+
+
+def replay(framer, chunks):
+    messages = []
+    for chunk in chunks:
+        messages.extend(framer.feed(chunk))
+
+    return messages
+
+
+def measure(name, create, chunks, repetitions, size):
+    start = time.perf_counter()
+    for i in range(repetitions):
+        replay(create(), chunks)
+    duration = time.perf_counter() - start
+
+    print('{:<30} {:>8.1f} MB/s'.format(name, repetitions * size / duration / 1e6))
+
+    return duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Replay and benchmark of SBS1 line framing.')
+    arg_parser.add_argument('capture', nargs='?', default=DEFAULT_CAPTURE, help='captured SBS1 stream')
+    arg_parser.add_argument('--runs', dest='runs', type=int, default=50, help='number of replays with random chunk sizes')
+    arg_parser.add_argument('--repetitions', dest='repetitions', type=int, default=20, help='number of replays for throughput')
+    args = arg_parser.parse_args()
+
+    with open(args.capture, 'rb') as capture_file:
+        data = capture_file.read()
+
+    # expected messages: all lines of desired types
+    expected = [line for line in data.decode('ascii').splitlines() if line.split(',')[1:2] and line.split(',')[1] in MESSAGE_TYPES]
+    print('{} lines, {} of types {}'.format(len(data.splitlines()), len(expected), ','.join(MESSAGE_TYPES)))
+
+    # replay in random chunk sizes (including single bytes and chunks that end between CR and LF)
+    rng = random.Random(1)
+    failed = False
+    legacy_lost = 0
+    for run in range(args.runs):
+        max_size = rng.choice([1, 2, 7, 64, 512, 1448, 4096, 65536])
+        chunks = split(data, rng, 1, max_size)
+
+        messages = replay(Sbs1LineFramer(message_types=MESSAGE_TYPES), chunks)
+        if messages != expected:
+            failed = True
+            print('Run {}: Sbs1LineFramer delivered {} of {} messages (chunk size 1..{})'.format(run, len(messages), len(expected), max_size))
+
+        legacy_messages = set(replay(LegacyFramer(MESSAGE_TYPES), chunks))
+        legacy_lost += sum(1 for message in expected if message not in legacy_messages)
+
+    print('Sbs1LineFramer: {} runs {}'.format(args.runs, 'FAILED' if failed else 'OK (no lines lost or corrupted)'))
+    print('original implementation: {:.1f} lines lost or corrupted per run on average'.format(legacy_lost / args.runs))
+    print()
+
+    # throughput with typical TCP segment size
+    chunks = split(data, random.Random(2), 1448, 1448)
+    legacy_duration = measure('original implementation', lambda: LegacyFramer(MESSAGE_TYPES), chunks, args.repetitions, len(data))
+    framer_duration = measure('Sbs1LineFramer', lambda: Sbs1LineFramer(message_types=MESSAGE_TYPES), chunks, args.repetitions, len(data))
+    print('Speed-up: {:.1f}x'.format(legacy_duration / framer_duration))
+
+
+if __name__ == "__main__":
+    main()
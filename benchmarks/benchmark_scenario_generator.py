@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+"""benchmark_scenario_generator.py: Verifies that the messages of the scenario generator are parsed by the SBS1, OGN
+and NMEA parsers to the simulated positions (OGN beacons with relative FLARM coordinates are converted back with the
+own position), then runs a scenario (default: input/scenarios/busy_airspace.json) into a data hub queue that is drained
+by another process and measures the sustained message rate relative to the nominal rate of the scenario.
+
+Run from repository root: python3 -m benchmarks.benchmark_scenario_generator [--scenario file] [--duration 10]"""
+
+import argparse
+from multiprocessing import Process, Queue
+import math
+import os
+import time
+
+from data_hub.data_hub_batch import DataHubBatch
+from input.input_scenario_generator import InputScenarioGenerator, METERS_PER_DEGREE, create_aircraft, format_nmea_sentences, format_ogn_beacon, format_sbs1_message, load_scenario
+import utils.calculation, utils.nmea_parser, utils.ogn_parser, utils.sbs1_parser
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'input', 'scenarios', 'busy_airspace.json')
+
+# points in time (seconds since start of scenario) at which the formats are verified
+VERIFICATION_TIMES = (0.0, 30.0, 300.0)
+
+
+def get_error(latitude, longitude, expected_latitude, expected_longitude):
+    # distance in meters (flat earth)
+    return math.hypot((latitude - expected_latitude) * METERS_PER_DEGREE, (longitude - expected_longitude) * METERS_PER_DEGREE * math.cos(math.radians(expected_latitude)))
+
+
+def verify_formats(scenario):
+    """
+    :return: Dictionary of message kind to tuple of number of messages, parse failures and maximum position error in
+    meters
+    """
+
+    own_ship, aircraft = create_aircraft(scenario)
+    center_latitude = float(scenario['own_ship']['latitude'])
+    center_longitude = float(scenario['own_ship']['longitude'])
+
+    results = {'sbs1': [0, 0, 0.0], 'ogn': [0, 0, 0.0], 'nmea': [0, 0, 0.0]}
+
+    def update(kind, position, expected_latitude, expected_longitude):
+        results[kind][0] += 1
+        if position is None:
+            results[kind][1] += 1
+        else:
+            results[kind][2] = max(results[kind][2], get_error(position[0], position[1], expected_latitude, expected_longitude))
+
+    for now in VERIFICATION_TIMES:
+        for current_aircraft in [own_ship] + aircraft:
+            current_aircraft.advance(now)
+            latitude = center_latitude + current_aircraft.north / METERS_PER_DEGREE
+            longitude = center_longitude + current_aircraft.east / (METERS_PER_DEGREE * math.cos(math.radians(center_latitude)))
+
+            if 'nmea' in current_aircraft.periods:
+                for sentence in format_nmea_sentences(current_aircraft, latitude, longitude, '010117', '120000.00'):
+                    record = utils.nmea_parser.parse_nmea_sentence(sentence)
+                    update('nmea', (record[1], record[2]) if record is not None and record[1] is not None else None, latitude, longitude)
+
+            elif 'ogn' in current_aircraft.periods:
+                beacon = utils.ogn_parser.parse_ogn_beacon(format_ogn_beacon(current_aircraft, latitude, longitude, '120000'))
+                position = None
+                if beacon is not None and beacon.error is None and beacon.address == '{:06X}'.format(current_aircraft.identifier):
+                    position = (utils.calculation.lat_abs_from_rel_flarm_coordinate(center_latitude, beacon.latitude),
+                                utils.calculation.lon_abs_from_rel_flarm_coordinate(center_longitude, beacon.longitude))
+                update('ogn', position, latitude, longitude)
+
+            else:
+                message_type = '2' if '2' in current_aircraft.periods else '3'
+                record = utils.sbs1_parser.parse_sbs1_message(format_sbs1_message(message_type, current_aircraft, latitude, longitude, '2017/01/01', '12:00:00.000'))
+                update('sbs1', (record[2], record[3]) if record is not None else None, latitude, longitude)
+
+                # other message types only have to be parsed
+                for message_type in sorted(current_aircraft.periods):
+                    if utils.sbs1_parser.parse_sbs1_message(format_sbs1_message(message_type, current_aircraft, latitude, longitude, '2017/01/01', '12:00:00.000')) is None:
+                        results['sbs1'][1] += 1
+
+    return dict([(kind, tuple(result)) for kind, result in results.items()])
+
+
+def get_nominal_rate(scenario):
+    # messages per second of all aircraft (own-ship generates GGA and RMC)
+    own_ship, aircraft = create_aircraft(scenario)
+    rate = 2.0 * sum(1.0 / period for period in own_ship.periods.values())
+    for current_aircraft in aircraft:
+        rate += sum(1.0 / period for period in current_aircraft.periods.values())
+
+    return rate
+
+
+def consume(data_hub, result_queue):
+    # count items per content type and collect age of items at arrival until poison pill
+    counts = {}
+    ages = []
+    while True:
+        data_hub_item = data_hub.get()
+        if data_hub_item is None:
+            break
+
+        now = time.monotonic()
+        data_hub_items = data_hub_item.get_items() if type(data_hub_item) is DataHubBatch else [data_hub_item]
+        for data_hub_item in data_hub_items:
+            content_type = data_hub_item.get_content_type()
+            counts[content_type] = counts.get(content_type, 0) + 1
+            ages.append(now - data_hub_item.get_timestamp())
+
+    result_queue.put((counts, sorted(ages)))
+
+
+def run(scenario, duration):
+    data_hub = Queue()
+    result_queue = Queue()
+    consumer = Process(target=consume, args=(data_hub, result_queue))
+    consumer.start()
+
+    input_scenario_generator = InputScenarioGenerator(data_hub, scenario, duration=duration)
+
+    input_scenario_generator.start()
+    input_scenario_generator.join()
+
+    data_hub.put(None)
+    counts, ages = result_queue.get()
+    consumer.join()
+
+    return counts, ages
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of the scenario generator.')
+    arg_parser.add_argument('--scenario', dest='scenario', default=DEFAULT_SCENARIO, help='scenario file')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=10.0, help='seconds of generated traffic')
+    args = arg_parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+
+    # formats (OGN error includes truncation to 128e-7 degrees and the !W extension, which the parser adds independent of hemisphere)
+    for kind, (count, failures, max_error) in sorted(verify_formats(scenario).items()):
+        print('{:<5} {:>6d} messages, {:d} parse failures, maximum position error {:.1f} m'.format(kind, count, failures, max_error))
+
+    nominal_rate = get_nominal_rate(scenario)
+    counts, ages = run(scenario, args.duration)
+    count = sum(counts.values())
+    rate = count / args.duration
+    print('{:.0f} messages/s generated ({}), {:.0f} messages/s nominal ({:.1f}%), age at consumer p50 {:.1f} ms, p99 {:.1f} ms'.format(
+        rate, ', '.join('{} {:d}'.format(content_type, counts[content_type]) for content_type in sorted(counts)), nominal_rate, rate * 100.0 / nominal_rate,
+        ages[len(ages) // 2] * 1e3, ages[int(len(ages) * 0.99)] * 1e3))
+
+
+if __name__ == "__main__":
+    main()
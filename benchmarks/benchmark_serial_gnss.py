@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""benchmark_serial_gnss.py: Replays an NMEA log through a fake GNSS device (pseudo terminal) and reads it with the
+original blocking readline() loop and with the asyncio SerialGnssReader. Verifies that the reader forwards every
+desired sentence of the log exactly once and compares the number of forwarded data hub items and CPU time.
+
+Requires pyserial. Run from repository root: python3 -m benchmarks.benchmark_serial_gnss [log]"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+import serial
+
+from input.input_serial_gnss import DEFAULT_SENTENCE_TYPES, SerialGnssReader
+from utils.fake_gnss_device import DEFAULT_LOG, FakeGnssDevice, load_epochs
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class CollectingBatcher(object):
+    """
+    Stand-in for DataHubBatcher that keeps the data of all items.
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def put(self, data_hub_item):
+        self.items.append(data_hub_item.get_content_data())
+
+    def flush(self):
+        pass
+
+
+def legacy_read(port, baud_rate, items, stop_event):
+    # original read loop of InputSerialGnss.run() (every line is forwarded)
+    s = serial.Serial(port, baud_rate, timeout=0.05)
+
+    while not stop_event.is_set():
+        line = s.readline().decode().strip()
+        if not line:
+            continue
+
+        items.append(line)
+
+    s.close()
+
+
+def run_legacy(fake_gnss_device, duration, baud_rate):
+    items = []
+    stop_event = threading.Event()
+    thread = threading.Thread(target=legacy_read, args=(fake_gnss_device.get_port(), baud_rate, items, stop_event))
+    thread.start()
+
+    # wait until reader is attached before replaying
+    time.sleep(0.2)
+    fake_gnss_device.start()
+    time.sleep(duration)
+    fake_gnss_device.stop()
+    time.sleep(0.2)
+
+    stop_event.set()
+    thread.join()
+
+    return items
+
+
+def run_reader(fake_gnss_device, duration, baud_rate):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    batcher = CollectingBatcher()
+    s = serial.Serial(fake_gnss_device.get_port(), baud_rate, timeout=0)
+    serial_gnss_reader = SerialGnssReader(serial_port=s, data_hub_batcher=batcher, sentence_types=DEFAULT_SENTENCE_TYPES)
+    loop.add_reader(s.fileno(), serial_gnss_reader.read)
+
+    fake_gnss_device.start()
+    loop.run_until_complete(asyncio.sleep(duration))
+    fake_gnss_device.stop()
+    loop.run_until_complete(asyncio.sleep(0.2))
+
+    loop.remove_reader(s.fileno())
+    s.close()
+    loop.close()
+
+    return batcher.items
+
+
+def measure(name, run, epochs, args):
+    fake_gnss_device = FakeGnssDevice(epochs, interval=1.0 / args.rate, repeat=False)
+
+    start = time.process_time()
+    items = run(fake_gnss_device, args.duration, args.baud_rate)
+    cpu_time = time.process_time() - start
+
+    epoch_count = fake_gnss_device.get_epoch_count()
+    fake_gnss_device.close()
+
+    print('{:<20} {:>6d} epochs, {:>6d} items to data hub, CPU {:.3f} s ({:.0f} us/epoch)'.format(name, epoch_count, len(items), cpu_time, cpu_time / max(epoch_count, 1) * 1e6))
+
+    return items, epoch_count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Replay of NMEA log through fake GNSS device.')
+    arg_parser.add_argument('log', nargs='?', default=DEFAULT_LOG, help='NMEA log')
+    arg_parser.add_argument('--rate', dest='rate', type=float, default=100.0, help='epochs per second')
+    arg_parser.add_argument('--duration', dest='duration', type=float, default=3.0, help='replay duration in seconds')
+    arg_parser.add_argument('--baud-rate', dest='baud_rate', type=int, default=115200, help='baud rate of serial port')
+    args = arg_parser.parse_args()
+
+    epochs = load_epochs(args.log)
+
+    measure('original readline', run_legacy, epochs, args)
+    items, epoch_count = measure('SerialGnssReader', run_reader, epochs, args)
+
+    # expected: desired sentences of replayed epochs in order
+    sentence_types = tuple(DEFAULT_SENTENCE_TYPES)
+    expected = [sentence.decode('ascii') for epoch in epochs[:epoch_count] for sentence in epoch.split(b'\r\n') if sentence[3:6].decode('ascii', 'replace') in sentence_types]
+    print('SerialGnssReader: {}'.format('OK (all desired sentences forwarded once)' if items == expected else 'FAILED ({} of {} sentences)'.format(len(items), len(expected))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+"""benchmark_traffic_geometry.py: Compares the traffic geometry of one processing cycle computed per aircraft with
+vincenty and initial bearing (original implementation) with utils.traffic_geometry (NumPy and pure Python). Verifies
+that relative positions are within the stated tolerance before measuring run time.
+
+Requires geopy for the reference implementation. Run from repository root: python3 -m benchmarks.benchmark_traffic_geometry"""
+
+import argparse
+import math
+import random
+import time
+
+from geopy.distance import vincenty
+
+try:
+    from geographiclib.geodesic import Geodesic
+except ImportError:
+    # geographiclib is installed together with recent geopy versions
+    Geodesic = None
+
+import utils.calculation
+import utils.traffic_geometry
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+# tolerance with respect to original implementation (the original bearing is spherical, i.e., deviates from the
+# ellipsoidal azimuth by up to 0.2 deg itself)
+DISTANCE_TOLERANCE = 1e-4
+BEARING_TOLERANCE_DEG = 0.2
+
+FLARM_RANGE_M = 45000.0
+
+
+def generate_traffic(count, own_latitude, own_longitude, seed):
+    # aircraft uniformly distributed within FLARM range
+    rng = random.Random(seed)
+    traffic = []
+
+    for i in range(count):
+        distance = FLARM_RANGE_M * math.sqrt(rng.random())
+        bearing = rng.uniform(0.0, 2.0 * math.pi)
+
+        latitude = own_latitude + math.degrees(distance * math.cos(bearing) / 6367000.0)
+        longitude = own_longitude + math.degrees(distance * math.sin(bearing) / (6389000.0 * math.cos(math.radians(own_latitude))))
+        longitude = (longitude + 180.0) % 360.0 - 180.0
+
+        traffic.append(('{:06X}'.format(i), latitude, longitude))
+
+    return traffic
+
+
+def legacy_geometry(own_latitude, own_longitude, traffic):
+    # original per aircraft calculation of generate_flarm_messages
+    results = {}
+
+    for identifier, latitude, longitude in traffic:
+        distance_m = vincenty((own_latitude, own_longitude), (latitude, longitude)).meters
+        initial_bearing = utils.calculation.initial_bearing(own_latitude, own_longitude, latitude, longitude)
+        utils.calculation.final_bearing(own_latitude, own_longitude, latitude, longitude)
+
+        results[identifier] = (utils.calculation.distance_north(initial_bearing, distance_m), utils.calculation.distance_east(initial_bearing, distance_m), distance_m, initial_bearing)
+
+    return results
+
+
+def batch_geometry(own_latitude, own_longitude, traffic, use_numpy):
+    traffic_geometry = utils.traffic_geometry.TrafficGeometry(use_numpy=use_numpy)
+
+    for identifier, latitude, longitude in traffic:
+        traffic_geometry.add(identifier, latitude, longitude)
+
+    return traffic_geometry.compute(own_latitude, own_longitude)
+
+
+def bearing_difference(bearing1, bearing2):
+    return abs((bearing1 - bearing2 + 180.0) % 360.0 - 180.0)
+
+
+def compare(reference, results):
+    max_distance_error = 0.0
+    max_bearing_error = 0.0
+
+    for identifier, (north, east, distance, bearing) in reference.items():
+        result = results[identifier]
+
+        max_distance_error = max(max_distance_error, abs(result.distance - distance) / distance)
+        max_bearing_error = max(max_bearing_error, bearing_difference(result.bearing, bearing))
+
+    return max_distance_error, max_bearing_error
+
+
+def compare_azimuth(own_latitude, own_longitude, traffic, results):
+    # maximum deviation from ellipsoidal initial azimuth
+    max_bearing_error = 0.0
+
+    for identifier, latitude, longitude in traffic:
+        azimuth = Geodesic.WGS84.Inverse(own_latitude, own_longitude, latitude, longitude)['azi1'] % 360.0
+        max_bearing_error = max(max_bearing_error, bearing_difference(results[identifier].bearing, azimuth))
+
+    return max_bearing_error
+
+
+def measure(name, function, repetitions):
+    start = time.perf_counter()
+    for i in range(repetitions):
+        function()
+    duration = (time.perf_counter() - start) / repetitions
+
+    print('{:<30} {:>10.3f} ms/cycle'.format(name, duration * 1000.0))
+
+    return duration
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of traffic geometry calculation.')
+    arg_parser.add_argument('--aircraft', dest='aircraft', type=int, default=200, help='number of aircraft per cycle')
+    arg_parser.add_argument('--repetitions', dest='repetitions', type=int, default=20, help='number of cycles')
+    args = arg_parser.parse_args()
+
+    # verify tolerance at various own positions (including high latitudes and date line)
+    failed = False
+    for own_latitude, own_longitude in [(47.45, 8.56), (0.0, 0.0), (-33.9, 18.6), (64.1, -21.9), (78.2, 15.6), (52.0, 179.9)]:
+        traffic = generate_traffic(1000, own_latitude, own_longitude, seed=1)
+        reference = legacy_geometry(own_latitude, own_longitude, traffic)
+
+        for use_numpy in [True, False]:
+            results = batch_geometry(own_latitude, own_longitude, traffic, use_numpy)
+            distance_error, bearing_error = compare(reference, results)
+            ok = distance_error <= DISTANCE_TOLERANCE and bearing_error <= BEARING_TOLERANCE_DEG
+            failed = failed or not ok
+
+            azimuth_error = ''
+            if Geodesic is not None:
+                azimuth_error = ', vs. ellipsoidal azimuth={:.4f} deg'.format(compare_azimuth(own_latitude, own_longitude, traffic, results))
+
+            print('lat={:6.1f} lon={:6.1f} {:<6} max distance error={:.1e}, max bearing error={:.4f} deg{} {}'.format(
+                own_latitude, own_longitude, 'numpy' if use_numpy else 'python', distance_error, bearing_error, azimuth_error, 'OK' if ok else 'FAILED'))
+
+    print('Tolerance: distance {:.0e} (relative), bearing {} deg: {}'.format(DISTANCE_TOLERANCE, BEARING_TOLERANCE_DEG, 'FAILED' if failed else 'OK'))
+    print()
+
+    own_latitude, own_longitude = 47.45, 8.56
+    traffic = generate_traffic(args.aircraft, own_latitude, own_longitude, seed=2)
+
+    print('{} aircraft per cycle'.format(args.aircraft))
+    legacy_duration = measure('original implementation', lambda: legacy_geometry(own_latitude, own_longitude, traffic), args.repetitions)
+    if utils.traffic_geometry.numpy is not None:
+        numpy_duration = measure('traffic_geometry (numpy)', lambda: batch_geometry(own_latitude, own_longitude, traffic, True), args.repetitions)
+        print('Speed-up: {:.1f}x'.format(legacy_duration / numpy_duration))
+    python_duration = measure('traffic_geometry (python)', lambda: batch_geometry(own_latitude, own_longitude, traffic, False), args.repetitions)
+    print('Speed-up: {:.1f}x'.format(legacy_duration / python_duration))
+
+
+if __name__ == "__main__":
+    main()
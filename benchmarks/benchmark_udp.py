@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+"""benchmark_udp.py: Sends synthetic NMEA/FLARM batches (see benchmark_airconnect) with the UDP output to several
+receivers on loopback (multicast group, or unicast to one receiver with --host 127.0.0.1), and with the AirConnect
+server to the same number of TCP clients. Verifies that every receiver gets all sentences in order without gaps in
+sequence numbers and compares CPU time per tick.
+
+Run from repository root: python3 -m benchmarks.benchmark_udp"""
+
+import argparse
+import asyncio
+import ipaddress
+import socket
+import struct
+import time
+
+from benchmarks.benchmark_airconnect import generate_batches, read_all, send_coalesced
+from output.output_network_airconnect import AirConnectServerClientProtocol, DEFAULT_PROFILE, create_profiles, encode_items
+from output.output_network_udp import UdpSender, create_socket, parse_datagram
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+def create_receiver(host, port):
+    receiver_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    receiver_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+
+    if ipaddress.ip_address(host).is_multicast:
+        receiver_socket.bind(('', port))
+        membership = struct.pack('4s4s', socket.inet_aton(host), socket.inet_aton('127.0.0.1'))
+        receiver_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    else:
+        receiver_socket.bind((host, port))
+
+    receiver_socket.setblocking(False)
+
+    return receiver_socket
+
+
+def receive_all(receiver_socket):
+    datagrams = []
+    while True:
+        try:
+            datagrams.append(receiver_socket.recv(65536))
+        except BlockingIOError:
+            return datagrams
+
+
+def check_receiver(datagrams, expected_sentences):
+    sentences = []
+    gaps = 0
+    last_sequence_number = None
+
+    for datagram in datagrams:
+        sequence_number, datagram_sentences = parse_datagram(datagram)
+        if last_sequence_number is not None and sequence_number != (last_sequence_number + 1) % 65536:
+            gaps += 1
+        last_sequence_number = sequence_number
+        sentences.extend(datagram_sentences)
+
+    return sentences == expected_sentences and gaps == 0
+
+
+def run_udp(batches, receiver_count, host, port, payload_size):
+    receiver_sockets = [create_receiver(host, port) for i in range(receiver_count)]
+
+    udp_socket = create_socket(host, port, interface='127.0.0.1')
+    udp_sender = UdpSender(udp_socket, (host, port), create_profiles()[DEFAULT_PROFILE], payload_size=payload_size)
+
+    received = [[] for receiver_socket in receiver_sockets]
+    cpu_time = 0.0
+    for data_hub_items in batches:
+        # one batch per tick
+        start = time.process_time()
+        udp_sender.put(data_hub_items)
+        udp_sender.flush()
+        cpu_time += time.process_time() - start
+
+        for receiver_datagrams, receiver_socket in zip(received, receiver_sockets):
+            receiver_datagrams.extend(receive_all(receiver_socket))
+
+    time.sleep(0.1)
+    for receiver_datagrams, receiver_socket in zip(received, receiver_sockets):
+        receiver_datagrams.extend(receive_all(receiver_socket))
+        receiver_socket.close()
+    udp_socket.close()
+
+    return cpu_time, udp_sender.get_statistics(), received
+
+
+def run_tcp(batches, client_count):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    clients = set()
+    profiles = create_profiles()
+    server = loop.run_until_complete(loop.create_server(lambda: AirConnectServerClientProtocol(loop=loop, clients=clients, profiles=profiles), host='127.0.0.1', port=0))
+    port = server.sockets[0].getsockname()[1]
+
+    connections = [loop.run_until_complete(asyncio.open_connection('127.0.0.1', port)) for i in range(client_count)]
+    read_tasks = [loop.create_task(read_all(reader, [])) for reader, writer in connections]
+    while len(clients) < client_count:
+        loop.run_until_complete(asyncio.sleep(0.01))
+
+    cpu_time = 0.0
+    for data_hub_items in batches:
+        start = time.process_time()
+        send_coalesced(clients, data_hub_items)
+        cpu_time += time.process_time() - start
+
+        loop.run_until_complete(asyncio.sleep(0))
+
+    for reader, writer in connections:
+        writer.close()
+    loop.run_until_complete(asyncio.wait(read_tasks))
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+
+    return cpu_time
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark of UDP output with several receivers on loopback.')
+    arg_parser.add_argument('--host', dest='host', default='239.255.10.110', help='multicast group or unicast address of receivers')
+    arg_parser.add_argument('--port', dest='port', type=int, default=10110, help='UDP port')
+    arg_parser.add_argument('--receivers', dest='receivers', type=int, default=8, help='number of receivers (1 for unicast)')
+    arg_parser.add_argument('--batches', dest='batches', type=int, default=1000, help='number of batches (ticks)')
+    arg_parser.add_argument('--targets', dest='targets', type=int, default=30, help='traffic sentences per batch')
+    arg_parser.add_argument('--payload-size', dest='payload_size', type=int, default=1472, help='maximum datagram size in bytes')
+    args = arg_parser.parse_args()
+
+    receiver_count = args.receivers if ipaddress.ip_address(args.host).is_multicast else 1
+
+    batches = generate_batches(args.batches, args.targets)
+    expected_sentences = [chunk[:-2] for data_hub_items in batches for is_traffic, sentence_type, timestamp, chunk in encode_items(data_hub_items)]
+
+    for count in sorted(set([1, receiver_count])):
+        cpu_time, statistics, received = run_udp(batches, count, args.host, args.port, args.payload_size)
+        ok_count = sum(1 for datagrams in received if check_receiver(datagrams, expected_sentences))
+        print('UDP {:<15} {:>2d} receivers: CPU {:6.1f} us/tick, {:.1f} datagrams/tick, {} of {} receivers complete without gaps'.format(
+            args.host, count, cpu_time / len(batches) * 1e6, statistics['datagrams'] / len(batches), ok_count, count))
+
+        tcp_cpu_time = run_tcp(batches, count)
+        print('TCP AirConnect      {:>2d} clients:   CPU {:6.1f} us/tick'.format(count, tcp_cpu_time / len(batches) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
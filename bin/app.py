@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 #
 
+import os
+import tempfile
+
 import web
 from web import form
 
@@ -27,8 +30,10 @@ class Index(object):
         flightMODECsep = "modec_sep: %s" % (form.modecsep)
         flightMODECdet = "modec_det: %s" % (form.modecdet)
         
-        target = open(filename, 'w')
-        target.truncate()
+        # write to temporary file and rename it, so FlightBox never reads a partially written file (it reloads the
+        # settings when the modification time of the file changes, no reboot required)
+        file_descriptor, temporary_filename = tempfile.mkstemp(prefix='.pcasconf', dir=os.path.dirname(os.path.abspath(filename)))
+        target = os.fdopen(file_descriptor, 'w')
         target.write("[DEFAULT]")
        # target.write("\n")
        # target.write(flightID)
@@ -39,14 +44,13 @@ class Index(object):
         target.write("\n")
         target.write(flightMODECdet)
         target.write("\n")
+        target.flush()
+        os.fsync(target.fileno())
         target.close()
-		
-        for i in range(1,10):
-           print 'REBOOT',i
-           #Do your code here
-           time.sleep(1)
-           os.system("sudo reboot")
-		   
+        os.chmod(temporary_filename, 0o644)
+        os.rename(temporary_filename, filename)
+
+        return render.index(greeting)
     
 if __name__ == "__main__":
     app.run()
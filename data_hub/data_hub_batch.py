@@ -0,0 +1,25 @@
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class DataHubBatch(object):
+    """
+    This class is a frame of DataHubItems that is exchanged via the data hub as a single entry. Handing over many items
+    at once amortizes pickling and queue handling costs.
+    """
+
+    def __init__(self, data_hub_items):
+        self.__data_hub_items = data_hub_items
+
+    def __str__(self):
+        return '(batch) ' + str(len(self.__data_hub_items)) + ' items'
+
+    def __len__(self):
+        return len(self.__data_hub_items)
+
+    def __iter__(self):
+        return iter(self.__data_hub_items)
+
+    def get_items(self):
+        return self.__data_hub_items
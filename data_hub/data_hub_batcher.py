@@ -0,0 +1,84 @@
+import time
+
+from data_hub.data_hub_batch import DataHubBatch
+from utils.metrics import NULL_COUNTER
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class DataHubBatcher(object):
+    """
+    Collects DataHubItems of a producer and hands them over to the data hub as DataHubBatch frames. A frame is flushed
+    as soon as it holds max_items items or its oldest item has waited max_latency seconds.
+
+    If an asyncio loop is given, the deadline flush is scheduled on that loop. Otherwise, the producer has to call
+    poll() regularly (e.g., after a read timeout).
+
+    Handed over items are counted with the messages_out counter (see utils/metrics.py), if given.
+    """
+
+    def __init__(self, data_hub, max_items=64, max_latency=0.05, loop=None, messages_out=None):
+        # store arguments in object variables
+        self._data_hub = data_hub
+        self._max_items = max_items
+        self._max_latency = max_latency
+        self._loop = loop
+        self._messages_out = messages_out if messages_out is not None else NULL_COUNTER
+
+        # initialize current frame
+        self._items = []
+        self._deadline = None
+        self._flush_handle = None
+
+    def put(self, data_hub_item):
+        # start new frame if required
+        if not self._items:
+            self._deadline = time.monotonic() + self._max_latency
+
+            if self._loop is not None:
+                self._flush_handle = self._loop.call_later(self._max_latency, self.flush)
+
+        self._items.append(data_hub_item)
+
+        # flush frame if it is full or overdue
+        if len(self._items) >= self._max_items or time.monotonic() >= self._deadline:
+            self.flush()
+
+    def poll(self):
+        """
+        :return: Seconds until the current frame is due, or None if no frame is pending
+        """
+
+        if not self._items:
+            return None
+
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0.0:
+            self.flush()
+            return None
+
+        return remaining
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._items:
+            return
+
+        self._messages_out.inc(len(self._items))
+
+        # single items are handed over as they are to avoid frame overhead
+        if len(self._items) == 1:
+            self._data_hub.put(self._items[0])
+        else:
+            self._data_hub.put(DataHubBatch(self._items))
+
+        self._items = []
+        self._deadline = None
+
+    def get_max_latency(self):
+        return self._max_latency
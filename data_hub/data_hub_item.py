@@ -1,22 +1,131 @@
+import pickle
+import struct
+import time
+
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
 
+# source identifiers of producing modules
+SOURCE_UNKNOWN = 0
+SOURCE_INPUT_SBS1 = 1
+SOURCE_INPUT_OGN = 2
+SOURCE_INPUT_GNSS = 3
+SOURCE_TRANSFORMATION_FLARM = 4
+SOURCE_DATA_HUB = 5
+SOURCE_TEST = 6
+
+# content type codes of compact byte encoding (other content types are encoded by name)
+CONTENT_TYPE_CODES = {'sbs1': 1, 'ogn': 2, 'nmea': 3, 'flarm': 4, 'stats': 5, 'test': 6, 'sbs1_parsed': 7}
+CONTENT_TYPE_NAMES = dict([(code, content_type) for content_type, code in CONTENT_TYPE_CODES.items()])
+
+# content data encodings
+DATA_STR = 0
+DATA_BYTES = 1
+DATA_PICKLE = 2
+
+# header of compact byte encoding: content type code, content data encoding, timestamp, source identifier
+HEADER = struct.Struct('<BBdH')
+
+
 class DataHubItem(object):
     """
     This class is the main data container for exchanging information between different modules.
+
+    Besides content type and data, each item carries the monotonic time it was received at and the identifier of the
+    module that generated it. Items are pickled as plain tuples and can be converted to a compact byte representation
+    (to_bytes/from_bytes).
     """
 
-    def __init__(self, content_type, content_data):
+    __slots__ = ('__content_type', '__content_data', '__timestamp', '__source_id')
+
+    def __init__(self, content_type, content_data, timestamp=None, source_id=SOURCE_UNKNOWN):
         self.__content_type = content_type
         self.__content_data = content_data
+        self.__timestamp = timestamp if timestamp is not None else time.monotonic()
+        self.__source_id = source_id
 
     def __str__(self):
-        return '(' + self.__content_type + ') "' + self.__content_data + '"'
+        return '(' + self.__content_type + ') "' + str(self.__content_data) + '"'
+
+    def __reduce__(self):
+        return (DataHubItem, (self.__content_type, self.__content_data, self.__timestamp, self.__source_id))
 
     def get_content_type(self):
         return self.__content_type
 
     def get_content_data(self):
         return self.__content_data
+
+    def get_timestamp(self):
+        return self.__timestamp
+
+    def get_source_id(self):
+        return self.__source_id
+
+    def to_bytes(self):
+        """
+        :return: Compact byte representation: header, content type name (only if no code is defined), content data
+        """
+
+        content_data = self.__content_data
+        if type(content_data) is str:
+            data_encoding = DATA_STR
+            payload = content_data.encode()
+        elif type(content_data) is bytes:
+            data_encoding = DATA_BYTES
+            payload = content_data
+        else:
+            data_encoding = DATA_PICKLE
+            payload = pickle.dumps(content_data, protocol=pickle.HIGHEST_PROTOCOL)
+
+        content_type_code = CONTENT_TYPE_CODES.get(self.__content_type, 0)
+        header = HEADER.pack(content_type_code, data_encoding, self.__timestamp, self.__source_id)
+
+        if content_type_code == 0:
+            content_type = self.__content_type.encode()
+            return header + bytes([len(content_type)]) + content_type + payload
+
+        return header + payload
+
+    @staticmethod
+    def from_bytes(data):
+        """
+        :param data: Byte representation as returned by to_bytes
+        :return: DataHubItem
+        """
+
+        content_type_code, data_encoding, timestamp, source_id = HEADER.unpack_from(data)
+        payload_start = HEADER.size
+
+        if content_type_code == 0:
+            content_type_length = data[payload_start]
+            content_type = bytes(data[payload_start + 1:payload_start + 1 + content_type_length]).decode()
+            payload_start += 1 + content_type_length
+        else:
+            content_type = CONTENT_TYPE_NAMES[content_type_code]
+
+        payload = data[payload_start:]
+        if data_encoding == DATA_STR:
+            content_data = bytes(payload).decode()
+        elif data_encoding == DATA_BYTES:
+            content_data = bytes(payload)
+        else:
+            content_data = pickle.loads(payload)
+
+        return DataHubItem(content_type, content_data, timestamp, source_id)
+
+    @staticmethod
+    def content_type_from_bytes(data):
+        """
+        :param data: Byte representation as returned by to_bytes (only header is evaluated)
+        :return: Content type of encoded item
+        """
+
+        content_type_code = data[0]
+        if content_type_code == 0:
+            content_type_length = data[HEADER.size]
+            return bytes(data[HEADER.size + 1:HEADER.size + 1 + content_type_length]).decode()
+
+        return CONTENT_TYPE_NAMES[content_type_code]
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from queue import Empty
+from threading import Thread
+
+from data_hub.data_hub_batch import DataHubBatch
+from data_hub.data_hub_item import DataHubItem
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class DataHubQueueBridge(object):
+    """
+    Bridges a data input queue into an asyncio loop. A single long-lived reader thread blocks on the queue, drains all
+    items that are available right away, and hands them over to the loop with one call_soon_threadsafe() per wake-up.
+
+    Frames are unpacked, i.e., get() returns a list of DataHubItems, or None after the poison pill has been received.
+    """
+
+    def __init__(self, loop, data_input_queue, max_items=256, name='DataHubQueueBridge'):
+        # configure logging
+        self._logger = logging.getLogger(name)
+
+        # store arguments in object variables
+        self._loop = loop
+        self._data_input_queue = data_input_queue
+        self._max_items = max_items
+
+        # initialize asyncio queue that holds lists of items
+        self._items = asyncio.Queue()
+
+        # initialize reader thread (daemon thread does not block process termination)
+        self._thread = Thread(target=self._run, name=name)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def _append(self, data_hub_items, data_hub_item):
+        if type(data_hub_item) is DataHubBatch:
+            data_hub_items.extend(data_hub_item.get_items())
+        elif type(data_hub_item) is DataHubItem:
+            data_hub_items.append(data_hub_item)
+        else:
+            self._logger.warning('Dropping data (wrong data type)')
+
+    def _run(self):
+        while True:
+            # wait for next item (blocking call)
+            data_hub_item = self._data_input_queue.get()
+
+            # drain all items that are available already
+            data_hub_items = []
+            while data_hub_item is not None:
+                self._append(data_hub_items, data_hub_item)
+
+                if len(data_hub_items) >= self._max_items:
+                    break
+
+                try:
+                    data_hub_item = self._data_input_queue.get(block=False)
+                except Empty:
+                    break
+
+            if data_hub_items:
+                self._loop.call_soon_threadsafe(self._items.put_nowait, data_hub_items)
+
+            # forward poison pill and exit thread
+            if data_hub_item is None:
+                self._loop.call_soon_threadsafe(self._items.put_nowait, None)
+                break
+
+    def get(self):
+        """
+        :return: Awaitable that returns a list of DataHubItems, or None after the poison pill has been received
+        """
+
+        return self._items.get()
@@ -0,0 +1,372 @@
+import logging
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+import queue
+import struct
+import time
+
+from data_hub.data_hub_batch import DataHubBatch
+from data_hub.data_hub_item import CONTENT_TYPE_CODES, HEADER as ITEM_HEADER, DataHubItem
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8: fall back to anonymous shared memory inherited by sub-processes
+    shared_memory = None
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+# shared memory layout: header, reader slots, data area
+HEADER = struct.Struct('<QQQ')          # write position, tail position (oldest valid record), closed flag
+READER_SLOT = struct.Struct('<QQQ')     # active flag, read cursor, dropped records
+RECORD_HEADER = struct.Struct('<I')     # record length (without header), followed by DataHubItem.to_bytes()
+
+POLICY_DROP_OLDEST = 'drop_oldest'
+POLICY_BACKPRESSURE = 'backpressure'
+
+
+def encode_record(data_hub_item):
+    """
+    :param data_hub_item: DataHubItem to be encoded
+    :return: Record bytes (length and compact item representation)
+    """
+
+    data = data_hub_item.to_bytes()
+
+    return RECORD_HEADER.pack(len(data)) + data
+
+
+def decode_record(record):
+    """
+    :param record: Record bytes as generated by encode_record
+    :return: Decoded DataHubItem
+    """
+
+    return DataHubItem.from_bytes(memoryview(record)[RECORD_HEADER.size:])
+
+
+class DataHubRingBuffer(object):
+    """
+    Data hub backend based on a ring buffer in shared memory. Producers write each record exactly once, and every
+    subscriber reads it with its own cursor and filters content types itself. Hence, no DataHubWorker process is
+    required and items are not copied once per subscriber.
+
+    Slow subscribers are handled according to policy: 'drop_oldest' overwrites records that have not been read yet,
+    'backpressure' blocks producers for up to backpressure_timeout seconds before dropping the oldest records.
+    """
+
+    def __init__(self, size=4 * 1024 * 1024, max_readers=16, policy=POLICY_DROP_OLDEST, backpressure_timeout=1.0):
+        # configure logging
+        self._logger = logging.getLogger('DataHubRingBuffer')
+        self._logger.info('Initializing')
+
+        if policy not in [POLICY_DROP_OLDEST, POLICY_BACKPRESSURE]:
+            raise ValueError('Unknown slow consumer policy: {}'.format(policy))
+
+        # store arguments in object variables
+        self._capacity = size
+        self._max_readers = max_readers
+        self._policy = policy
+        self._backpressure_timeout = backpressure_timeout
+
+        # calculate layout
+        self._data_offset = HEADER.size + max_readers * READER_SLOT.size
+
+        # allocate shared memory
+        total_size = self._data_offset + self._capacity
+        if shared_memory:
+            self._shared_memory = shared_memory.SharedMemory(create=True, size=total_size)
+            self._raw_array = None
+        else:
+            self._shared_memory = None
+            self._raw_array = RawArray('B', total_size)
+        self._map_buffer()
+
+        # condition protects all shared state and wakes up waiting readers/writers
+        self._condition = multiprocessing.Condition()
+
+        # initialize number of registered readers
+        self._reader_count = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+
+        # memory views cannot be pickled (re-mapped in child process)
+        del state['_buffer']
+        del state['_data']
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._map_buffer()
+
+    def _map_buffer(self):
+        if self._shared_memory:
+            self._buffer = self._shared_memory.buf
+        else:
+            self._buffer = memoryview(self._raw_array).cast('B')
+
+        self._data = self._buffer[self._data_offset:self._data_offset + self._capacity]
+
+    def _read_header(self):
+        return HEADER.unpack_from(self._buffer, 0)
+
+    def _write_header(self, write_position, tail_position, closed):
+        HEADER.pack_into(self._buffer, 0, write_position, tail_position, closed)
+
+    def _read_slot(self, slot):
+        return READER_SLOT.unpack_from(self._buffer, HEADER.size + slot * READER_SLOT.size)
+
+    def _write_slot(self, slot, active, cursor, dropped):
+        READER_SLOT.pack_into(self._buffer, HEADER.size + slot * READER_SLOT.size, active, cursor, dropped)
+
+    def _copy_in(self, position, data):
+        start = position % self._capacity
+        end = start + len(data)
+
+        if end <= self._capacity:
+            self._data[start:end] = data
+        else:
+            split = self._capacity - start
+            self._data[start:] = data[:split]
+            self._data[:end - self._capacity] = data[split:]
+
+    def _copy_out(self, position, length):
+        start = position % self._capacity
+        end = start + length
+
+        if end <= self._capacity:
+            return bytes(self._data[start:end])
+
+        return bytes(self._data[start:]) + bytes(self._data[:end - self._capacity])
+
+    def _record_size(self, position):
+        length = RECORD_HEADER.unpack(self._copy_out(position, RECORD_HEADER.size))[0]
+
+        return RECORD_HEADER.size + length
+
+    def _min_reader_cursor(self, write_position):
+        min_cursor = write_position
+
+        for slot in range(self._reader_count):
+            active, cursor, dropped = self._read_slot(slot)
+            if active and cursor < min_cursor:
+                min_cursor = cursor
+
+        return min_cursor
+
+    def _release_space(self, write_position, tail_position, required):
+        # collect start positions of all records that have to be overwritten
+        released = []
+        while write_position + required - tail_position > self._capacity:
+            released.append(tail_position)
+            tail_position += self._record_size(tail_position)
+
+        if released:
+            # account dropped records to all readers that did not read them yet
+            for slot in range(self._reader_count):
+                active, cursor, dropped = self._read_slot(slot)
+                if active and cursor < tail_position:
+                    lost = len([position for position in released if position >= cursor])
+                    self._write_slot(slot, active, tail_position, dropped + lost)
+
+        return tail_position
+
+    def put(self, data_hub_item):
+        # poison pill closes the data hub for all readers
+        if data_hub_item is None:
+            self.shutdown()
+            return
+
+        # encode records once (outside of lock)
+        if type(data_hub_item) is DataHubBatch:
+            data = b''.join([encode_record(item) for item in data_hub_item.get_items()])
+        else:
+            data = encode_record(data_hub_item)
+
+        if len(data) > self._capacity:
+            self._logger.warning('Dropping data (larger than ring buffer)')
+            return
+
+        with self._condition:
+            write_position, tail_position, closed = self._read_header()
+
+            if self._policy == POLICY_BACKPRESSURE:
+                # wait for slowest reader to free enough space
+                deadline = time.monotonic() + self._backpressure_timeout
+                while write_position + len(data) - self._min_reader_cursor(write_position) > self._capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0.0:
+                        self._logger.warning('Backpressure timeout, dropping oldest data')
+                        break
+
+                    self._condition.wait(remaining)
+                    write_position, tail_position, closed = self._read_header()
+
+            # overwrite oldest records if required
+            tail_position = self._release_space(write_position, tail_position, len(data))
+
+            # append data and wake up readers
+            self._copy_in(write_position, data)
+            self._write_header(write_position + len(data), tail_position, closed)
+
+            self._condition.notify_all()
+
+    def shutdown(self):
+        with self._condition:
+            write_position, tail_position, closed = self._read_header()
+            self._write_header(write_position, tail_position, 1)
+
+            self._condition.notify_all()
+
+    def add_output_module(self, output_module):
+        if self._reader_count >= self._max_readers:
+            raise ValueError('Maximum number of ring buffer readers reached')
+
+        # register reader slot that starts at current write position
+        slot = self._reader_count
+        with self._condition:
+            write_position, tail_position, closed = self._read_header()
+            self._write_slot(slot, 1, write_position, 0)
+            self._reader_count += 1
+
+        reader = DataHubRingBufferReader(self, slot, output_module.get_desired_content_types())
+
+        # tell output module about reader (used like a queue)
+        output_module.set_data_input_queue(reader)
+
+        self._logger.debug('Output module added: ' + str(output_module))
+
+    def get_dropped(self, slot):
+        return self._read_slot(slot)[2]
+
+    def close(self):
+        # release mapping in this process (ring buffer stays available for others)
+        self._data.release()
+        self._buffer.release()
+
+        if self._shared_memory:
+            self._shared_memory.close()
+
+    def unlink(self):
+        # free shared memory (only called by the process that created the ring buffer)
+        if self._shared_memory:
+            self._shared_memory.unlink()
+
+
+class DataHubRingBufferReader(object):
+    """
+    Subscriber side of the DataHubRingBuffer. Provides the get() and close() methods of a queue, and returns all
+    available matching items of one wake-up as DataHubBatch.
+    """
+
+    def __init__(self, ring_buffer, slot, content_types, max_items=256):
+        # store arguments in object variables
+        self._ring_buffer = ring_buffer
+        self._slot = slot
+        self._max_items = max_items
+
+        # content types are compared by code (no decoding of records that are not of interest)
+        self._any = 'ANY' in content_types
+        self._content_types = frozenset(content_types)
+        self._content_type_codes = frozenset([CONTENT_TYPE_CODES[content_type] for content_type in content_types if content_type in CONTENT_TYPE_CODES])
+
+    def _read_records(self, cursor, write_position):
+        ring_buffer = self._ring_buffer
+        records = []
+        count = 0
+
+        while cursor < write_position and count < self._max_items:
+            record_header = ring_buffer._copy_out(cursor, RECORD_HEADER.size + ITEM_HEADER.size + 1)
+            record_size = RECORD_HEADER.size + RECORD_HEADER.unpack_from(record_header)[0]
+            content_type_code = record_header[RECORD_HEADER.size]
+
+            if self._any or content_type_code in self._content_type_codes:
+                records.append(ring_buffer._copy_out(cursor, record_size))
+            elif content_type_code == 0:
+                # content type without code is encoded by name
+                record = ring_buffer._copy_out(cursor, record_size)
+                if DataHubItem.content_type_from_bytes(record[RECORD_HEADER.size:]) in self._content_types:
+                    records.append(record)
+
+            cursor += record_size
+            count += 1
+
+        return records, cursor
+
+    def get(self, block=True, timeout=None):
+        ring_buffer = self._ring_buffer
+        deadline = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        while True:
+            with ring_buffer._condition:
+                write_position, tail_position, closed = ring_buffer._read_header()
+                active, cursor, dropped = ring_buffer._read_slot(self._slot)
+
+                # skip records that have been overwritten already
+                if cursor < tail_position:
+                    cursor = tail_position
+
+                if cursor < write_position:
+                    records, cursor = self._read_records(cursor, write_position)
+                    ring_buffer._write_slot(self._slot, active, cursor, dropped)
+
+                    # wake up producers waiting for free space
+                    if ring_buffer._policy == POLICY_BACKPRESSURE:
+                        ring_buffer._condition.notify_all()
+
+                elif closed:
+                    return None
+
+                else:
+                    records = []
+
+                    if not block:
+                        raise queue.Empty
+
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0.0:
+                            raise queue.Empty
+
+                    ring_buffer._condition.wait(remaining)
+
+            if records:
+                # decode outside of lock
+                data_hub_items = [decode_record(record) for record in records]
+
+                if len(data_hub_items) == 1:
+                    return data_hub_items[0]
+
+                return DataHubBatch(data_hub_items)
+
+    def get_dropped(self):
+        return self._ring_buffer.get_dropped(self._slot)
+
+    def get_pending(self):
+        """
+        :return: Number of bytes of records that have not been read yet (including records of other content types)
+        """
+
+        ring_buffer = self._ring_buffer
+        with ring_buffer._condition:
+            write_position, tail_position, closed = ring_buffer._read_header()
+            active, cursor, dropped = ring_buffer._read_slot(self._slot)
+
+        return write_position - max(cursor, tail_position)
+
+    def close(self):
+        # deactivate reader slot (ignored by backpressure from now on)
+        ring_buffer = self._ring_buffer
+        with ring_buffer._condition:
+            active, cursor, dropped = ring_buffer._read_slot(self._slot)
+            ring_buffer._write_slot(self._slot, 0, cursor, dropped)
+
+            ring_buffer._condition.notify_all()
@@ -1,8 +1,14 @@
+import json
 import logging
+from queue import Empty
 import setproctitle
+import time
 from multiprocessing import Process, Queue
 
-from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_batch import DataHubBatch
+from data_hub.data_hub_item import DataHubItem, SOURCE_DATA_HUB
+from utils.latency import LatencyProbe
+from utils.metrics import NULL_METRICS
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
@@ -13,9 +19,15 @@ class DataHubWorker(Process):
     """
     The DataHubWorker is the central data handling entity that receives DataHubItems from input and transformation
     modules and forwards them as requested by output and transformation modules.
+
+    Routing is precompiled into a table that maps each content type to the tuple of subscriber queues. Per content type
+    routing counters are published as 'stats' item every stats_interval seconds.
+
+    If latency_directory is set, the age of received items is recorded as stage 'input_to_hub' (see utils/latency.py).
+    Received items and deliveries to subscribers are counted in metrics (see utils/metrics.py), if given.
     """
 
-    def __init__(self, data_hub):
+    def __init__(self, data_hub, stats_interval=60.0, latency_directory=None, metrics=None):
         # call parent constructor
         super().__init__()
 
@@ -29,15 +41,53 @@ class DataHubWorker(Process):
         # initialize output modules
         self._output_modules = []
 
+        # initialize routing table (content type -> tuple of queues) and queues that subscribed to any content type
+        self._routes = {}
+        self._any_queues = ()
+
+        # initialize routing counters (content type -> [items, deliveries])
+        self._stats_interval = stats_interval
+        self._counters = {}
+
+        # store latency directory (probe is created in worker process)
+        self._latency_directory = latency_directory
+
+        # set metrics registry (disabled if not given)
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+
     def run(self):
         setproctitle.setproctitle("flightbox_datahubworker")
 
         self._logger.info('Running')
 
+        # check log level once instead of building debug strings for every item
+        debug_enabled = self._logger.isEnabledFor(logging.DEBUG)
+
+        latency_probe = None
+        if self._latency_directory is not None:
+            latency_probe = LatencyProbe(self._latency_directory, 'datahubworker')
+
+        messages_in = self._metrics.counter('flightbox_messages_in_total', process='DataHubWorker')
+        messages_out = self._metrics.counter('flightbox_messages_out_total', process='DataHubWorker')
+
+        stats_start = time.monotonic()
+
         while True:
             try:
-                # get new item from data hub
-                data_hub_item = self._data_hub.get()
+                # get new item from data hub (wake up in time for next stats message)
+                try:
+                    data_hub_item = self._data_hub.get(timeout=max(stats_start + self._stats_interval - time.monotonic(), 0.0))
+                except Empty:
+                    data_hub_item = False
+
+                # publish routing counters
+                now = time.monotonic()
+                if now - stats_start >= self._stats_interval:
+                    self._publish_stats(now - stats_start)
+                    stats_start = now
+
+                if data_hub_item is False:
+                    continue
 
                 # check if item is a poison pill
                 if data_hub_item is None:
@@ -45,22 +95,34 @@ class DataHubWorker(Process):
                     break
 
                 if type(data_hub_item) is DataHubItem:
-                    self._logger.debug('Received ' + str(data_hub_item))
-
-                    # iterate over all known output modules
-                    for output_module in self._output_modules:
-                        # check if received data type is in output module's requested data types
-                        if data_hub_item.get_content_type() in output_module['content_types'] \
-                                or 'ANY' in output_module['content_types']:
-                            self._logger.debug('Passing data to ' + str(output_module['output_module']))
-                            # forward data via queue
-                            output_module['queue'].put(data_hub_item)
+                    if debug_enabled:
+                        self._logger.debug('Received ' + str(data_hub_item))
+
+                    if latency_probe is not None:
+                        latency_probe.record_items('input_to_hub', [data_hub_item], now)
+
+                    messages_in.inc()
+                    messages_out.inc(self._route_item(data_hub_item))
+
+                elif type(data_hub_item) is DataHubBatch:
+                    if debug_enabled:
+                        self._logger.debug('Received ' + str(data_hub_item))
+
+                    if latency_probe is not None:
+                        latency_probe.record_items('input_to_hub', data_hub_item.get_items(), now)
+
+                    messages_in.inc(len(data_hub_item.get_items()))
+                    messages_out.inc(self._route_batch(data_hub_item.get_items()))
+
                 else:
                     self._logger.warning('Dropping data (wrong data type)')
 
             except(KeyboardInterrupt, SystemExit):
                 break
 
+        if latency_probe is not None:
+            latency_probe.close()
+
         # close data hub queue
         self._data_hub.close()
 
@@ -74,6 +136,92 @@ class DataHubWorker(Process):
 
         self._logger.info('Terminating')
 
+    def _count(self, content_type, deliveries):
+        counter = self._counters.get(content_type)
+        if counter is None:
+            counter = self._counters[content_type] = [0, 0]
+
+        counter[0] += 1
+        counter[1] += deliveries
+
+    def _route_item(self, data_hub_item):
+        """
+        :return: Number of deliveries
+        """
+
+        content_type = data_hub_item.get_content_type()
+        queues = self._routes.get(content_type, self._any_queues)
+
+        self._count(content_type, len(queues))
+
+        # forward data via queues
+        for output_queue in queues:
+            output_queue.put(data_hub_item)
+
+        return len(queues)
+
+    def _route_batch(self, data_hub_items):
+        """
+        :return: Number of deliveries (items summed up over all queues)
+        """
+
+        routes = self._routes
+        any_queues = self._any_queues
+
+        # split frame into one frame per queue
+        queue_items = {}
+        for data_hub_item in data_hub_items:
+            content_type = data_hub_item.get_content_type()
+            queues = routes.get(content_type, any_queues)
+
+            self._count(content_type, len(queues))
+
+            for output_queue in queues:
+                items = queue_items.get(output_queue)
+                if items is None:
+                    queue_items[output_queue] = [data_hub_item]
+                else:
+                    items.append(data_hub_item)
+
+        # forward data via queues
+        deliveries = 0
+        for output_queue, items in queue_items.items():
+            if len(items) == 1:
+                output_queue.put(items[0])
+            else:
+                output_queue.put(DataHubBatch(items))
+
+            deliveries += len(items)
+
+        return deliveries
+
+    def _publish_stats(self, interval):
+        stats = {'interval': round(interval, 3), 'content_types': {}}
+        for content_type, counter in self._counters.items():
+            stats['content_types'][content_type] = {'items': counter[0], 'deliveries': counter[1], 'items_per_second': round(counter[0] / interval, 1)}
+
+        # reset counters for next interval
+        self._counters = {}
+
+        stats_string = json.dumps(stats, sort_keys=True)
+        self._logger.info('Routing stats: ' + stats_string)
+
+        self._route_item(DataHubItem('stats', stats_string, source_id=SOURCE_DATA_HUB))
+
+    def _add_route(self, output_queue, content_types):
+        # update routing table incrementally
+        if 'ANY' in content_types:
+            self._any_queues += (output_queue,)
+
+            for content_type in self._routes:
+                self._routes[content_type] += (output_queue,)
+        else:
+            for content_type in content_types:
+                if content_type not in self._routes:
+                    self._routes[content_type] = self._any_queues
+
+                self._routes[content_type] += (output_queue,)
+
     def add_output_module(self, output_module):
         # generate new queue for inter-process communication
         queue = Queue()
@@ -84,4 +232,7 @@ class DataHubWorker(Process):
         # add module to internal list
         self._output_modules.append({'output_module': output_module, 'queue': queue, 'content_types': output_module.get_desired_content_types()})
 
+        # add module to routing table
+        self._add_route(queue, self._output_modules[-1]['content_types'])
+
         self._logger.debug('Output module added: ' + str(self._output_modules[-1]))
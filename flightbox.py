@@ -14,23 +14,68 @@ import time
 #enable asyncio debug mode
 os.environ['PYTHONASYNCIODEBUG'] = '1'
 
+from data_hub.data_hub_ring_buffer import DataHubRingBuffer
 from data_hub.data_hub_worker import DataHubWorker
 from input.test_data_generator import TestDataGenerator
 from input.input_network_sbs1 import InputNetworkSbs1
 from input.input_network_ogn_server import InputNetworkOgnServer
+from input.input_replay import InputReplay, check_source
+from input.input_scenario_generator import InputScenarioGenerator, load_scenario
 from input.input_serial_gnss import InputSerialGnss
+from output.output_metrics_http import OutputMetricsHttp
 from output.output_network_airconnect import OutputNetworkAirConnect
+from output.output_network_udp import OutputNetworkUdp
+from output.output_recorder import OutputRecorder
 from transformation.transformation_sbs1ognnmea_flarm import Sbs1OgnNmeaToFlarmTransformation
+from utils.metrics import MetricsRegistry
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
 
-arg_parser = argparse.ArgumentParser(description='FlightBox collects input from various devices, like GNSS, ADS-B, and combines them in one NMEA (FLARM) data stream.')
-arg_parser.add_argument('--log-file', dest='log_file', help='path to log file')
-arg_parser.set_defaults(log_file='/home/pi/opt/flightbox/flightbox.log')
-args = arg_parser.parse_args()
+def create_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='FlightBox collects input from various devices, like GNSS, ADS-B, and combines them in one NMEA (FLARM) data stream.')
+    arg_parser.add_argument('--log-file', dest='log_file', help='path to log file')
+    arg_parser.add_argument('--web-log-file', dest='web_log_file', help='path to log file shown on web interface (empty: disabled)')
+    arg_parser.add_argument('--batch-max-items', dest='batch_max_items', type=int, help='maximum number of data hub items that are handed over as one frame')
+    arg_parser.add_argument('--batch-max-latency', dest='batch_max_latency', type=float, help='maximum time in seconds a data hub item is held back for batching')
+    arg_parser.add_argument('--data-hub', dest='data_hub', choices=['queue', 'shm'], help='data hub backend: central queue with worker process or shared memory ring buffer')
+    arg_parser.add_argument('--data-hub-size', dest='data_hub_size', type=int, help='size of shared memory ring buffer in bytes')
+    arg_parser.add_argument('--data-hub-policy', dest='data_hub_policy', choices=['drop_oldest', 'backpressure'], help='handling of slow consumers of shared memory ring buffer')
+    arg_parser.add_argument('--sbs1-parsed', dest='sbs1_parsed', action='store_true', help='parse SBS1 messages in input process (content type sbs1_parsed)')
+    arg_parser.add_argument('--baro-sensor', dest='baro_sensor', choices=['bmp180', 'fake', 'none'], help='barometric sensor used for own altitude')
+    arg_parser.add_argument('--baro-sample-rate', dest='baro_sample_rate', type=float, help='barometric sensor samples per second')
+    arg_parser.add_argument('--gnss-port', dest='gnss_port', help='serial port of GNSS device (e.g., pseudo terminal of utils/fake_gnss_device.py)')
+    arg_parser.add_argument('--gnss-baud-rate', dest='gnss_baud_rate', type=int, help='baud rate of GNSS device')
+    arg_parser.add_argument('--gnss-sentences', dest='gnss_sentences', help='comma-separated NMEA sentence types forwarded from GNSS device, e.g., GGA,RMC (any talker) or GPGSV, or "all"')
+    arg_parser.add_argument('--flarm-tick-interval', dest='flarm_tick_interval', type=float, help='interval in seconds of checking targets for changed alarm levels')
+    arg_parser.add_argument('--flarm-interval', dest='flarm_interval', type=float, help='interval in seconds of reporting targets to FLARM clients')
+    arg_parser.add_argument('--flarm-far-interval', dest='flarm_far_interval', type=float, help='interval in seconds of reporting far targets without new data')
+    arg_parser.add_argument('--flarm-near-distance', dest='flarm_near_distance', type=float, help='distance in meters up to which targets are checked for alarms in every tick')
+    arg_parser.add_argument('--airconnect-ports', dest='airconnect_ports', help='comma-separated AirConnect ports with default profile of clients, e.g., 2000:all,2001:flarm,2002:flarm_position')
+    arg_parser.add_argument('--airconnect-buffer-high', dest='airconnect_buffer_high', type=int, help='write buffer size in bytes per AirConnect client above which traffic sentences are dropped')
+    arg_parser.add_argument('--airconnect-buffer-low', dest='airconnect_buffer_low', type=int, help='write buffer size in bytes per AirConnect client below which traffic sentences are sent again')
+    arg_parser.add_argument('--airconnect-buffer-max', dest='airconnect_buffer_max', type=int, help='write buffer size in bytes per AirConnect client above which the client is disconnected')
+    arg_parser.add_argument('--airconnect-pause-timeout', dest='airconnect_pause_timeout', type=float, help='time in seconds after which a slow AirConnect client is disconnected')
+    arg_parser.add_argument('--udp-host', dest='udp_host', help='broadcast or multicast address for sending NMEA/FLARM datagrams (default: UDP output disabled)')
+    arg_parser.add_argument('--udp-port', dest='udp_port', type=int, help='UDP port of receivers')
+    arg_parser.add_argument('--udp-profile', dest='udp_profile', help='profile of sentences sent via UDP (see --airconnect-ports)')
+    arg_parser.add_argument('--udp-interval', dest='udp_interval', type=float, help='interval in seconds of sending datagrams')
+    arg_parser.add_argument('--udp-payload-size', dest='udp_payload_size', type=int, help='maximum size of datagrams in bytes')
+    arg_parser.add_argument('--udp-interface', dest='udp_interface', help='address of local interface for multicast')
+    arg_parser.add_argument('--record-dir', dest='record_dir', help='directory for recording all data hub items (default: recording disabled)')
+    arg_parser.add_argument('--record-compression', dest='record_compression', choices=['none', 'gzip', 'zstd'], help='compression of recorded blocks (zstd requires zstandard package)')
+    arg_parser.add_argument('--record-segment-duration', dest='record_segment_duration', type=float, help='duration in seconds after which a new recording segment is started')
+    arg_parser.add_argument('--replay', dest='replay', nargs='+', help='replay recordings (segment or directory) or raw captures (sbs1:FILE, ogn:FILE, nmea:FILE) instead of receiving live data')
+    arg_parser.add_argument('--replay-speed', dest='replay_speed', type=float, help='speed factor of replay (0: as fast as possible)')
+    arg_parser.add_argument('--scenario', dest='scenario', help='generate synthetic traffic of scenario file (see input/scenarios) instead of receiving live data')
+    arg_parser.add_argument('--latency-dir', dest='latency_dir', help='directory for latency histograms of data hub worker, transformation and AirConnect output (default: disabled)')
+    arg_parser.add_argument('--metrics-port', dest='metrics_port', type=int, help='port of HTTP endpoint /metrics with runtime metrics of all processes in Prometheus text format (default: disabled)')
+    arg_parser.add_argument('--metrics-host', dest='metrics_host', help='address the metrics endpoint is bound to')
+    arg_parser.set_defaults(log_file='/home/pi/opt/flightbox/flightbox.log', web_log_file='/home/pi/opt/flightbox/static/flightbox.txt', batch_max_items=64, batch_max_latency=0.05, data_hub='queue', data_hub_size=4 * 1024 * 1024, data_hub_policy='drop_oldest', baro_sensor='bmp180', baro_sample_rate=2.0, gnss_port='/dev/ttyAMA0', gnss_baud_rate=19200, gnss_sentences='GGA,GLL,VTG,RMC', flarm_tick_interval=0.2, flarm_interval=1.0, flarm_far_interval=3.0, flarm_near_distance=10000.0, airconnect_ports='2000:all', airconnect_buffer_high=16 * 1024, airconnect_buffer_low=4 * 1024, airconnect_buffer_max=64 * 1024, airconnect_pause_timeout=10.0, udp_port=10110, udp_profile='all', udp_interval=0.1, udp_payload_size=1472, record_compression='gzip', record_segment_duration=3600.0, replay_speed=1.0, metrics_host='127.0.0.1')
+
+    return arg_parser
 
 
 class LoggingFilter(logging.Filter):
@@ -44,12 +89,165 @@ class LoggingFilter(logging.Filter):
         return True
 
 
+class FlightBoxPipeline(object):
+    """
+    Process graph of FlightBox as configured by the command line arguments: data hub (queue with worker process or
+    shared memory ring buffer), output modules, transformation and input modules.
+
+    Input modules of live data (or replay or scenario generator) are only instantiated if live_inputs is set. Other
+    input modules can be added with add_input_module() before the pipeline is started.
+
+    If a metrics port is configured, all modules update metrics in the shared registry (attribute metrics, None
+    otherwise), which are served by the metrics output module.
+    """
+
+    def __init__(self, args, live_inputs=True):
+        # configure logging
+        self._logger = logging.getLogger('FlightBox.Pipeline')
+
+        # store arguments in object variables
+        self._args = args
+
+        # initialize list of sub-processes (data hub worker first, input modules last)
+        self.processes = []
+        self.processing_modules = []
+        self.input_modules = []
+        self.data_hub_worker = None
+
+        # instantiate registry of metrics of all processes (shared memory)
+        self.metrics = None
+        if args.metrics_port:
+            self.metrics = MetricsRegistry()
+
+        if args.data_hub == 'shm':
+            # instantiate central data hub ring buffer (subscribers read directly from shared memory)
+            self.data_hub = DataHubRingBuffer(size=args.data_hub_size, policy=args.data_hub_policy)
+            self._data_hub_router = self.data_hub
+        else:
+            # instantiate central data hub queue (used for all data exchange between modules)
+            self.data_hub = Queue()
+
+            # instantiate data hub worker
+            self.data_hub_worker = DataHubWorker(self.data_hub, latency_directory=args.latency_dir, metrics=self.metrics)
+            self.processes.append(self.data_hub_worker)
+            self._data_hub_router = self.data_hub_worker
+
+        # instantiate AirConnect (output) module
+        air_connect_profile_ports = dict([(int(port), profile_name) for port, profile_name in (port_profile.split(':') for port_profile in args.airconnect_ports.split(','))])
+        self._add_processing_module(OutputNetworkAirConnect(profile_ports=air_connect_profile_ports, write_buffer_high=args.airconnect_buffer_high, write_buffer_low=args.airconnect_buffer_low, max_buffer_size=args.airconnect_buffer_max, pause_timeout=args.airconnect_pause_timeout, latency_directory=args.latency_dir, metrics=self.metrics))
+
+        # instantiate UDP (output) module
+        if args.udp_host:
+            self._add_processing_module(OutputNetworkUdp(args.udp_host, port=args.udp_port, profile_name=args.udp_profile, tick_interval=args.udp_interval, payload_size=args.udp_payload_size, interface=args.udp_interface))
+
+        # instantiate recorder (output) module
+        if args.record_dir:
+            self._add_processing_module(OutputRecorder(args.record_dir, compression=args.record_compression, segment_duration=args.record_segment_duration))
+
+        # instantiate SBS1/OGN/NMEA to FLARM transformation module
+        self._add_processing_module(Sbs1OgnNmeaToFlarmTransformation(self.data_hub, batch_max_items=args.batch_max_items, batch_max_latency=args.batch_max_latency, baro_sensor_type=args.baro_sensor, baro_sample_rate=args.baro_sample_rate, tick_interval=args.flarm_tick_interval, target_interval=args.flarm_interval, far_target_interval=args.flarm_far_interval, near_distance=args.flarm_near_distance, latency_directory=args.latency_dir, metrics=self.metrics))
+
+        # instantiate metrics (output) module (samples the depth of the data hub queues of all other modules)
+        if self.metrics is not None:
+            queues = dict([(type(processing_module).__name__, processing_module.get_data_input_queue()) for processing_module in self.processing_modules])
+            if self.data_hub_worker is not None:
+                queues['DataHubWorker'] = self.data_hub
+            self._add_processing_module(OutputMetricsHttp(self.metrics, host=args.metrics_host, port=args.metrics_port, queues=queues))
+
+        # instantiate test data (input) module
+        # self.add_input_module(TestDataGenerator(self.data_hub))
+
+        if not live_inputs:
+            return
+
+        if args.replay:
+            # instantiate replay (input) module instead of receiving live data
+            self.add_input_module(InputReplay(self.data_hub, args.replay, speed=args.replay_speed, parse_sbs1=args.sbs1_parsed, batch_max_items=args.batch_max_items, batch_max_latency=args.batch_max_latency, metrics=self.metrics))
+        elif args.scenario:
+            # instantiate scenario generator (input) module instead of receiving live data
+            self.add_input_module(InputScenarioGenerator(self.data_hub, load_scenario(args.scenario), batch_max_items=args.batch_max_items, batch_max_latency=args.batch_max_latency, metrics=self.metrics))
+        else:
+            # instantiate SBS1 (input) module
+            self.add_input_module(InputNetworkSbs1(self.data_hub, '127.0.0.1', 30003, message_types=['1', '2', '3', '4', '5'], parse_messages=args.sbs1_parsed, batch_max_items=args.batch_max_items, batch_max_latency=args.batch_max_latency, metrics=self.metrics))
+
+            # instantiate OGN (input) module
+            self.add_input_module(InputNetworkOgnServer(self.data_hub, batch_max_items=args.batch_max_items, batch_max_latency=args.batch_max_latency, metrics=self.metrics))
+
+            # instantiate GNSS (input) module
+            gnss_sentence_types = None
+            if args.gnss_sentences != 'all':
+                gnss_sentence_types = args.gnss_sentences.split(',')
+            self.add_input_module(InputSerialGnss(self.data_hub, args.gnss_port, args.gnss_baud_rate, sentence_types=gnss_sentence_types, batch_max_items=args.batch_max_items, batch_max_latency=args.batch_max_latency, metrics=self.metrics))    # serial device on Linux
+
+    def _add_processing_module(self, processing_module):
+        self._data_hub_router.add_output_module(processing_module)
+        self.processing_modules.append(processing_module)
+        self.processes.append(processing_module)
+
+    def add_input_module(self, input_module):
+        self.input_modules.append(input_module)
+        self.processes.append(input_module)
+
+    def start(self, hub_delay=1.0, processing_delay=5.0, input_delay=1.0):
+        """
+        Starts all modules in separate processes. Delays (seconds) give each group of modules time to get ready before
+        the next group is started.
+        """
+
+        # data hub is first to enable message exchange right from the beginning
+        if self.data_hub_worker is not None:
+            self.data_hub_worker.start()
+
+            time.sleep(hub_delay)
+
+        # start output and transformation modules next to avoid losing any message
+        for processing_module in self.processing_modules:
+            processing_module.start()
+
+        time.sleep(processing_delay)
+
+        # start input modules last when all processing modules are ready
+        for input_module in self.input_modules:
+            input_module.start()
+
+        time.sleep(input_delay)
+
+    def join(self):
+        # wait for data_hub_worker (or first processing module if there is no worker) to finish
+        self.processes[0].join()
+
+    def join_all(self):
+        # wait for all processes to finish
+        for process in self.processes:
+            if process.is_alive():
+                self._logger.debug('Waiting for process ' + process.name + ' to terminate')
+                process.join()
+            else:
+                self._logger.debug('Process ' + process.name + ' already died')
+
+    def stop(self):
+        # send poison pill to data hub (forwarded to all processing modules)
+        self.data_hub.put(None)
+
+    def close(self):
+        # close data hub queue
+        self.data_hub.close()
+
+        # free shared memory of data hub ring buffer
+        if type(self.data_hub) is DataHubRingBuffer:
+            self.data_hub.unlink()
+
+        # free shared memory of metrics
+        if self.metrics is not None:
+            self.metrics.close()
+            self.metrics.unlink()
+
+
 # initialization procedure
-def flightbox_init():
-    global args
-    global logging_queue
-    global logging_thread
-    global flightbox_logger
+def flightbox_init(args):
+    """
+    :return: Logging queue (used by all processes) and logging thread
+    """
 
     # enable debug logging for multiprocessing
     multiprocessing.util.log_to_stderr(level=logging.DEBUG)
@@ -74,9 +272,17 @@ def flightbox_init():
     logging_stream_handler.setFormatter(logging_formatter)
     logging_stream_handler.addFilter(LoggingFilter())
 
+    logging_handlers = [logging_file_handler, logging_stream_handler]
+
+    # create handler of log file shown on web interface (written by logging thread, not by the logging processes)
+    if args.web_log_file:
+        logging_web_handler = logging.FileHandler(args.web_log_file)
+        logging_web_handler.setLevel(logging.INFO)
+        logging_web_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p'))
+        logging_handlers.append(logging_web_handler)
+
     # start logging thread
-    logging_thread = logging.handlers.QueueListener(logging_queue, logging_file_handler, logging_stream_handler)
-    #logging_thread = logging.handlers.QueueListener(logging_queue, logging_stream_handler)
+    logging_thread = logging.handlers.QueueListener(logging_queue, *logging_handlers)
     logging_thread.start()
 
     """ set up sending side of logging framework """
@@ -95,121 +301,70 @@ def flightbox_init():
     flightbox_logger = logging.getLogger('FlightBox')
     flightbox_logger.info('Started logging framework')
 
+    return logging_queue, logging_thread
+
 
 # main function
-def flightbox_main():
-    global args
-    global flightbox_logger
-    global logging_queue
-    global data_hub
-    global data_hub_worker
+def flightbox_main(args):
+    """
+    :return: Pipeline that has been run
+    """
 
+    flightbox_logger = logging.getLogger('FlightBox')
     flightbox_logger.info('Entering main procedure')
 
-    try:
-        # instantiate central data hub queue (used for all data exchange between modules)
-        data_hub = Queue()
-
-        # initialize list of sub-processes
-        processes = []
-
-        # instantiate data hub worker
-        data_hub_worker = DataHubWorker(data_hub)
-        processes.append(data_hub_worker)
-
-        # instantiate AirConnect (output) module
-        air_connect_output = OutputNetworkAirConnect()
-        data_hub_worker.add_output_module(air_connect_output)
-        processes.append(air_connect_output)
-
-        # instantiate SBS1/OGN/NMEA to FLARM transformation module
-        sbs1ognnmea_to_flarm_transformation = Sbs1OgnNmeaToFlarmTransformation(data_hub)
-        data_hub_worker.add_output_module(sbs1ognnmea_to_flarm_transformation)
-        processes.append(sbs1ognnmea_to_flarm_transformation)
-
-        # instantiate test data (input) module
-        # test_data_generator = TestDataGenerator(data_hub)
-        # processes.append(test_data_generator)
-
-        # instantiate SBS1 (input) module
-        input_network_sbs1 = InputNetworkSbs1(data_hub, '127.0.0.1', 30003, message_types=['1', '2', '3', '4', '5'])
-        processes.append(input_network_sbs1)
-
-        # instantiate OGN (input) module
-        input_network_ogn = InputNetworkOgnServer(data_hub)
-        processes.append(input_network_ogn)
-
-        # instantiate GNSS (input) module
-        input_serial_gnss = InputSerialGnss(data_hub, '/dev/ttyAMA0', 19200)    # serial device on Linux
-        processes.append(input_serial_gnss)
+    pipeline = FlightBoxPipeline(args)
 
+    try:
         # start all modules in separate processes
+        pipeline.start()
 
-        # data hub is first to enable message exchange right from the beginning
-        data_hub_worker.start()
-
-        time.sleep(1)
-
-        # start output and transformation modules next to avoid losing any message
-        air_connect_output.start()
-        sbs1ognnmea_to_flarm_transformation.start()
-
-        time.sleep(5)
-
-        # start input modules last when all processing modules are ready
-        # test_data_generator.start()
-        input_network_sbs1.start()
-        input_network_ogn.start()
-        input_serial_gnss.start()
-
-        time.sleep(1)
-
-        # wait for data_hub_worker to finish
-        data_hub_worker.join()
+        # wait for data hub worker (or first processing module if there is no worker) to finish
+        pipeline.join()
 
     except(KeyboardInterrupt, SystemExit):
         # wait for all processes to finish
-        for process in processes:
-            if process.is_alive():
-                flightbox_logger.debug('Waiting for process ' + process.name + ' to terminate')
-                process.join()
-            else:
-                flightbox_logger.debug('Process ' + process.name + ' already died')
+        pipeline.join_all()
+
+    return pipeline
 
 
 # cleanup procedure (should be executed before exiting)
-def flightbox_cleanup():
-    global logging_queue
-    global logging_thread
-    global flightbox_logger
-    global data_hub
-    global data_hub_worker
+def flightbox_cleanup(logging_queue, logging_thread, pipeline):
+    flightbox_logger = logging.getLogger('FlightBox')
 
     # terminate logging thread
     flightbox_logger.info('Terminating logging thread')
     logging_thread.stop()
 
     # close all queues
-    data_hub.close()
+    pipeline.close()
     logging_queue.close()
 
 
-# call main flightbox function in case script is executed directly
-if __name__ == "__main__":
-    # initialize global variables
-    logging_queue = None
-    logging_thread = None
-    flightbox_logger = None
-    data_hub = None
-    data_hub_worker = None
+def main(argv=None):
+    arg_parser = create_arg_parser()
+    args = arg_parser.parse_args(argv)
+
+    # check replay sources before any module is created
+    for source in args.replay or []:
+        try:
+            check_source(source)
+        except ValueError as e:
+            arg_parser.error(str(e))
 
     setproctitle.setproctitle("flightbox")
 
     # initialize framework
-    flightbox_init()
+    logging_queue, logging_thread = flightbox_init(args)
 
     # execute main function
-    flightbox_main()
+    pipeline = flightbox_main(args)
 
     # clean up framework
-    flightbox_cleanup()
+    flightbox_cleanup(logging_queue, logging_thread, pipeline)
+
+
+# call main flightbox function in case script is executed directly
+if __name__ == "__main__":
+    main()
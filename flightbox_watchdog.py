@@ -3,9 +3,11 @@
 """flightbox_watchdog.py: Script that checks if required FlightBox and OGN processes are running and (re-)starts them if required.
 Can be used to start and monitor FlightBox via a cronjob."""
 
+import argparse
 from os import path
 from os import system
 import psutil
+import shlex
 from utils.detached_screen import DetachedScreen
 import time
 
@@ -14,19 +16,31 @@ __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
 
+# define command for starting flightbox (options like '--data-hub shm' are appended here)
+flightbox_command = '/home/pi/opt/flightbox/flightbox.py'
+
+
+def get_flightbox_data_hub(command):
+    # data hub backend selected by flightbox command line (see flightbox.py, default: queue)
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('--data-hub', dest='data_hub', default='queue')
+    args, unknown_args = arg_parser.parse_known_args(shlex.split(command)[1:])
+
+    return args.data_hub
+
+
 # define flightbox processes that must be running
 required_flightbox_processes = {}
 required_flightbox_processes['flightbox'] = {'status': None}
-required_flightbox_processes['flightbox_datahubworker'] = {'status': None}
+if get_flightbox_data_hub(flightbox_command) == 'queue':
+    # shared memory data hub has no worker process
+    required_flightbox_processes['flightbox_datahubworker'] = {'status': None}
 required_flightbox_processes['flightbox_output_network_airconnect'] = {'status': None}
 required_flightbox_processes['flightbox_transformation_sbs1ognnmea_flarm'] = {'status': None}
 required_flightbox_processes['flightbox_input_network_sbs1'] = {'status': None}
 required_flightbox_processes['flightbox_input_network_ogn_server'] = {'status': None}
 required_flightbox_processes['flightbox_input_serial_gnss'] = {'status': None}
 
-# define command for starting flightbox
-flightbox_command = '/home/pi/opt/flightbox/flightbox.py'
-
 # define command for starting dump1090
 dump1090_command = 'sudo systemctl start dump1090.service'
 
@@ -1,5 +1,8 @@
 from multiprocessing import Process
 
+from data_hub.data_hub_batcher import DataHubBatcher
+from utils.metrics import NULL_METRICS
+
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
@@ -10,9 +13,22 @@ class InputModule(Process):
     Generic input module class.
     """
 
-    def __init__(self, data_hub):
+    def __init__(self, data_hub, batch_max_items=64, batch_max_latency=0.05, metrics=None):
         # call parent constructor
         super().__init__()
 
         # set data hub queue
         self._data_hub = data_hub
+
+        # store batching parameters (max_latency in seconds bounds the delay added by batching)
+        self._batch_max_items = batch_max_items
+        self._batch_max_latency = batch_max_latency
+
+        # set metrics registry (disabled if not given)
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+
+    def create_batcher(self, loop=None):
+        # items handed over to the data hub are counted per module (call in module process)
+        messages_out = self._metrics.counter('flightbox_messages_out_total', process=type(self).__name__)
+
+        return DataHubBatcher(self._data_hub, max_items=self._batch_max_items, max_latency=self._batch_max_latency, loop=loop, messages_out=messages_out)
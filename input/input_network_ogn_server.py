@@ -6,7 +6,7 @@ import setproctitle
 import sys
 from threading import Lock
 
-from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_item import DataHubItem, SOURCE_INPUT_OGN
 from input.input_module import InputModule
 
 __author__ = "Thorsten Biermann"
@@ -35,14 +35,14 @@ class OgnAprsServerClientProtocol(asyncio.Protocol):
     APRS protocol implementation (server side).
     """
 
-    def __init__(self, clients, clients_lock, data_hub, server_name, server_software):
+    def __init__(self, clients, clients_lock, data_hub_batcher, server_name, server_software):
         self._logger = logging.getLogger('OgnAprsServerClientProtocol.Server')
         self._logger.debug('Initializing')
 
         # store arguments in object variables
         self._clients = clients
         self._clients_lock = clients_lock
-        self._data_hub = data_hub
+        self._data_hub_batcher = data_hub_batcher
         self._server_name = server_name
         self._server_software = server_software
 
@@ -98,8 +98,8 @@ class OgnAprsServerClientProtocol(asyncio.Protocol):
         messages = data_string.splitlines()
         for message in messages:
             try:
-                data_hub_item = DataHubItem('ogn', message)
-                self._data_hub.put(data_hub_item)
+                data_hub_item = DataHubItem('ogn', message, source_id=SOURCE_INPUT_OGN)
+                self._data_hub_batcher.put(data_hub_item)
             except:
                 pass
 
@@ -116,9 +116,9 @@ class InputNetworkOgnServer(InputModule):
     is used to receive FLARM messages.
     """
 
-    def __init__(self, data_hub):
+    def __init__(self, data_hub, batch_max_items=64, batch_max_latency=0.05, metrics=None):
         # call parent constructor
-        super().__init__(data_hub=data_hub)
+        super().__init__(data_hub=data_hub, batch_max_items=batch_max_items, batch_max_latency=batch_max_latency, metrics=metrics)
 
         # configure logging
         self._logger = logging.getLogger('InputNetworkOgnServer')
@@ -140,8 +140,11 @@ class InputNetworkOgnServer(InputModule):
         # get asyncio loop
         loop = asyncio.get_event_loop()
 
+        # create batcher that collects items into frames (flushed by size or deadline)
+        data_hub_batcher = self.create_batcher(loop=loop)
+
         # create server coroutine
-        ogn_aprs_server = loop.create_server(lambda: OgnAprsServerClientProtocol(clients=self.clients, clients_lock=self.clients_lock, data_hub=self._data_hub, server_name=self._server_name, server_software=self._server_software), host='', port=14580)
+        ogn_aprs_server = loop.create_server(lambda: OgnAprsServerClientProtocol(clients=self.clients, clients_lock=self.clients_lock, data_hub_batcher=data_hub_batcher, server_name=self._server_name, server_software=self._server_software), host='', port=14580)
 
         # compile task list that will run in loop
         tasks = asyncio.gather(
@@ -161,7 +164,8 @@ class InputNetworkOgnServer(InputModule):
             ogn_aprs_server.close()
             loop.stop()
 
-        # close data hub queue
+        # hand over pending items and close data hub queue
+        data_hub_batcher.flush()
         self._data_hub.close()
 
         self._logger.info('Terminating')
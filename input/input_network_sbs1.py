@@ -2,8 +2,11 @@ import asyncio
 import logging
 import setproctitle
 
-from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_item import DataHubItem, SOURCE_INPUT_SBS1
 from input.input_module import InputModule
+from utils.line_framer import Sbs1LineFramer
+from utils.metrics import NULL_COUNTER
+from utils.sbs1_parser import parse_sbs1_message
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
@@ -15,46 +18,64 @@ class NetworkSbs1ClientProtocol(asyncio.Protocol):
     SBS1 protocol implementation (client side).
     """
 
-    def __init__(self, loop, data_hub, message_types):
+    def __init__(self, loop, data_hub_batcher, message_types, parse_messages=False, parse_errors=NULL_COUNTER):
         self._logger = logging.getLogger('InputNetworkSbs1.Client')
         self._logger.debug('Initializing')
 
         # store arguments in object variables
         self._loop = loop
-        self._data_hub = data_hub
-        self._message_types = message_types
+        self._data_hub_batcher = data_hub_batcher
+        self._parse_messages = parse_messages
+        self._parse_errors = parse_errors
+
+        # check log level once instead of building debug strings for every chunk
+        self._debug_enabled = self._logger.isEnabledFor(logging.DEBUG)
+
+        # initialize framer that keeps partial lines between chunks and filters message types before decoding
+        self._line_framer = Sbs1LineFramer(message_types=message_types, name='InputNetworkSbs1.Framer')
 
     def connection_made(self, transport):
         self._logger.info('Connection established to {}'.format(transport.get_extra_info('peername')))
 
     def data_received(self, data):
-        data_string = data.decode().strip()
+        if self._debug_enabled:
+            self._logger.debug('Data received: {!r}'.format(data))
+
+        for message in self._line_framer.feed(data):
+            if self._parse_messages:
+                # parse message in input process (tuple with populated fields only)
+                try:
+                    record = parse_sbs1_message(message)
+                except ValueError:
+                    self._logger.warn('Problem during SBS1 data parsing')
+                    self._parse_errors.inc()
+                    continue
+
+                if record is None:
+                    continue
 
-        self._logger.debug('Data received: {!r}'.format(data_string))
+                data_hub_item = DataHubItem('sbs1_parsed', record, source_id=SOURCE_INPUT_SBS1)
+            else:
+                data_hub_item = DataHubItem('sbs1', message, source_id=SOURCE_INPUT_SBS1)
 
-        messages = data_string.splitlines()
-        for message in messages:
-            try:
-                message_type = message.split(',')[1]
-                if message_type in self._message_types:
-                    data_hub_item = DataHubItem('sbs1', message)
-                    self._data_hub.put(data_hub_item)
-            except:
-                pass
+            self._data_hub_batcher.put(data_hub_item)
 
     def connection_lost(self, exc):
         self._logger.debug('Connection terminated')
+
+        # hand over pending items before stopping
+        self._data_hub_batcher.flush()
         self._loop.stop()
 
 
 @asyncio.coroutine
-def connect_loop(loop, data_hub, host_name, port, message_types):
+def connect_loop(loop, data_hub_batcher, host_name, port, message_types, parse_messages, parse_errors=NULL_COUNTER):
     logger = logging.getLogger('InputNetworkSbs1.ConnectLoop')
 
     while True:
         try:
             logger.info("Creating new connection")
-            yield from loop.create_connection(lambda: NetworkSbs1ClientProtocol(loop=loop, data_hub=data_hub, message_types=message_types), host_name, port)
+            yield from loop.create_connection(lambda: NetworkSbs1ClientProtocol(loop=loop, data_hub_batcher=data_hub_batcher, message_types=message_types, parse_messages=parse_messages, parse_errors=parse_errors), host_name, port)
         except OSError:
             logger.info("Server not up. Retrying to connect in 5 seconds.")
             yield from asyncio.sleep(5)
@@ -65,11 +86,14 @@ def connect_loop(loop, data_hub, host_name, port, message_types):
 class InputNetworkSbs1(InputModule):
     """
     Input module that connects to ADS-B receiver that has an SBS1 interface, like dump1090.
+
+    Messages are forwarded as raw text (content type 'sbs1'), or parsed into tuples (content type 'sbs1_parsed', see
+    utils.sbs1_parser) if parse_messages is set.
     """
 
-    def __init__(self, data_hub, host_name, port, message_types = None):
+    def __init__(self, data_hub, host_name, port, message_types = None, parse_messages=False, batch_max_items=64, batch_max_latency=0.05, metrics=None):
         # call parent constructor
-        super().__init__(data_hub=data_hub)
+        super().__init__(data_hub=data_hub, batch_max_items=batch_max_items, batch_max_latency=batch_max_latency, metrics=metrics)
 
         # configure logging
         self._logger = logging.getLogger('InputNetworkSbs1')
@@ -79,6 +103,7 @@ class InputNetworkSbs1(InputModule):
         self._host_name = host_name
         self._port = port
         self._message_types = message_types
+        self._parse_messages = parse_messages
 
     def run(self):
         setproctitle.setproctitle("flightbox_input_network_sbs1")
@@ -88,9 +113,14 @@ class InputNetworkSbs1(InputModule):
         # get asyncio loop
         loop = asyncio.get_event_loop()
 
+        # create batcher that collects items into frames (flushed by size or deadline)
+        data_hub_batcher = self.create_batcher(loop=loop)
+
+        parse_errors = self._metrics.counter('flightbox_parse_errors_total', process='InputNetworkSbs1', content_type='sbs1')
+
         try:
             # start loop
-            loop.run_until_complete(connect_loop(loop=loop, data_hub=self._data_hub, host_name=self._host_name, port=self._port, message_types=self._message_types))
+            loop.run_until_complete(connect_loop(loop=loop, data_hub_batcher=data_hub_batcher, host_name=self._host_name, port=self._port, message_types=self._message_types, parse_messages=self._parse_messages, parse_errors=parse_errors))
             loop.run_forever()
         except(KeyboardInterrupt, SystemExit):
             pass
@@ -98,7 +128,8 @@ class InputNetworkSbs1(InputModule):
             loop.stop()
             loop.close()
 
-        # close data hub queue
+        # hand over pending items and close data hub queue
+        data_hub_batcher.flush()
         self._data_hub.close()
 
         self._logger.info('Terminating')
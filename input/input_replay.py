@@ -0,0 +1,351 @@
+import heapq
+import itertools
+import logging
+import mmap
+import os
+import setproctitle
+import sys
+import time
+
+from data_hub.data_hub_item import DataHubItem, SOURCE_INPUT_GNSS, SOURCE_INPUT_OGN, SOURCE_INPUT_SBS1
+from input.input_module import InputModule
+from utils.recording import RecordingReader, SEGMENT_SUFFIX, list_segments
+from utils.sbs1_parser import parse_sbs1_message
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+# content types of raw captures and source identifiers of the input modules that generate them
+CAPTURE_SOURCE_IDS = {'sbs1': SOURCE_INPUT_SBS1, 'ogn': SOURCE_INPUT_OGN, 'nmea': SOURCE_INPUT_GNSS}
+
+# content types that are replayed from recordings by default (generated items, like flarm, are generated again)
+DEFAULT_CONTENT_TYPES = ['sbs1', 'sbs1_parsed', 'ogn', 'nmea']
+
+# SBS1 message types that are replayed from raw captures (like InputNetworkSbs1)
+DEFAULT_SBS1_MESSAGE_TYPES = ['1', '2', '3', '4', '5']
+
+# rate of raw captures without time information (lines per second at speed 1)
+DEFAULT_CAPTURE_RATE = 100.0
+
+# number of lines that are checked for time information at the beginning of raw captures
+TIME_CHECK_LINES = 100
+
+SECONDS_PER_DAY = 86400.0
+
+
+def _time_of_day(value):
+    """
+    :param value: Time as 'hhmmss' with optional fraction (NMEA, OGN) or 'hh:mm:ss' with optional fraction (SBS1)
+    :return: Seconds since midnight, or None if value is not a time
+    """
+
+    try:
+        if ':' in value:
+            hours, minutes, seconds = value.split(':')
+        else:
+            hours, minutes, seconds = value[0:2], value[2:4], value[4:]
+
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
+def get_sbs1_time(line):
+    # time message was generated (field 8)
+    fields = line.split(',', 8)
+    if len(fields) < 9:
+        return None
+
+    return _time_of_day(fields[7])
+
+
+def get_ogn_time(line):
+    # APRS position report with timestamp, e.g., ':/120000h'
+    position = line.find(':/')
+    if position < 0 or line[position + 8:position + 9] != 'h':
+        return None
+
+    return _time_of_day(line[position + 2:position + 8])
+
+
+def get_nmea_time(line):
+    # UTC of GGA and RMC sentences
+    if line[3:6] not in ('GGA', 'RMC'):
+        return None
+
+    fields = line.split(',', 2)
+    if len(fields) < 3 or not fields[1]:
+        return None
+
+    return _time_of_day(fields[1])
+
+
+CAPTURE_TIME_PARSERS = {'sbs1': get_sbs1_time, 'ogn': get_ogn_time, 'nmea': get_nmea_time}
+
+
+def iter_capture_lines(file_name):
+    """
+    :param file_name: Raw capture (one message per line)
+    :return: Iterator of non-empty lines (str without line terminator), file is memory mapped
+    """
+
+    with open(file_name, 'rb') as capture_file:
+        if os.fstat(capture_file.fileno()).st_size == 0:
+            return
+
+        data = mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            start = 0
+            size = len(data)
+            while start < size:
+                end = data.find(b'\n', start)
+                if end < 0:
+                    end = size
+
+                line = data[start:end].strip()
+                start = end + 1
+
+                if line:
+                    yield line.decode('ascii', 'replace')
+        finally:
+            data.close()
+
+
+def iter_capture(file_name, content_type, capture_rate=DEFAULT_CAPTURE_RATE, sbs1_message_types=DEFAULT_SBS1_MESSAGE_TYPES):
+    """
+    :param file_name: Raw capture of content type sbs1, ogn or nmea
+    :return: Iterator of tuples of time offset in seconds (relative to first message), content type, content data and
+    source identifier
+
+    Time offsets are taken from the messages (time of day, lines without time keep the time of the previous line). If
+    the first lines of the capture do not contain any time, lines are spread at capture_rate lines per second.
+    """
+
+    get_time = CAPTURE_TIME_PARSERS[content_type]
+    source_id = CAPTURE_SOURCE_IDS[content_type]
+    has_time = any(get_time(line) is not None for line in itertools.islice(iter_capture_lines(file_name), TIME_CHECK_LINES))
+
+    sbs1_prefixes = None
+    if content_type == 'sbs1':
+        sbs1_prefixes = tuple('MSG,' + message_type + ',' for message_type in sbs1_message_types)
+
+    start_time = None
+    day_offset = 0.0
+    last_time = None
+    offset = 0.0
+
+    for line_number, line in enumerate(iter_capture_lines(file_name)):
+        if sbs1_prefixes is not None and not line.startswith(sbs1_prefixes):
+            continue
+
+        if not has_time:
+            yield line_number / capture_rate, content_type, line, source_id
+            continue
+
+        capture_time = get_time(line)
+        if capture_time is not None:
+            capture_time += day_offset
+
+            # time of day wrapped around midnight
+            if last_time is not None and capture_time < last_time - SECONDS_PER_DAY / 2:
+                day_offset += SECONDS_PER_DAY
+                capture_time += SECONDS_PER_DAY
+
+            if start_time is None:
+                start_time = capture_time
+
+            # messages of one stream are not strictly ordered by time
+            if last_time is None or capture_time > last_time:
+                last_time = capture_time
+
+            offset = last_time - start_time
+
+        yield offset, content_type, line, source_id
+
+
+def iter_recording(path, content_types=DEFAULT_CONTENT_TYPES):
+    """
+    :param path: Recorder segment or directory of segments (see utils/recording.py)
+    :return: Iterator of tuples of time offset in seconds (relative to first replayed item), content type, content data
+    and source identifier
+    """
+
+    if os.path.isdir(path):
+        segment_paths = list_segments(path)
+    else:
+        segment_paths = [path]
+
+    content_types = frozenset(content_types)
+    start_time = None
+
+    for segment_path in segment_paths:
+        with RecordingReader(segment_path) as recording_reader:
+            for data_hub_item in recording_reader.iter_items():
+                content_type = data_hub_item.get_content_type()
+                if content_type not in content_types:
+                    continue
+
+                timestamp = data_hub_item.get_timestamp()
+                if start_time is None:
+                    start_time = timestamp
+
+                yield max(timestamp - start_time, 0.0), content_type, data_hub_item.get_content_data(), data_hub_item.get_source_id()
+
+
+def parse_source(source, capture_rate=DEFAULT_CAPTURE_RATE):
+    """
+    :param source: Recording (segment or directory, see iter_recording) or raw capture with content type, e.g.,
+    'sbs1:capture.txt'
+    :return: Iterator of replayed messages (see iter_capture and iter_recording)
+    """
+
+    content_type, separator, file_name = source.partition(':')
+    if separator and content_type in CAPTURE_TIME_PARSERS:
+        return iter_capture(file_name, content_type, capture_rate=capture_rate)
+
+    if os.path.isdir(source) or source.endswith(SEGMENT_SUFFIX):
+        return iter_recording(source)
+
+    raise ValueError('Unknown replay source {} (expected recording or sbs1:, ogn:, nmea: capture)'.format(source))
+
+
+def check_source(source):
+    """
+    Checks a replay source before replaying it (iterators of parse_source only open files when they are iterated).
+
+    :param source: Recording (segment or directory) or raw capture with content type (see parse_source)
+    :raises ValueError: If source is unknown, does not exist or is not a readable recording
+    """
+
+    content_type, separator, file_name = source.partition(':')
+    if separator and content_type in CAPTURE_TIME_PARSERS:
+        if not os.path.exists(file_name):
+            raise ValueError('Replay capture {} does not exist'.format(file_name))
+        return
+
+    if os.path.isdir(source):
+        segment_paths = list_segments(source)
+        if not segment_paths:
+            raise ValueError('Replay directory {} does not contain any recording segments'.format(source))
+    elif source.endswith(SEGMENT_SUFFIX):
+        segment_paths = [source]
+    else:
+        raise ValueError('Unknown replay source {} (expected recording or sbs1:, ogn:, nmea: capture)'.format(source))
+
+    for segment_path in segment_paths:
+        try:
+            RecordingReader(segment_path).close()
+        except OSError as e:
+            raise ValueError('Replay recording {} cannot be read ({})'.format(segment_path, e))
+
+
+def merge_sources(sources):
+    """
+    :param sources: List of iterators of replayed messages (each starts at time offset 0)
+    :return: Iterator of replayed messages of all sources ordered by time offset (stable per source)
+    """
+
+    def decorate(source_index, source):
+        for sequence_number, (offset, content_type, content_data, source_id) in enumerate(source):
+            yield offset, source_index, sequence_number, content_type, content_data, source_id
+
+    for offset, source_index, sequence_number, content_type, content_data, source_id in heapq.merge(*[decorate(source_index, source) for source_index, source in enumerate(sources)]):
+        yield offset, content_type, content_data, source_id
+
+
+class InputReplay(InputModule):
+    """
+    Input module that replays recorded messages into the data hub, e.g., for load tests or regression tests of the
+    FLARM output without receivers.
+
+    Sources are recordings of the recorder output module (segment or directory) or raw captures of SBS1, OGN or NMEA
+    messages (one per line, given as '<content type>:<file>'). All sources start at the beginning of the replay and are
+    replayed with their original timing divided by speed (0: as fast as possible). Replayed items get the current time as
+    timestamp.
+    """
+
+    def __init__(self, data_hub, sources, speed=1.0, parse_sbs1=False, capture_rate=DEFAULT_CAPTURE_RATE, batch_max_items=64, batch_max_latency=0.05, metrics=None):
+        # call parent constructor
+        super().__init__(data_hub=data_hub, batch_max_items=batch_max_items, batch_max_latency=batch_max_latency, metrics=metrics)
+
+        # configure logging
+        self._logger = logging.getLogger('InputReplay')
+        self._logger.info('Initializing')
+
+        # store arguments in object variables
+        self._sources = sources
+        self._speed = speed
+        self._parse_sbs1 = parse_sbs1
+        self._capture_rate = capture_rate
+
+        # check sources before starting process (raises ValueError)
+        for source in sources:
+            check_source(source)
+
+    def replay(self, data_hub_batcher):
+        """
+        :return: Number of replayed items
+        """
+
+        speed = self._speed
+        start_time = time.monotonic()
+        count = 0
+
+        parse_errors = self._metrics.counter('flightbox_parse_errors_total', process='InputReplay', content_type='sbs1')
+
+        for offset, content_type, content_data, source_id in merge_sources([parse_source(source, capture_rate=self._capture_rate) for source in self._sources]):
+            if speed > 0.0:
+                delay = start_time + offset / speed - time.monotonic()
+                if delay > 0.0:
+                    # hand over pending items before waiting
+                    data_hub_batcher.flush()
+                    time.sleep(delay)
+
+            if content_type == 'sbs1' and self._parse_sbs1:
+                # parse message like InputNetworkSbs1
+                try:
+                    content_data = parse_sbs1_message(content_data)
+                except ValueError:
+                    self._logger.warn('Problem during SBS1 data parsing')
+                    parse_errors.inc()
+                    continue
+
+                if content_data is None:
+                    continue
+
+                content_type = 'sbs1_parsed'
+
+            data_hub_batcher.put(DataHubItem(content_type, content_data, source_id=source_id))
+            count += 1
+
+        data_hub_batcher.flush()
+
+        return count
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_input_replay")
+
+        self._logger.info('Running')
+
+        # create batcher that collects items into frames (flushed by size, deadline, or before waiting)
+        data_hub_batcher = self.create_batcher()
+
+        start_time = time.monotonic()
+        count = 0
+        try:
+            count = self.replay(data_hub_batcher)
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        except:
+            self._logger.exception(sys.exc_info()[0])
+
+        duration = time.monotonic() - start_time
+        self._logger.info('Replayed {:d} items in {:.1f} s ({:.0f} items/s)'.format(count, duration, count / max(duration, 1e-6)))
+
+        # hand over pending items and close data hub queue
+        data_hub_batcher.flush()
+        self._data_hub.close()
+
+        self._logger.info('Terminating')
@@ -0,0 +1,495 @@
+import datetime
+import heapq
+import json
+import logging
+import math
+import random
+import setproctitle
+import time
+
+from data_hub.data_hub_item import DataHubItem, SOURCE_INPUT_GNSS, SOURCE_INPUT_OGN, SOURCE_INPUT_SBS1
+from input.input_module import InputModule
+import utils.calculation, utils.conversion, utils.flarm_sentence
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+# kinematic models and their default parameters (SI units, angles in degrees, ranges as [minimum, maximum])
+MODEL_DEFAULTS = {
+    # straight flight with climbs and descents, turning back towards the center at radius
+    'cruise': {'source': 'sbs1', 'radius': 60000.0, 'altitude': [300.0, 12000.0], 'speed': [60.0, 250.0], 'vertical_speed': [-10.0, 10.0], 'turn_rate': 0.0},
+    # continuous turns, e.g., aircraft in the traffic pattern
+    'turn': {'source': 'sbs1', 'radius': 30000.0, 'altitude': [300.0, 3000.0], 'speed': [40.0, 70.0], 'vertical_speed': [-3.0, 3.0], 'turn_rate': [1.5, 3.0]},
+    # circling in thermals up to maximum altitude (vertical_speed is climb rate), then gliding to the next thermal
+    'thermal': {'source': 'ogn', 'radius': 20000.0, 'altitude': [600.0, 2500.0], 'speed': [22.0, 30.0], 'vertical_speed': [0.5, 3.0], 'thermal_radius': [80.0, 200.0], 'sink': [0.7, 1.5]},
+    # taxiing on the airfield (SBS1 surface position messages)
+    'ground': {'source': 'sbs1', 'radius': 1500.0, 'altitude': 400.0, 'speed': [3.0, 15.0], 'vertical_speed': 0.0, 'turn_rate': 0.0},
+}
+
+# parameters of traffic groups (count, model and source select the kind of traffic, others override model defaults)
+GROUP_KEYS = frozenset(['count', 'model', 'source', 'radius', 'distance', 'course', 'toward_center', 'altitude', 'speed', 'vertical_speed', 'turn_rate', 'thermal_radius', 'sink', 'periods', 'aircraft_type', 'callsign'])
+
+# parameters of own-ship (position of center of scenario, NMEA sentences per second, kinematic model as for groups)
+OWN_SHIP_KEYS = frozenset(['latitude', 'longitude', 'nmea_rate', 'model', 'radius', 'course', 'altitude', 'speed', 'vertical_speed', 'turn_rate', 'thermal_radius', 'sink'])
+OWN_SHIP_DEFAULTS = {'model': 'cruise', 'altitude': 1000.0, 'speed': 40.0, 'course': 0.0, 'vertical_speed': 0.0, 'turn_rate': 0.0, 'radius': 20000.0, 'nmea_rate': 5.0}
+
+# message periods in seconds per SBS1 message type (similar to dump1090 with good reception) and of OGN beacons
+SBS1_PERIODS = {'1': 10.0, '3': 0.5, '4': 0.5, '5': 1.0}
+SBS1_GROUND_PERIODS = {'1': 10.0, '2': 1.0, '5': 5.0}
+OGN_PERIOD = 1.0
+
+# OGN aircraft types (glider, powered aircraft)
+OGN_GLIDER = 1
+OGN_POWERED = 8
+
+# first identifiers of SBS1 (ICAO) and OGN (FLARM) aircraft
+SBS1_IDENTIFIER_BASE = 0x400000
+OGN_IDENTIFIER_BASE = 0xDD0000
+
+# minimum time in seconds between generating messages (messages that are due are generated and handed over together)
+TICK_INTERVAL = 0.01
+
+# altitude in meters that gliders lose between two thermals
+GLIDE_HEIGHT = 300.0
+
+STATISTICS_INTERVAL = 60.0
+
+METERS_PER_DEGREE = 111320.0
+TWO_PI = 2 * math.pi
+
+GGA_ENCODER = utils.flarm_sentence.SentenceEncoder('GPGGA')
+RMC_ENCODER = utils.flarm_sentence.SentenceEncoder('GPRMC')
+
+
+def load_scenario(file_name):
+    """
+    :param file_name: Scenario file (JSON, see InputScenarioGenerator)
+    :return: Scenario as dictionary
+    :raises ValueError: If file is not valid JSON or scenario is invalid
+    """
+
+    with open(file_name) as scenario_file:
+        scenario = json.load(scenario_file)
+
+    create_aircraft(scenario)
+
+    return scenario
+
+
+def _get_range(parameters, name):
+    # value is either a number or a range [minimum, maximum]
+    value = parameters[name]
+    if isinstance(value, (int, float)):
+        return float(value), float(value)
+
+    if not isinstance(value, list) or len(value) != 2 or value[0] > value[1]:
+        raise ValueError('Invalid range of scenario parameter {}: {}'.format(name, value))
+
+    return float(value[0]), float(value[1])
+
+
+def _merge_defaults(parameters, valid_keys, defaults):
+    unknown_keys = set(parameters) - valid_keys
+    if unknown_keys:
+        raise ValueError('Unknown scenario parameters: {}'.format(', '.join(sorted(unknown_keys))))
+
+    model = parameters.get('model', defaults.get('model'))
+    if model not in MODEL_DEFAULTS:
+        raise ValueError('Unknown kinematic model {} (expected {})'.format(model, ', '.join(sorted(MODEL_DEFAULTS))))
+
+    merged = dict(MODEL_DEFAULTS[model])
+    merged.update(defaults)
+    merged.update(parameters)
+    merged['model'] = model
+
+    return merged
+
+
+def create_aircraft(scenario):
+    """
+    :param scenario: Scenario as dictionary (see InputScenarioGenerator)
+    :return: Tuple of own-ship and list of other aircraft (ScenarioAircraft objects at time 0)
+    :raises ValueError: If scenario is invalid
+    """
+
+    if 'own_ship' not in scenario or 'latitude' not in scenario['own_ship'] or 'longitude' not in scenario['own_ship']:
+        raise ValueError('Scenario requires own_ship with latitude and longitude')
+
+    random_generator = random.Random(scenario.get('seed', 1))
+
+    # own-ship starts at center of scenario
+    parameters = _merge_defaults(scenario['own_ship'], OWN_SHIP_KEYS, OWN_SHIP_DEFAULTS)
+    nmea_rate = float(parameters['nmea_rate'])
+    own_ship = ScenarioAircraft(0, 'OWNSHIP', parameters, random_generator, periods={'nmea': 1.0 / nmea_rate} if nmea_rate > 0 else {}, start_distance=0.0)
+
+    aircraft = []
+    identifiers = {'sbs1': SBS1_IDENTIFIER_BASE, 'ogn': OGN_IDENTIFIER_BASE}
+
+    for group in scenario.get('traffic', []):
+        parameters = _merge_defaults(group, GROUP_KEYS, {})
+
+        source = parameters['source']
+        if source not in identifiers:
+            raise ValueError('Unknown traffic source {} (expected sbs1 or ogn)'.format(source))
+
+        if source == 'sbs1':
+            periods = dict(parameters.get('periods', SBS1_GROUND_PERIODS if parameters['model'] == 'ground' else SBS1_PERIODS))
+            unknown_types = set(periods) - set(['1', '2', '3', '4', '5'])
+            if unknown_types:
+                raise ValueError('Unknown SBS1 message types: {}'.format(', '.join(sorted(unknown_types))))
+        else:
+            periods = {'ogn': float(parameters.get('periods', {}).get('ogn', OGN_PERIOD))}
+
+        if any(period <= 0.0 for period in periods.values()):
+            raise ValueError('Message periods must be positive: {}'.format(periods))
+
+        if 'aircraft_type' not in parameters:
+            parameters['aircraft_type'] = OGN_GLIDER if parameters['model'] == 'thermal' else OGN_POWERED
+
+        for i in range(int(parameters.get('count', 1))):
+            identifier = identifiers[source]
+            identifiers[source] += 1
+
+            callsign = '{}{:04d}'.format(parameters.get('callsign', 'SCN'), len(aircraft) % 10000)
+            aircraft.append(ScenarioAircraft(identifier, callsign, parameters, random_generator, periods=periods))
+
+    return own_ship, aircraft
+
+
+class ScenarioAircraft(object):
+    """
+    Kinematic state of one aircraft in meters east and north of the center of the scenario. The state is advanced
+    analytically (straight lines and circular arcs), i.e., only when messages of the aircraft are generated.
+    """
+
+    __slots__ = ('identifier', 'callsign', 'model', 'source', 'periods', 'aircraft_type', 'time', 'east', 'north', 'altitude', 'speed', 'course', 'vertical_speed', 'turn_rate',
+                 'radius', 'altitude_min', 'altitude_max', 'climb_rate', 'sink_rate', 'thermal_turn_rate', 'glide_altitude', 'on_ground')
+
+    def __init__(self, identifier, callsign, parameters, random_generator, periods, start_distance=None):
+        self.identifier = identifier
+        self.callsign = callsign
+        self.model = parameters['model']
+        self.source = parameters.get('source')
+        self.periods = periods
+        self.aircraft_type = parameters.get('aircraft_type', OGN_POWERED)
+        self.time = 0.0
+
+        self.radius = float(parameters['radius'])
+        self.altitude_min, self.altitude_max = _get_range(parameters, 'altitude')
+        self.altitude = random_generator.uniform(self.altitude_min, self.altitude_max)
+        self.speed = random_generator.uniform(*_get_range(parameters, 'speed'))
+        self.vertical_speed = random_generator.uniform(*_get_range(parameters, 'vertical_speed'))
+        self.on_ground = self.model == 'ground'
+
+        # start position (uniformly distributed in area between minimum and maximum distance)
+        if start_distance is None:
+            distance_min, distance_max = _get_range(parameters, 'distance') if 'distance' in parameters else (0.0, self.radius)
+            start_distance = math.sqrt(random_generator.uniform(distance_min ** 2, distance_max ** 2))
+        direction = random_generator.uniform(0.0, TWO_PI)
+        self.east = start_distance * math.sin(direction)
+        self.north = start_distance * math.cos(direction)
+
+        if parameters.get('toward_center') and start_distance > 0.0:
+            self.course = (direction + math.pi) % TWO_PI
+        elif 'course' in parameters:
+            self.course = math.radians(random_generator.uniform(*_get_range(parameters, 'course'))) % TWO_PI
+        else:
+            self.course = random_generator.uniform(0.0, TWO_PI)
+
+        # turn direction is random
+        turn_direction = random_generator.choice((-1.0, 1.0))
+        self.turn_rate = 0.0
+        if 'turn_rate' in parameters and self.model != 'thermal':
+            self.turn_rate = turn_direction * math.radians(random_generator.uniform(*_get_range(parameters, 'turn_rate')))
+
+        self.climb_rate = 0.0
+        self.sink_rate = 0.0
+        self.thermal_turn_rate = 0.0
+        self.glide_altitude = None
+        if self.model == 'thermal':
+            self.climb_rate = abs(self.vertical_speed)
+            self.sink_rate = random_generator.uniform(*_get_range(parameters, 'sink'))
+            self.thermal_turn_rate = turn_direction * self.speed / random_generator.uniform(*_get_range(parameters, 'thermal_radius'))
+
+            # start circling or gliding
+            if random_generator.random() < 0.7:
+                self._start_thermal()
+            else:
+                self._start_glide()
+
+    def _start_thermal(self):
+        self.glide_altitude = None
+        self.turn_rate = self.thermal_turn_rate
+        self.vertical_speed = self.climb_rate
+
+    def _start_glide(self):
+        self.glide_altitude = max(self.altitude - GLIDE_HEIGHT, self.altitude_min)
+        self.turn_rate = 0.0
+        self.vertical_speed = -self.sink_rate
+
+        # glide back towards center if far away, otherwise to the side of the thermal
+        if self.east ** 2 + self.north ** 2 > (0.8 * self.radius) ** 2:
+            self.course = math.atan2(-self.east, -self.north) % TWO_PI
+        else:
+            self.course = (self.course + 2.4) % TWO_PI
+
+    def advance(self, now):
+        """
+        :param now: Time in seconds since start of scenario
+        """
+
+        dt = now - self.time
+        if dt <= 0.0:
+            return
+        self.time = now
+
+        if self.turn_rate:
+            # circular arc (course is measured clockwise from north)
+            new_course = self.course + self.turn_rate * dt
+            turn_radius = self.speed / self.turn_rate
+            self.east += turn_radius * (math.cos(self.course) - math.cos(new_course))
+            self.north += turn_radius * (math.sin(new_course) - math.sin(self.course))
+            self.course = new_course % TWO_PI
+        else:
+            self.east += self.speed * math.sin(self.course) * dt
+            self.north += self.speed * math.cos(self.course) * dt
+
+        self.altitude += self.vertical_speed * dt
+
+        if self.model == 'thermal':
+            if self.glide_altitude is None and self.altitude >= self.altitude_max:
+                self.altitude = self.altitude_max
+                self._start_glide()
+            elif self.glide_altitude is not None and self.altitude <= self.glide_altitude:
+                self._start_thermal()
+            return
+
+        # climb and descend between altitude limits
+        if self.altitude > self.altitude_max:
+            self.altitude = self.altitude_max
+            self.vertical_speed = -abs(self.vertical_speed)
+        elif self.altitude < self.altitude_min:
+            self.altitude = self.altitude_min
+            self.vertical_speed = abs(self.vertical_speed)
+
+        # turn back towards center
+        if not self.turn_rate and self.east ** 2 + self.north ** 2 > self.radius ** 2:
+            self.course = math.atan2(-self.east, -self.north) % TWO_PI
+
+
+def format_sbs1_message(message_type, aircraft, latitude, longitude, date, time_of_day):
+    """
+    :param message_type: SBS1 message type ('1' to '5')
+    :param date: Date as 'yyyy/mm/dd'
+    :param time_of_day: Time as 'hh:mm:ss.fff'
+    :return: SBS1 message (as generated by dump1090 on port 30003)
+    """
+
+    icao = '{:06X}'.format(aircraft.identifier)
+    altitude = '{:.0f}'.format(utils.conversion.meters_to_feet(aircraft.altitude))
+
+    if message_type == '3':
+        return 'MSG,3,1,1,{0},1,{1},{2},{1},{2},,{3},,,{4:.5f},{5:.5f},,,0,0,0,0'.format(icao, date, time_of_day, altitude, latitude, longitude)
+    elif message_type == '4':
+        return 'MSG,4,1,1,{0},1,{1},{2},{1},{2},,,{3:.0f},{4:.1f},,,{5:.0f},,,,,0'.format(icao, date, time_of_day, utils.conversion.mps_to_knots(aircraft.speed), math.degrees(aircraft.course), utils.conversion.mps_to_fpm(aircraft.vertical_speed))
+    elif message_type == '5':
+        return 'MSG,5,1,1,{0},1,{1},{2},{1},{2},,{3},,,,,,,0,,0,{4}'.format(icao, date, time_of_day, altitude, '-1' if aircraft.on_ground else '0')
+    elif message_type == '1':
+        return 'MSG,1,1,1,{0},1,{1},{2},{1},{2},{3},,,,,,,,0,0,0,0'.format(icao, date, time_of_day, aircraft.callsign)
+    elif message_type == '2':
+        return 'MSG,2,1,1,{0},1,{1},{2},{1},{2},,{3},{4:.0f},{5:.1f},{6:.5f},{7:.5f},,,,,,-1'.format(icao, date, time_of_day, altitude, utils.conversion.mps_to_knots(aircraft.speed), math.degrees(aircraft.course), latitude, longitude)
+
+    raise ValueError('Unknown SBS1 message type {}'.format(message_type))
+
+
+def _format_aprs_coordinate(coordinate, degree_digits, hemispheres):
+    # (D)DDMM.MM with hemisphere and third decimal digit of minutes (position precision enhancement)
+    thousandths = int(round(abs(coordinate) * 60000))
+    degrees, thousandths = divmod(thousandths, 60000)
+
+    return '{:0{}d}{:02d}.{:02d}{}'.format(degrees, degree_digits, thousandths // 1000, (thousandths % 1000) // 10, hemispheres[0] if coordinate >= 0 else hemispheres[1]), thousandths % 10
+
+
+def format_ogn_beacon(aircraft, latitude, longitude, time_of_day):
+    """
+    :param time_of_day: Time as 'hhmmss'
+    :return: OGN beacon as generated by ogn-decode with receiver location 0, i.e., with relative FLARM coordinates (see
+    utils.calculation.abs_from_rel_flarm_coordinate)
+    """
+
+    aprs_latitude, latitude_digit = _format_aprs_coordinate(utils.calculation.lat_rel_from_abs_flarm_coordinate(latitude), 2, 'NS')
+    aprs_longitude, longitude_digit = _format_aprs_coordinate(utils.calculation.lon_rel_from_abs_flarm_coordinate(longitude), 3, 'EW')
+
+    # address type FLARM (2)
+    return 'FLR{0:06X}>APRS,qAS,Scenario:/{1}h{2}/{3}\'{4:03d}/{5:03d}/A={6:06d} !W{7}{8}! id{9:02X}{0:06X} {10:+04.0f}fpm {11:+.1f}rot'.format(
+        aircraft.identifier, time_of_day, aprs_latitude, aprs_longitude, int(round(math.degrees(aircraft.course))) % 360, min(int(utils.conversion.mps_to_knots(aircraft.speed)), 999),
+        max(int(utils.conversion.meters_to_feet(aircraft.altitude)), 0), latitude_digit, longitude_digit, (aircraft.aircraft_type << 2) | 2,
+        utils.conversion.mps_to_fpm(aircraft.vertical_speed), math.degrees(aircraft.turn_rate) / 3.0)
+
+
+def _format_nmea_coordinate(coordinate, degree_digits, hemispheres):
+    # (D)DDMM.MMMMM and hemisphere
+    hundred_thousandths = int(round(abs(coordinate) * 6000000))
+    degrees, hundred_thousandths = divmod(hundred_thousandths, 6000000)
+
+    return '{:0{}d}{:02d}.{:05d}'.format(degrees, degree_digits, hundred_thousandths // 100000, hundred_thousandths % 100000), hemispheres[0] if coordinate >= 0 else hemispheres[1]
+
+
+def format_nmea_sentences(aircraft, latitude, longitude, date, time_of_day):
+    """
+    :param date: Date as 'ddmmyy'
+    :param time_of_day: Time as 'hhmmss.ss'
+    :return: GGA and RMC sentences of own-ship (without line terminator, like the serial GNSS input)
+    """
+
+    nmea_latitude, latitude_hemisphere = _format_nmea_coordinate(latitude, 2, 'NS')
+    nmea_longitude, longitude_hemisphere = _format_nmea_coordinate(longitude, 3, 'EW')
+
+    gga = GGA_ENCODER.encode((time_of_day, nmea_latitude, latitude_hemisphere, nmea_longitude, longitude_hemisphere, '1', '12', '0.8', '{:.1f}'.format(aircraft.altitude), 'M', '47.3', 'M', '', ''))
+    rmc = RMC_ENCODER.encode((time_of_day, 'A', nmea_latitude, latitude_hemisphere, nmea_longitude, longitude_hemisphere, '{:.1f}'.format(utils.conversion.mps_to_knots(aircraft.speed)), '{:.1f}'.format(math.degrees(aircraft.course)), date, '', '', 'A'))
+
+    return [gga[:-2].decode('ascii'), rmc[:-2].decode('ascii')]
+
+
+class InputScenarioGenerator(InputModule):
+    """
+    Input module that simulates traffic around the own-ship according to a scenario, e.g., for load tests or for
+    checking the FLARM output without receivers. Aircraft are reported as SBS1 messages (types 1 to 5, as dump1090) or
+    OGN beacons (relative FLARM coordinates, as ogn-decode) and the own-ship as GGA and RMC sentences.
+
+    Scenarios are dictionaries (see load_scenario for JSON files and input/scenarios for examples):
+        own_ship: latitude and longitude of center of scenario, nmea_rate (sentences of each type per second) and
+            kinematic model like traffic groups (without count and source)
+        traffic: list of groups with count, model (cruise, turn, thermal or ground), source (sbs1 or ogn), and
+            parameters that override the defaults of the model (see MODEL_DEFAULTS), e.g., altitude [m], speed [m/s],
+            vertical_speed [m/s], turn_rate [deg/s], radius [m], distance [m] of start position from center, course [deg],
+            toward_center, periods (seconds per message type), aircraft_type (OGN), callsign (prefix)
+        seed: seed of random start positions and parameters (default: 1)
+        duration: time in seconds after which the generator terminates (default: unlimited)
+
+    Messages are scheduled per aircraft and message type, and all messages that are due are generated together every
+    TICK_INTERVAL seconds.
+    """
+
+    def __init__(self, data_hub, scenario, duration=None, batch_max_items=64, batch_max_latency=0.05, metrics=None):
+        # call parent constructor
+        super().__init__(data_hub=data_hub, batch_max_items=batch_max_items, batch_max_latency=batch_max_latency, metrics=metrics)
+
+        # configure logging
+        self._logger = logging.getLogger('InputScenarioGenerator')
+        self._logger.info('Initializing')
+
+        # store arguments in object variables
+        self._scenario = scenario
+        self._duration = duration if duration is not None else scenario.get('duration')
+
+        # check scenario before starting process
+        own_ship, aircraft = create_aircraft(scenario)
+        self._logger.info('Scenario with {:d} aircraft'.format(len(aircraft)))
+
+    def generate(self, data_hub_batcher):
+        """
+        :return: Number of generated messages
+        """
+
+        own_ship, aircraft = create_aircraft(self._scenario)
+        all_aircraft = [own_ship] + aircraft
+
+        # local coordinates (meters east and north of center) are converted to degrees with constant factors
+        center_latitude = float(self._scenario['own_ship']['latitude'])
+        center_longitude = float(self._scenario['own_ship']['longitude'])
+        latitude_factor = 1.0 / METERS_PER_DEGREE
+        longitude_factor = 1.0 / (METERS_PER_DEGREE * math.cos(math.radians(center_latitude)))
+
+        # schedule first message of each aircraft and message type at random phase
+        random_generator = random.Random(self._scenario.get('seed', 1))
+        schedule = []
+        for index, current_aircraft in enumerate(all_aircraft):
+            for message_type, period in sorted(current_aircraft.periods.items()):
+                schedule.append((random_generator.uniform(0.0, period), index, message_type))
+        heapq.heapify(schedule)
+
+        duration = self._duration
+        start_time = time.monotonic()
+        statistics_time = start_time + STATISTICS_INTERVAL
+        count = 0
+        statistics_count = 0
+        max_lag = 0.0
+
+        while True:
+            now = time.monotonic() - start_time
+            if duration is not None and now >= duration:
+                break
+
+            wall_time = datetime.datetime.utcnow()
+            sbs1_date = wall_time.strftime('%Y/%m/%d')
+            sbs1_time = wall_time.strftime('%H:%M:%S.') + '{:03d}'.format(wall_time.microsecond // 1000)
+            ogn_time = wall_time.strftime('%H%M%S')
+            nmea_date = wall_time.strftime('%d%m%y')
+            nmea_time = ogn_time + '.{:02d}'.format(wall_time.microsecond // 10000)
+
+            while schedule and schedule[0][0] <= now:
+                scheduled_time, index, message_type = schedule[0]
+                current_aircraft = all_aircraft[index]
+                heapq.heapreplace(schedule, (scheduled_time + current_aircraft.periods[message_type], index, message_type))
+
+                if now - scheduled_time > max_lag:
+                    max_lag = now - scheduled_time
+
+                current_aircraft.advance(scheduled_time)
+                latitude = center_latitude + current_aircraft.north * latitude_factor
+                longitude = center_longitude + current_aircraft.east * longitude_factor
+
+                if message_type == 'nmea':
+                    for sentence in format_nmea_sentences(current_aircraft, latitude, longitude, nmea_date, nmea_time):
+                        data_hub_batcher.put(DataHubItem('nmea', sentence, source_id=SOURCE_INPUT_GNSS))
+                        count += 1
+                elif message_type == 'ogn':
+                    data_hub_batcher.put(DataHubItem('ogn', format_ogn_beacon(current_aircraft, latitude, longitude, ogn_time), source_id=SOURCE_INPUT_OGN))
+                    count += 1
+                else:
+                    data_hub_batcher.put(DataHubItem('sbs1', format_sbs1_message(message_type, current_aircraft, latitude, longitude, sbs1_date, sbs1_time), source_id=SOURCE_INPUT_SBS1))
+                    count += 1
+
+            # hand over messages of this tick before waiting
+            data_hub_batcher.flush()
+
+            if time.monotonic() >= statistics_time:
+                self._logger.info('Generated {:.0f} messages per second, maximum lag {:.3f} s'.format((count - statistics_count) / STATISTICS_INTERVAL, max_lag))
+                statistics_time += STATISTICS_INTERVAL
+                statistics_count = count
+                max_lag = 0.0
+
+            # wait for next message that is due (at least one tick)
+            next_time = schedule[0][0] if schedule else now + 1.0
+            if duration is not None:
+                next_time = min(next_time, duration)
+            time.sleep(max(start_time + next_time - time.monotonic(), TICK_INTERVAL))
+
+        return count
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_input_scenario_generator")
+
+        self._logger.info('Running')
+
+        # create batcher that collects items into frames (flushed by size, deadline, or before waiting)
+        data_hub_batcher = self.create_batcher()
+
+        start_time = time.monotonic()
+        count = 0
+        try:
+            count = self.generate(data_hub_batcher)
+        except(KeyboardInterrupt, SystemExit):
+            pass
+
+        duration = time.monotonic() - start_time
+        self._logger.info('Generated {:d} messages in {:.1f} s ({:.0f} messages/s)'.format(count, duration, count / max(duration, 1e-6)))
+
+        # hand over pending items and close data hub queue
+        data_hub_batcher.flush()
+        self._data_hub.close()
+
+        self._logger.info('Terminating')
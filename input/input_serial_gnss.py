@@ -1,24 +1,113 @@
+import asyncio
 import logging
 import serial
 import setproctitle
-import time
 
-from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_item import DataHubItem, SOURCE_INPUT_GNSS
 from input.input_module import InputModule
+from utils.line_framer import NmeaLineFramer
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
 
+# sentence types that are forwarded by default (used for own position, any talker)
+DEFAULT_SENTENCE_TYPES = ['GGA', 'GLL', 'VTG', 'RMC']
+
+
+class SerialGnssReader(object):
+    """
+    Reads all data that is available on serial port when the asyncio loop reports it as readable (no blocking calls),
+    reassembles sentences, and hands over desired ones to data hub.
+    """
+
+    def __init__(self, serial_port, data_hub_batcher, sentence_types):
+        self._logger = logging.getLogger('InputSerialGnss.Reader')
+
+        # store arguments in object variables
+        self._serial_port = serial_port
+        self._data_hub_batcher = data_hub_batcher
+
+        # check log level once instead of building debug strings for every chunk
+        self._debug_enabled = self._logger.isEnabledFor(logging.DEBUG)
+
+        # initialize framer that keeps partial sentences between reads and filters sentence types before decoding
+        self._line_framer = NmeaLineFramer(sentence_types=sentence_types, name='InputSerialGnss.Framer')
+
+        # initialize future that is done when serial port fails
+        self._closed = asyncio.Future()
+
+    def get_closed(self):
+        return self._closed
+
+    def read(self):
+        try:
+            # get all buffered data (at least one byte, as port has been reported readable)
+            data = self._serial_port.read(max(self._serial_port.in_waiting, 1))
+        except (serial.SerialException, OSError) as e:
+            self._logger.warning('Could not read from serial port ({})'.format(e))
+            if not self._closed.done():
+                self._closed.set_result(None)
+            return
+
+        if self._debug_enabled:
+            self._logger.debug('Data received: {!r}'.format(data))
+
+        for sentence in self._line_framer.feed(data):
+            # generate new data hub item and hand over to data hub
+            data_hub_item = DataHubItem('nmea', sentence, source_id=SOURCE_INPUT_GNSS)
+            self._data_hub_batcher.put(data_hub_item)
+
+    def get_line_framer(self):
+        return self._line_framer
+
+
+@asyncio.coroutine
+def read_loop(loop, data_hub_batcher, port, baud_rate, sentence_types):
+    logger = logging.getLogger('InputSerialGnss.ReadLoop')
+
+    while True:
+        # wait before attaching to serial port
+        yield from asyncio.sleep(5)
+
+        try:
+            # create non-blocking serial object (reads return buffered data only)
+            s = serial.Serial(port, baud_rate, timeout=0)
+        except (serial.SerialException, OSError, ValueError):
+            logger.warning('Could not attach to serial port {} with baud rate {:d}'.format(port, baud_rate))
+            continue
+
+        logger.info('Attached to serial port {} with baud rate {:d}'.format(port, baud_rate))
+
+        # read whenever loop reports data on serial port
+        serial_gnss_reader = SerialGnssReader(serial_port=s, data_hub_batcher=data_hub_batcher, sentence_types=sentence_types)
+        loop.add_reader(s.fileno(), serial_gnss_reader.read)
+
+        try:
+            yield from serial_gnss_reader.get_closed()
+        finally:
+            loop.remove_reader(s.fileno())
+
+            # hand over pending items before re-attaching
+            data_hub_batcher.flush()
+            s.close()
+
+            line_framer = serial_gnss_reader.get_line_framer()
+            logger.info('Detached from serial port ({} lines, {} filtered, {} discarded)'.format(line_framer.get_line_count(), line_framer.get_filtered_count(), line_framer.get_discarded_count()))
+
+
 class InputSerialGnss(InputModule):
     """
     Input module that connects to serial GNSS device to get NMEA position data.
+
+    Only sentences of the given types (e.g., 'GGA' for any talker or 'GPGSV' for one talker, None: all sentences) are
+    forwarded to the data hub.
     """
 
-    def __init__(self, data_hub, port, baud_rate):
+    def __init__(self, data_hub, port, baud_rate, sentence_types=DEFAULT_SENTENCE_TYPES, batch_max_items=64, batch_max_latency=0.05, metrics=None):
         # call parent constructor
-        super().__init__(data_hub=data_hub)
+        super().__init__(data_hub=data_hub, batch_max_items=batch_max_items, batch_max_latency=batch_max_latency, metrics=metrics)
 
         # configure logging
         self._logger = logging.getLogger('InputSerialGnss')
@@ -27,50 +116,30 @@ class InputSerialGnss(InputModule):
         # store parameters in object variables
         self._port = port
         self._baud_rate = baud_rate
+        self._sentence_types = sentence_types
 
     def run(self):
         setproctitle.setproctitle("flightbox_input_serial_gnss")
 
         self._logger.info('Running')
 
-        # initialize serial object
-        s = None
-
-        while True:
-            try:
-                # wait before attaching to serial port
-                time.sleep(5)
-
-                # create serial object
-                s = serial.Serial(self._port, self._baud_rate)
-
-                # read loop
-                while True:
-                    try:
-                        # get line from serial device (blocking call)
-                        line = s.readline().decode().strip()
-                    except:
-                        # in case read was unsuccessful, exit read loop
-                        break
-
-                    self._logger.debug('Data received: {!r}'.format(line))
-
-                    # generate new data hub item and hand over to data hub
-                    data_hub_item = DataHubItem('nmea', line)
-                    self._data_hub.put(data_hub_item)
-            except(KeyboardInterrupt, SystemExit):
-                # exit re-connect loop in case of termination is requested
-                break
-            except:
-                self._logger.warning('Could not attach to serial port {} with baud rate {:d}'.format(self._port, self._baud_rate))
-
-                # continue in any other exception case
-                pass
-            finally:
-                if s:
-                    s.close()
-
-        # close data input queue
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        # create batcher that collects items into frames (flushed by size or deadline)
+        data_hub_batcher = self.create_batcher(loop=loop)
+
+        try:
+            # start loop
+            loop.run_until_complete(read_loop(loop=loop, data_hub_batcher=data_hub_batcher, port=self._port, baud_rate=self._baud_rate, sentence_types=self._sentence_types))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            loop.stop()
+            loop.close()
+
+        # hand over pending items and close data hub queue
+        data_hub_batcher.flush()
         self._data_hub.close()
 
         self._logger.info('Terminating')
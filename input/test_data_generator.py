@@ -2,7 +2,7 @@ import datetime
 import logging
 import time
 
-from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_item import DataHubItem, SOURCE_TEST
 from input.input_module import InputModule
 
 __author__ = "Thorsten Biermann"
@@ -29,7 +29,7 @@ class TestDataGenerator(InputModule):
         while True:
             try:
                 # create new item for data hub
-                data_hub_item = DataHubItem('test', 'test data ' + str(datetime.datetime.now()))
+                data_hub_item = DataHubItem('test', 'test data ' + str(datetime.datetime.now()), source_id=SOURCE_TEST)
 
                 self._logger.debug('Genereated dummy data ' + str(data_hub_item))
 
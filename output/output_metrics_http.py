@@ -0,0 +1,122 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import logging
+import setproctitle
+import threading
+
+from data_hub.data_hub_ring_buffer import DataHubRingBufferReader
+from output.output_module import OutputModule
+from utils.metrics import render_metrics
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9101
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def sample_queues(queues):
+    """
+    :param queues: Dictionary of subscriber name to data hub queue (multiprocessing queue or ring buffer reader)
+    :return: Metrics of queues (see MetricsRegistry.collect) sampled at time of call
+    """
+
+    metrics = {}
+    for name, data_queue in queues.items():
+        label_string = 'queue="{}"'.format(name)
+
+        if type(data_queue) is DataHubRingBufferReader:
+            metrics.setdefault('flightbox_queue_bytes', {})[label_string] = [data_queue.get_pending()]
+            metrics.setdefault('flightbox_messages_dropped_total', {})['process="DataHubRingBuffer",' + label_string] = [data_queue.get_dropped()]
+        else:
+            try:
+                metrics.setdefault('flightbox_queue_depth', {})[label_string] = [data_queue.qsize()]
+            except NotImplementedError:
+                # qsize() is not available on all platforms (e.g., macOS)
+                pass
+
+    return metrics
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handler of GET requests of /metrics (all other paths are not found).
+    """
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        metrics = self.server.metrics_registry.collect()
+        metrics.update(sample_queues(self.server.queues))
+
+        body = render_metrics(metrics).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger('OutputMetricsHttp.Handler').debug(format % args)
+
+
+class OutputMetricsHttp(OutputModule):
+    """
+    Output module that serves the metrics of all processes (see utils/metrics.py) in Prometheus text format on
+    http://host:port/metrics. Metrics are collected from shared memory on each request; in addition, the depth of the
+    given data hub queues (dictionary of subscriber name to queue) is sampled.
+
+    The module does not subscribe to any content type, it only terminates on the poison pill of the data hub.
+    """
+
+    def __init__(self, metrics, host=DEFAULT_HOST, port=DEFAULT_PORT, queues=None):
+        # call parent constructor
+        super().__init__(metrics=metrics)
+
+        # configure logging
+        self._logger = logging.getLogger('OutputMetricsHttp')
+        self._logger.info('Initializing')
+
+        # store arguments in object variables
+        self._host = host
+        self._port = port
+        self._queues = queues if queues is not None else {}
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_output_metrics_http")
+
+        self._logger.info('Running')
+
+        # serve requests in background thread
+        http_server = HTTPServer((self._host, self._port), MetricsRequestHandler)
+        http_server.metrics_registry = self._metrics
+        http_server.queues = self._queues
+
+        server_thread = threading.Thread(target=http_server.serve_forever, name='OutputMetricsHttp.Server', daemon=True)
+        server_thread.start()
+
+        self._logger.info('Serving metrics on http://{}:{:d}/metrics'.format(self._host, self._port))
+
+        try:
+            # wait for poison pill
+            while self._data_input_queue.get() is not None:
+                pass
+        except(KeyboardInterrupt, SystemExit):
+            pass
+
+        http_server.shutdown()
+        http_server.server_close()
+
+        # close data input queue
+        self._data_input_queue.close()
+
+        self._logger.info('Terminating')
+
+    def get_desired_content_types(self):
+        return([])
@@ -1,5 +1,7 @@
 from multiprocessing import Process
 
+from utils.metrics import NULL_METRICS
+
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
@@ -10,17 +12,23 @@ class OutputModule(Process):
     Generic output module class.
     """
 
-    def __init__(self):
+    def __init__(self, metrics=None):
         # call parent constructor
         super().__init__()
 
         # initialize data input queue
         self._data_input_queue = None
 
+        # set metrics registry (disabled if not given)
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+
     def set_data_input_queue(self, data_input_queue):
         self._data_input_queue = data_input_queue
 
         self._logger.debug('Received data input queue')
 
+    def get_data_input_queue(self):
+        return self._data_input_queue
+
     def get_desired_content_types(self):
         return(['ANY'])
@@ -1,57 +1,233 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import logging
 import setproctitle
 import sys
-from threading import Lock
+import time
 
-from data_hub.data_hub_item import DataHubItem
+from data_hub.data_hub_queue_bridge import DataHubQueueBridge
 from output.output_module import OutputModule
+from utils.latency import LatencyProbe
+from utils.metrics import NULL_METRICS
 
 __author__ = "Thorsten Biermann"
 __copyright__ = "Copyright 2015, Thorsten Biermann"
 __email__ = "thorsten.biermann@gmail.com"
 
 
+# write buffer limits per client (bytes): writing is paused above high watermark and resumed below low watermark
+WRITE_BUFFER_HIGH = 16 * 1024
+WRITE_BUFFER_LOW = 4 * 1024
+
+# clients are disconnected if their write buffer exceeds this size or writing is paused longer than timeout (seconds)
+WRITE_BUFFER_MAX = 64 * 1024
+PAUSE_TIMEOUT = 10.0
+
+# profile of clients that do not select one
+DEFAULT_PROFILE = 'all'
+
+
+class AirConnectProfile(object):
+    """
+    Subscription profile of AirConnect clients: whether traffic (flarm) sentences are forwarded, which NMEA sentence
+    types (without talker, None: all), and the minimum interval in seconds between two NMEA sentences of the same type
+    (0: no decimation).
+
+    The selection is computed once per profile and loop iteration for all clients using this profile.
+    """
+
+    def __init__(self, name, description, traffic=True, sentence_types=None, interval=0.0):
+        # store arguments in object variables
+        self._name = name
+        self._description = description
+        self._traffic = traffic
+        self._interval = interval
+
+        # precompute accepted sentence types as encoded by encode_items (None: all)
+        if sentence_types is None:
+            self._sentence_types = None
+        else:
+            self._sentence_types = frozenset(sentence_type.encode() for sentence_type in sentence_types)
+
+        # initialize decimation slot of last forwarded sentence per sentence type
+        self._last_slots = {}
+
+    def get_name(self):
+        return self._name
+
+    def get_description(self):
+        return self._description
+
+    def select(self, encoded_items):
+        """
+        :param encoded_items: List of encoded items (see encode_items)
+        :return: Tuple of list of selected sentences, list of selected sentences except traffic (flarm), and number of
+        selected traffic sentences
+        """
+
+        chunks = []
+        non_traffic_chunks = []
+        traffic_count = 0
+
+        sentence_types = self._sentence_types
+        interval = self._interval
+        last_slots = self._last_slots
+
+        for is_traffic, sentence_type, timestamp, chunk in encoded_items:
+            if is_traffic:
+                if self._traffic:
+                    chunks.append(chunk)
+                    traffic_count += 1
+                continue
+
+            if sentence_types is not None and sentence_type not in sentence_types:
+                continue
+
+            if interval:
+                # forward first sentence of each type per interval
+                slot = int(timestamp / interval)
+                if last_slots.get(sentence_type) == slot:
+                    continue
+                last_slots[sentence_type] = slot
+
+            chunks.append(chunk)
+            non_traffic_chunks.append(chunk)
+
+        return chunks, non_traffic_chunks, traffic_count
+
+
+def create_profiles():
+    """
+    :return: Dictionary of all known profiles by name (new objects, as profiles keep decimation state)
+    """
+
+    profiles = [
+        AirConnectProfile('all', 'FLARM and all NMEA sentences'),
+        AirConnectProfile('flarm', 'FLARM only', sentence_types=[]),
+        AirConnectProfile('flarm_position', 'FLARM and GGA/RMC at 1 Hz', sentence_types=['GGA', 'RMC'], interval=1.0)
+    ]
+
+    return dict([(profile.get_name(), profile) for profile in profiles])
+
+
+def encode_items(data_hub_items):
+    """
+    :param data_hub_items: List of data hub items of type nmea (str) or flarm (bytes including line terminator)
+    :return: List of tuples of traffic flag, sentence type (bytes without talker, e.g., b'GGA'), timestamp and encoded
+    sentence
+    """
+
+    encoded_items = []
+
+    for data_hub_item in data_hub_items:
+        content_data = data_hub_item.get_content_data()
+
+        if isinstance(content_data, bytes):
+            chunk = content_data
+        else:
+            chunk = (content_data + '\r\n').encode()
+
+        encoded_items.append((data_hub_item.get_content_type() == 'flarm', chunk[3:6], data_hub_item.get_timestamp(), chunk))
+
+    return encoded_items
+
+
 @asyncio.coroutine
-def input_processor(loop, data_input_queue, clients, clients_lock):
+def input_processor(loop, data_input_queue, clients, latency_probe=None, metrics=NULL_METRICS):
     logger = logging.getLogger('AirConnectOutput.InputProcessor')
 
-    while True:
-        # get executor that can run in the background (and is asyncio-enabled)
-        executor = ThreadPoolExecutor(max_workers=1)
+    # check log level once instead of building debug strings for every item
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
-        # get new item from data hub
-        data_hub_item = yield from loop.run_in_executor(executor, data_input_queue.get)
+    messages_in = metrics.counter('flightbox_messages_in_total', process='OutputNetworkAirConnect')
+
+    # start bridge that reads data hub queue in one long-lived thread
+    data_hub_queue_bridge = DataHubQueueBridge(loop, data_input_queue, name='AirConnectOutput.QueueBridge')
+    data_hub_queue_bridge.start()
+
+    while True:
+        # get all items that have been received since last call
+        data_hub_items = yield from data_hub_queue_bridge.get()
 
         # check if item is a poison pill
-        if data_hub_item is None:
+        if data_hub_items is None:
             logger.debug('Received poison pill')
 
             # exit loop
             break
 
-        if type(data_hub_item) is DataHubItem:
-            logger.debug('Received ' + str(data_hub_item))
+        messages_in.inc(len(data_hub_items))
+
+        if debug_enabled:
+            for data_hub_item in data_hub_items:
+                logger.debug('Received ' + str(data_hub_item))
+
+        # encode all items of this iteration once for all clients
+        encoded_items = encode_items(data_hub_items)
+
+        # group clients by profile (clients are only modified by protocol callbacks in this loop, i.e., no lock is
+        # required; lists as slow clients may be disconnected)
+        clients_by_profile = {}
+        for client in clients:
+            clients_by_profile.setdefault(client.get_profile(), []).append(client)
+
+        # select sentences once per profile
+        for profile, profile_clients in clients_by_profile.items():
+            chunks, non_traffic_chunks, traffic_count = profile.select(encoded_items)
+
+            for client in profile_clients:
+                client.send_data_chunks(chunks, non_traffic_chunks, traffic_count)
 
-            with clients_lock:
-                for client in clients:
-                    client.send_string_data(str(data_hub_item.get_content_data() + '\r\n'))
+        # age of items when handed over to sockets of clients (FLARM items are generated by the transformation)
+        if latency_probe is not None and clients:
+            now = time.monotonic()
+            latency_probe.record_items('transformation_to_airconnect', [data_hub_item for data_hub_item in data_hub_items if data_hub_item.get_content_type() == 'flarm'], now)
+            latency_probe.record_items('input_to_airconnect', [data_hub_item for data_hub_item in data_hub_items if data_hub_item.get_content_type() != 'flarm'], now)
 
 
 class AirConnectServerClientProtocol(asyncio.Protocol):
     """
     AirConnect protocol implementation (server side).
+
+    Writing is paused by the transport above the high watermark of its write buffer. While paused, traffic sentences
+    (flarm) are dropped, as they are outdated by the time the client catches up. Clients are disconnected if the write
+    buffer exceeds max_buffer_size anyway or writing is paused for more than pause_timeout seconds.
+
+    Clients receive the sentences of their profile, which is given by the port they connected to and can be changed with
+    the command 'profile <name>' ('profile' lists all profiles).
+
+    Written and dropped sentences, connected clients and written bytes per client (by port and address) are counted in
+    metrics (see utils/metrics.py).
     """
 
-    def __init__(self, clients, clients_lock, password = None):
+    def __init__(self, loop, clients, profiles, profile_name=DEFAULT_PROFILE, password = None, write_buffer_high=WRITE_BUFFER_HIGH, write_buffer_low=WRITE_BUFFER_LOW, max_buffer_size=WRITE_BUFFER_MAX, pause_timeout=PAUSE_TIMEOUT, metrics=NULL_METRICS):
         self._logger = logging.getLogger('AirConnectOutput.Server')
         self._logger.debug('Initializing')
 
         # store arguments in object variables
+        self._loop = loop
         self._clients = clients
-        self._clients_lock = clients_lock
+        self._profiles = profiles
+        self._profile = profiles[profile_name]
         self._password = password
+        self._write_buffer_high = write_buffer_high
+        self._write_buffer_low = write_buffer_low
+        self._max_buffer_size = max_buffer_size
+        self._pause_timeout = pause_timeout
+
+        # initialize flow control state
+        self._transport = None
+        self._peername = None
+        self._paused = False
+        self._pause_timeout_handle = None
+        self._disconnected = False
+        self._dropped_count = 0
+
+        # initialize metrics (series of client are registered when connection is made)
+        self._metrics = metrics
+        self._messages_out = metrics.counter('flightbox_messages_out_total', process='OutputNetworkAirConnect')
+        self._messages_dropped = metrics.counter('flightbox_messages_dropped_total', process='OutputNetworkAirConnect')
+        self._client_count = metrics.gauge('flightbox_clients', process='OutputNetworkAirConnect')
+        self._sent_bytes = None
 
         # set data forwarding flag
         self._send_data_enabled = True
@@ -61,16 +237,24 @@ class AirConnectServerClientProtocol(asyncio.Protocol):
         # initialize flag that indicates that we are waiting for a password input from the client
         self._awaiting_pass = False
 
+    def __repr__(self):
+        return '<AirConnect client {} profile={} buffered={} paused={} dropped={}>'.format(self._peername, self._profile.get_name(), self.get_buffered_bytes(), self._paused, self._dropped_count)
+
     def connection_made(self, transport):
-        peername = transport.get_extra_info('peername')
-        self._logger.info('New connection from {}'.format(peername))
+        self._peername = transport.get_extra_info('peername')
+        self._logger.info('New connection from {}'.format(self._peername))
 
-        # keep transport object
+        # keep transport object and limit its write buffer (pause_writing/resume_writing are called accordingly)
         self._transport = transport
+        self._transport.set_write_buffer_limits(high=self._write_buffer_high, low=self._write_buffer_low)
 
         # add this client to global client set
-        with self._clients_lock:
-            self._clients.add(self)
+        self._clients.add(self)
+        self._client_count.set(len(self._clients))
+
+        # count bytes per port and address (reconnecting clients continue their series)
+        if self._metrics.enabled:
+            self._sent_bytes = self._metrics.counter('flightbox_client_sent_bytes_total', process='OutputNetworkAirConnect', port=transport.get_extra_info('sockname')[1], client=self._peername[0])
 
         # request password
         if self._password:
@@ -78,11 +262,38 @@ class AirConnectServerClientProtocol(asyncio.Protocol):
             self._awaiting_pass = True
 
     def connection_lost(self, exc):
-        self._logger.info('Connection closed to {}'.format(self._transport.get_extra_info('peername')))
+        self._logger.info('Connection closed to {} ({} traffic sentences dropped)'.format(self._peername, self._dropped_count))
+
+        self._cancel_pause_timeout()
 
         # remove this client from global client set
-        with self._clients_lock:
-            self._clients.remove(self)
+        self._clients.discard(self)
+        self._client_count.set(len(self._clients))
+
+    def pause_writing(self):
+        self._logger.info('Client {} is slow, dropping traffic sentences'.format(self._peername))
+        self._paused = True
+
+        # disconnect client if it does not catch up in time
+        self._pause_timeout_handle = self._loop.call_later(self._pause_timeout, self._disconnect, 'writing paused for more than {:.1f} s'.format(self._pause_timeout))
+
+    def resume_writing(self):
+        self._logger.info('Client {} caught up'.format(self._peername))
+        self._paused = False
+
+        self._cancel_pause_timeout()
+
+    def _cancel_pause_timeout(self):
+        if self._pause_timeout_handle is not None:
+            self._pause_timeout_handle.cancel()
+            self._pause_timeout_handle = None
+
+    def _disconnect(self, reason):
+        self._logger.warning('Disconnecting client {} ({})'.format(self._peername, reason))
+        self._disconnected = True
+
+        # discard buffered data instead of waiting for it to be sent
+        self._transport.abort()
 
     def data_received(self, data):
         message = data.decode()
@@ -102,10 +313,24 @@ class AirConnectServerClientProtocol(asyncio.Protocol):
         if message_strip_lower == 'exit':
             self._transport.close()
         elif message_strip_lower == 'list_clients':
-            self._transport.write(str.encode(str(self._clients) + '\r\n'))
+            self._transport.write(str.encode('\r\n'.join(repr(client) for client in self._clients) + '\r\n'))
+        elif message_strip_lower.split(' ')[0] == 'profile':
+            self._select_profile(message_strip_lower[len('profile'):].strip())
         else:
             self._transport.write(data)
 
+    def _select_profile(self, profile_name):
+        if profile_name in self._profiles:
+            self._profile = self._profiles[profile_name]
+            self._logger.info('Client {} selected profile {}'.format(self._peername, profile_name))
+            self._transport.write(str.encode('PROFILE ' + profile_name + '\r\n'))
+        else:
+            # list available profiles
+            self._transport.write(str.encode(''.join('PROFILE? {} ({})\r\n'.format(name, profile.get_description()) for name, profile in sorted(self._profiles.items()))))
+
+    def get_profile(self):
+        return self._profile
+
     def send_string_data(self, data):
         self.send_data(str.encode(data))
 
@@ -113,25 +338,93 @@ class AirConnectServerClientProtocol(asyncio.Protocol):
         if self._send_data_enabled:
             self._transport.write(data)
 
+    def send_data_chunks(self, chunks, non_traffic_chunks, traffic_count):
+        """
+        :param chunks: List of encoded sentences
+        :param non_traffic_chunks: List of encoded sentences without traffic (sent while writing is paused)
+        :param traffic_count: Number of traffic sentences in chunks
+        """
+
+        if not self._send_data_enabled or self._disconnected:
+            return
+
+        # drop traffic sentences while client is slow
+        if self._paused:
+            chunks = non_traffic_chunks
+            self._dropped_count += traffic_count
+            self._messages_dropped.inc(traffic_count)
+
+        if chunks:
+            # one write call for all sentences of this iteration
+            self._transport.writelines(chunks)
+
+            self._messages_out.inc(len(chunks))
+            if self._sent_bytes is not None:
+                self._sent_bytes.inc(sum(map(len, chunks)))
+
+        if self._transport.get_write_buffer_size() > self._max_buffer_size:
+            self._disconnect('write buffer exceeds {} bytes'.format(self._max_buffer_size))
+
+    def get_buffered_bytes(self):
+        """
+        :return: Number of bytes in write buffer of transport (not yet sent to client)
+        """
+
+        if self._transport is None:
+            return 0
+
+        return self._transport.get_write_buffer_size()
+
+    def get_dropped_count(self):
+        return self._dropped_count
+
 
 class OutputNetworkAirConnect(OutputModule):
     """
     Output module that provides AirConnect network interface. This is used to provide services to navigation software,
     like SkyDemon.
+
+    Sentences are encoded once per loop iteration and written to each client with one call. Per client, the write
+    buffer is limited by watermarks (write_buffer_high, write_buffer_low); slow clients do not receive traffic sentences
+    until they have caught up and are disconnected if their buffer exceeds max_buffer_size or they do not catch up
+    within pause_timeout seconds.
+
+    The server listens on every port of profile_ports (dictionary of port to name of default profile of clients
+    connecting to it).
+
+    If latency_directory is set, the age of items when they are written to clients is recorded as stage
+    'transformation_to_airconnect' (flarm) or 'input_to_airconnect' (nmea, see utils/latency.py).
     """
 
-    def __init__(self):
+    def __init__(self, profile_ports=None, write_buffer_high=WRITE_BUFFER_HIGH, write_buffer_low=WRITE_BUFFER_LOW, max_buffer_size=WRITE_BUFFER_MAX, pause_timeout=PAUSE_TIMEOUT, latency_directory=None, metrics=None):
         # call parent constructor
-        super().__init__()
+        super().__init__(metrics=metrics)
 
         # configure logging
         self._logger = logging.getLogger('AirConnectOutput')
         self._logger.info('Initializing')
 
-        # initialize client set
-        self.clients_lock = Lock()
+        # store arguments in object variables
+        self._profile_ports = profile_ports if profile_ports is not None else {2000: DEFAULT_PROFILE}
+        self._write_buffer_high = write_buffer_high
+        self._write_buffer_low = write_buffer_low
+        self._max_buffer_size = max_buffer_size
+        self._pause_timeout = pause_timeout
+        self._latency_directory = latency_directory
+
+        # initialize client set (only accessed from asyncio loop)
         self.clients = set()
 
+        # initialize profiles (shared by all clients, decimation state is kept per profile)
+        self.profiles = create_profiles()
+
+        for port, profile_name in self._profile_ports.items():
+            if profile_name not in self.profiles:
+                raise ValueError('Unknown AirConnect profile {} for port {:d}'.format(profile_name, port))
+
+    def _create_protocol(self, loop, profile_name):
+        return AirConnectServerClientProtocol(loop=loop, clients=self.clients, profiles=self.profiles, profile_name=profile_name, password=None, write_buffer_high=self._write_buffer_high, write_buffer_low=self._write_buffer_low, max_buffer_size=self._max_buffer_size, pause_timeout=self._pause_timeout, metrics=self._metrics)
+
     def run(self):
         setproctitle.setproctitle("flightbox_output_network_airconnect")
 
@@ -140,13 +433,20 @@ class OutputNetworkAirConnect(OutputModule):
         # get asyncio loop
         loop = asyncio.get_event_loop()
 
-        # create server coroutine
-        air_connect_server = loop.create_server(lambda: AirConnectServerClientProtocol(clients=self.clients, clients_lock=self.clients_lock, password=None), host='', port=2000)
+        # create server coroutine per port (clients start with profile of port)
+        air_connect_servers = []
+        for port, profile_name in sorted(self._profile_ports.items()):
+            self._logger.info('Serving profile {} on port {:d}'.format(profile_name, port))
+            air_connect_servers.append(loop.create_server(lambda profile_name=profile_name: self._create_protocol(loop, profile_name), host='', port=port))
+
+        latency_probe = None
+        if self._latency_directory is not None:
+            latency_probe = LatencyProbe(self._latency_directory, 'output_network_airconnect')
 
         # compile task list that will run in loop
         tasks = asyncio.gather(
-            asyncio.async(input_processor(loop=loop, data_input_queue=self._data_input_queue, clients=self.clients, clients_lock=self.clients_lock)),
-            asyncio.async(air_connect_server)
+            asyncio.async(input_processor(loop=loop, data_input_queue=self._data_input_queue, clients=self.clients, latency_probe=latency_probe, metrics=self._metrics)),
+            *[asyncio.async(air_connect_server) for air_connect_server in air_connect_servers]
         )
 
         try:
@@ -158,9 +458,13 @@ class OutputNetworkAirConnect(OutputModule):
             self._logger.exception(sys.exc_info()[0])
             tasks.cancel()
         finally:
-            air_connect_server.close()
+            for air_connect_server in air_connect_servers:
+                air_connect_server.close()
             loop.stop()
 
+        if latency_probe is not None:
+            latency_probe.close()
+
         # close data input queue
         self._data_input_queue.close()
 
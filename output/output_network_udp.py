@@ -0,0 +1,278 @@
+import asyncio
+import ipaddress
+import logging
+import setproctitle
+import socket
+import sys
+import time
+
+from data_hub.data_hub_queue_bridge import DataHubQueueBridge
+from output.output_module import OutputModule
+from output.output_network_airconnect import DEFAULT_PROFILE, create_profiles, encode_items
+from utils.flarm_sentence import SentenceEncoder
+from utils.nmea_parser import verify_checksum
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+# default port (common port of NMEA over UDP)
+DEFAULT_PORT = 10110
+
+# maximum UDP payload of one datagram in bytes (Ethernet/Wi-Fi MTU minus IPv4 and UDP headers)
+DEFAULT_PAYLOAD_SIZE = 1472
+
+# sequence numbers wrap around at this value
+SEQUENCE_MODULO = 65536
+
+# header sentence of each datagram: sequence number and number of following sentences
+HEADER_ENCODER = SentenceEncoder('PFBSQ')
+HEADER_MAX_SIZE = len(HEADER_ENCODER.encode((str(SEQUENCE_MODULO - 1), '9999')))
+
+STATISTICS_INTERVAL = 60.0
+
+
+def pack_datagrams(chunks, sequence_number, payload_size=DEFAULT_PAYLOAD_SIZE):
+    """
+    :param chunks: List of encoded sentences (including line terminator)
+    :param sequence_number: Sequence number of first datagram
+    :param payload_size: Maximum size of one datagram in bytes (a single sentence that does not fit is sent alone)
+    :return: Tuple of list of datagrams (header sentence followed by sentences) and sequence number of next datagram
+    """
+
+    datagrams = []
+    available_size = payload_size - HEADER_MAX_SIZE
+
+    datagram_chunks = []
+    datagram_size = 0
+
+    for chunk in chunks:
+        if datagram_chunks and datagram_size + len(chunk) > available_size:
+            datagrams.append(HEADER_ENCODER.encode((str(sequence_number), str(len(datagram_chunks)))) + b''.join(datagram_chunks))
+            sequence_number = (sequence_number + 1) % SEQUENCE_MODULO
+
+            datagram_chunks = []
+            datagram_size = 0
+
+        datagram_chunks.append(chunk)
+        datagram_size += len(chunk)
+
+    if datagram_chunks:
+        datagrams.append(HEADER_ENCODER.encode((str(sequence_number), str(len(datagram_chunks)))) + b''.join(datagram_chunks))
+        sequence_number = (sequence_number + 1) % SEQUENCE_MODULO
+
+    return datagrams, sequence_number
+
+
+def parse_datagram(datagram):
+    """
+    Counterpart of pack_datagrams for receivers.
+
+    :param datagram: Received datagram
+    :return: Tuple of sequence number and list of sentences (bytes without line terminator)
+    :raises ValueError: If header is invalid or datagram is incomplete
+    """
+
+    lines = datagram.split(b'\r\n')
+    if lines[-1]:
+        raise ValueError('Datagram does not end with line terminator')
+
+    identifier, sequence_field, count_field = verify_checksum(lines[0].decode('ascii')).split(',')
+    if identifier != 'PFBSQ':
+        raise ValueError('Invalid datagram header')
+
+    sentences = lines[1:-1]
+    if int(count_field) != len(sentences):
+        raise ValueError('Datagram is incomplete')
+
+    return int(sequence_field), sentences
+
+
+def create_socket(host, port, ttl=1, interface=None):
+    """
+    :param host: Broadcast or multicast address of receivers (or unicast address, e.g., 127.0.0.1 for testing)
+    :param port: UDP port of receivers
+    :param ttl: Time to live of multicast datagrams (1: local network only)
+    :param interface: Address of local interface for multicast (None: default route)
+    :return: Non-blocking UDP socket
+    """
+
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+    if ipaddress.ip_address(host).is_multicast:
+        udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+
+        # deliver to receivers on this host as well
+        udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+        if interface is not None:
+            udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+    udp_socket.setblocking(False)
+
+    return udp_socket
+
+
+class UdpSender(object):
+    """
+    Collects selected sentences and sends them as datagrams once per tick, i.e., the cost does not depend on the
+    number of receivers.
+    """
+
+    def __init__(self, udp_socket, address, profile, payload_size=DEFAULT_PAYLOAD_SIZE):
+        self._logger = logging.getLogger('UdpOutput.Sender')
+
+        # store arguments in object variables
+        self._udp_socket = udp_socket
+        self._address = address
+        self._profile = profile
+        self._payload_size = payload_size
+
+        # initialize sentences of current tick
+        self._pending_chunks = []
+
+        # initialize sequence number and counters
+        self._sequence_number = 0
+        self._datagram_count = 0
+        self._sentence_count = 0
+        self._byte_count = 0
+        self._error_count = 0
+
+    def put(self, data_hub_items):
+        chunks, non_traffic_chunks, traffic_count = self._profile.select(encode_items(data_hub_items))
+        self._pending_chunks.extend(chunks)
+
+    def flush(self):
+        if not self._pending_chunks:
+            return
+
+        datagrams, self._sequence_number = pack_datagrams(self._pending_chunks, self._sequence_number, self._payload_size)
+        self._sentence_count += len(self._pending_chunks)
+        self._pending_chunks = []
+
+        for datagram in datagrams:
+            try:
+                self._udp_socket.sendto(datagram, self._address)
+            except OSError as e:
+                # datagram is lost (receivers notice the gap in sequence numbers)
+                self._error_count += 1
+                self._logger.debug('Could not send datagram ({})'.format(e))
+                continue
+
+            self._datagram_count += 1
+            self._byte_count += len(datagram)
+
+    def get_statistics(self):
+        return {'datagrams': self._datagram_count, 'sentences': self._sentence_count, 'bytes': self._byte_count, 'errors': self._error_count}
+
+
+@asyncio.coroutine
+def input_processor(loop, data_input_queue, udp_sender):
+    logger = logging.getLogger('UdpOutput.InputProcessor')
+
+    # start bridge that reads data hub queue in one long-lived thread
+    data_hub_queue_bridge = DataHubQueueBridge(loop, data_input_queue, name='UdpOutput.QueueBridge')
+    data_hub_queue_bridge.start()
+
+    while True:
+        # get all items that have been received since last call
+        data_hub_items = yield from data_hub_queue_bridge.get()
+
+        # check if item is a poison pill
+        if data_hub_items is None:
+            logger.debug('Received poison pill')
+
+            # send remaining sentences and exit loop
+            udp_sender.flush()
+            break
+
+        udp_sender.put(data_hub_items)
+
+
+@asyncio.coroutine
+def send_processor(udp_sender, tick_interval):
+    logger = logging.getLogger('UdpOutput.SendProcessor')
+
+    next_statistics_time = time.monotonic() + STATISTICS_INTERVAL
+
+    while True:
+        yield from asyncio.sleep(tick_interval)
+
+        # send sentences of this tick
+        udp_sender.flush()
+
+        if time.monotonic() >= next_statistics_time:
+            next_statistics_time += STATISTICS_INTERVAL
+            logger.info('Statistics: {}'.format(udp_sender.get_statistics()))
+
+
+class OutputNetworkUdp(OutputModule):
+    """
+    Output module that sends NMEA and FLARM sentences as UDP datagrams to a broadcast or multicast address, e.g., for
+    several tablets in the same Wi-Fi network.
+
+    Once per tick, the sentences of the given profile (see output_network_airconnect) are packed into datagrams of up to
+    payload_size bytes. Each datagram starts with the sentence $PFBSQ,<sequence number>,<number of sentences>*XX, so
+    that receivers can detect lost datagrams.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, profile_name=DEFAULT_PROFILE, tick_interval=0.1, payload_size=DEFAULT_PAYLOAD_SIZE, ttl=1, interface=None):
+        # call parent constructor
+        super().__init__()
+
+        # configure logging
+        self._logger = logging.getLogger('UdpOutput')
+        self._logger.info('Initializing')
+
+        # store arguments in object variables
+        self._host = host
+        self._port = port
+        self._profile_name = profile_name
+        self._tick_interval = tick_interval
+        self._payload_size = payload_size
+        self._ttl = ttl
+        self._interface = interface
+
+        if profile_name not in create_profiles():
+            raise ValueError('Unknown profile {}'.format(profile_name))
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_output_network_udp")
+
+        self._logger.info('Running')
+
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        # create socket and sender
+        udp_socket = create_socket(self._host, self._port, ttl=self._ttl, interface=self._interface)
+        udp_sender = UdpSender(udp_socket, (self._host, self._port), create_profiles()[self._profile_name], payload_size=self._payload_size)
+
+        self._logger.info('Sending profile {} to {}:{:d}'.format(self._profile_name, self._host, self._port))
+
+        # compile task list that will run in loop
+        input_task = asyncio.async(input_processor(loop=loop, data_input_queue=self._data_input_queue, udp_sender=udp_sender))
+        send_task = asyncio.async(send_processor(udp_sender=udp_sender, tick_interval=self._tick_interval))
+
+        try:
+            # start loop (until poison pill has been received)
+            loop.run_until_complete(input_task)
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        except:
+            self._logger.exception(sys.exc_info()[0])
+        finally:
+            send_task.cancel()
+            loop.stop()
+
+        udp_socket.close()
+
+        # close data input queue
+        self._data_input_queue.close()
+
+        self._logger.info('Terminating ({})'.format(udp_sender.get_statistics()))
+
+    def get_desired_content_types(self):
+        return(['nmea', 'flarm'])
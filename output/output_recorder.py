@@ -0,0 +1,130 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import setproctitle
+import sys
+import time
+
+from data_hub.data_hub_queue_bridge import DataHubQueueBridge
+from output.output_module import OutputModule
+from utils.recording import RecordingBlock, RecordingWriter, check_compression
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+STATISTICS_INTERVAL = 60.0
+
+
+@asyncio.coroutine
+def input_processor(loop, data_input_queue, recording_writer, block_size, block_interval):
+    logger = logging.getLogger('RecorderOutput.InputProcessor')
+
+    # start bridge that reads data hub queue in one long-lived thread
+    data_hub_queue_bridge = DataHubQueueBridge(loop, data_input_queue, name='RecorderOutput.QueueBridge')
+    data_hub_queue_bridge.start()
+
+    # blocks are compressed and written in one worker thread (in order, without blocking the loop)
+    executor = ThreadPoolExecutor(max_workers=1)
+    pending_write = None
+
+    block = RecordingBlock()
+    block_deadline = time.monotonic() + block_interval
+    next_statistics_time = time.monotonic() + STATISTICS_INTERVAL
+
+    while True:
+        try:
+            # get all items that have been received since last call (wake up for writing blocks of idle periods)
+            data_hub_items = yield from asyncio.wait_for(data_hub_queue_bridge.get(), max(block_deadline - time.monotonic(), 0.0))
+        except asyncio.TimeoutError:
+            data_hub_items = []
+
+        if data_hub_items is not None:
+            for data_hub_item in data_hub_items:
+                block.add(data_hub_item)
+
+        now = time.monotonic()
+        if data_hub_items is None or block.size >= block_size or now >= block_deadline:
+            if block.count:
+                # wait for previous block (limits memory if disk is slow)
+                if pending_write is not None:
+                    yield from pending_write
+
+                pending_write = loop.run_in_executor(executor, recording_writer.write_block, block)
+                block = RecordingBlock()
+
+            block_deadline = now + block_interval
+
+        if now >= next_statistics_time:
+            next_statistics_time += STATISTICS_INTERVAL
+            logger.info('Statistics: {}'.format(recording_writer.get_statistics()))
+
+        # check if item is a poison pill
+        if data_hub_items is None:
+            logger.debug('Received poison pill')
+
+            # exit loop after last block has been written
+            if pending_write is not None:
+                yield from pending_write
+            executor.shutdown()
+            break
+
+
+class OutputRecorder(OutputModule):
+    """
+    Output module that records all data hub items into segment files in directory (see utils/recording.py).
+
+    Items are collected into blocks of up to block_size bytes or block_interval seconds, which are compressed
+    (compression 'none', 'gzip' or 'zstd') and written by a worker thread. Segments are rotated after segment_duration
+    seconds or segment_size bytes.
+    """
+
+    def __init__(self, directory, compression='none', segment_duration=3600.0, segment_size=64 * 1024 * 1024, block_size=64 * 1024, block_interval=1.0, index_interval=10.0):
+        # call parent constructor
+        super().__init__()
+
+        # configure logging
+        self._logger = logging.getLogger('RecorderOutput')
+        self._logger.info('Initializing')
+
+        check_compression(compression)
+
+        # store arguments in object variables
+        self._directory = directory
+        self._compression = compression
+        self._segment_duration = segment_duration
+        self._segment_size = segment_size
+        self._block_size = block_size
+        self._block_interval = block_interval
+        self._index_interval = index_interval
+
+    def run(self):
+        setproctitle.setproctitle("flightbox_output_recorder")
+
+        self._logger.info('Running')
+
+        # get asyncio loop
+        loop = asyncio.get_event_loop()
+
+        recording_writer = RecordingWriter(self._directory, compression=self._compression, segment_duration=self._segment_duration, segment_size=self._segment_size, index_interval=self._index_interval)
+
+        try:
+            # start loop (until poison pill has been received)
+            loop.run_until_complete(input_processor(loop=loop, data_input_queue=self._data_input_queue, recording_writer=recording_writer, block_size=self._block_size, block_interval=self._block_interval))
+        except(KeyboardInterrupt, SystemExit):
+            pass
+        except:
+            self._logger.exception(sys.exc_info()[0])
+        finally:
+            loop.stop()
+
+        recording_writer.close()
+
+        # close data input queue
+        self._data_input_queue.close()
+
+        self._logger.info('Terminating ({})'.format(recording_writer.get_statistics()))
+
+    def get_desired_content_types(self):
+        return(['ANY'])
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+import time
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+class AircraftInfo(object):
+    """
+    State of one aircraft (slotted record, no per-instance dict).
+    """
+
+    __slots__ = ('aircraft_type', 'signallevel', 'identifier', 'callsign', 'latitude', 'longitude', 'altitude',
+                 'h_speed', 'v_speed', 'course', 'last_seen', 'datatype')
+
+    def __init__(self):
+        self.aircraft_type = '0'
+        self.signallevel = 0
+        self.identifier = None
+        self.callsign = None
+        self.latitude = None
+        self.longitude = None
+        self.altitude = None
+        self.h_speed = None
+        self.v_speed = None
+        self.course = None
+        self.last_seen = None
+        self.datatype = None
+
+
+class AircraftStore(object):
+    """
+    Table of AircraftInfo records indexed by identifier. Records are additionally kept in order of their last update,
+    hence expiring stale aircraft only touches the records that are actually removed.
+
+    Timestamps are monotonic (time.monotonic()).
+    """
+
+    def __init__(self, max_age=30.0):
+        # store arguments in object variables
+        self._max_age = max_age
+
+        # initialize index (identifier -> record, ordered from least to most recently seen)
+        self._aircraft = OrderedDict()
+
+    def __len__(self):
+        return len(self._aircraft)
+
+    def __contains__(self, identifier):
+        return identifier in self._aircraft
+
+    def get(self, identifier):
+        """
+        :param identifier: Identifier of aircraft, e.g., ICAO address
+        :return: AircraftInfo object, or None if aircraft is unknown
+        """
+
+        return self._aircraft.get(identifier)
+
+    def update(self, identifier, datatype, timestamp=None):
+        """
+        Returns the record of an aircraft (created if unknown) and marks it as seen.
+
+        :param identifier: Identifier of aircraft, e.g., ICAO address
+        :param datatype: Data type of new records ('A' for ADS-B/Mode-S, 'F' for FLARM)
+        :param timestamp: Monotonic time of update, current time if None
+        :return: AircraftInfo object
+        """
+
+        aircraft = self._aircraft.get(identifier)
+
+        if aircraft is None:
+            # initialize empty AircraftInfo object
+            aircraft = AircraftInfo()
+            aircraft.identifier = identifier
+            aircraft.datatype = datatype
+            self._aircraft[identifier] = aircraft
+        else:
+            # move record to end of expiry order
+            self._aircraft.move_to_end(identifier)
+
+        # save timestamp
+        aircraft.last_seen = timestamp if timestamp is not None else time.monotonic()
+
+        return aircraft
+
+    def expire(self, now=None):
+        """
+        Removes all aircraft that have not been seen for more than the maximum age.
+
+        :param now: Monotonic time, current time if None
+        :return: Number of removed aircraft
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        oldest_allowed = now - self._max_age
+
+        count = 0
+        while self._aircraft:
+            identifier, aircraft = next(iter(self._aircraft.items()))
+            if aircraft.last_seen >= oldest_allowed:
+                break
+
+            del self._aircraft[identifier]
+            count += 1
+
+        return count
+
+    def snapshot(self):
+        """
+        :return: List of all AircraftInfo objects (from least to most recently seen)
+        """
+
+        return list(self._aircraft.values())
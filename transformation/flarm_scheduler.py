@@ -0,0 +1,206 @@
+import math
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+def get_alarm_level(flarm_messages):
+    """
+    :param flarm_messages: FLARM messages (bytes) of one target as generated by generate_flarm_messages (or None)
+    :return: Alarm level of PFLAA message (first field, e.g., '0'), None if there is no PFLAA message
+    """
+
+    if flarm_messages:
+        for flarm_message in flarm_messages:
+            if flarm_message.startswith(b'$PFLAA,'):
+                return flarm_message[7:flarm_message.index(b',', 7)].decode('ascii')
+
+    return None
+
+
+def percentile(values, fraction):
+    """
+    :param values: Sorted list of values
+    :param fraction: Percentile as fraction, e.g., 0.99
+    :return: Value at percentile (nearest rank), None if there are no values
+    """
+
+    if not values:
+        return None
+
+    return values[min(max(int(math.ceil(fraction * len(values))) - 1, 0), len(values) - 1)]
+
+
+class TargetSchedule(object):
+    """
+    Emission state of one target.
+    """
+
+    __slots__ = ('checked_time', 'emitted_time', 'emitted_last_seen', 'emitted_north', 'emitted_east', 'alarm_level')
+
+    def __init__(self):
+        self.checked_time = None
+        self.emitted_time = None
+        self.emitted_last_seen = None
+        self.emitted_north = None
+        self.emitted_east = None
+        self.alarm_level = None
+
+
+class FlarmScheduler(object):
+    """
+    Decides per processing cycle which targets are reported to FLARM clients:
+
+    - targets within near_distance (alarm range) and targets without position (Mode-C) with new data are checked in
+      every cycle, a change of their alarm level is emitted immediately
+    - otherwise, targets are emitted every interval seconds
+    - targets beyond near_distance that have moved less than min_change meters (relative to own position) since their
+      last emission are emitted every far_interval seconds
+
+    Latencies between reception of the newest data of a target and its emission are collected and reported as
+    percentiles.
+    """
+
+    def __init__(self, interval=1.0, far_interval=3.0, near_distance=10000.0, min_change=250.0, tick_interval=0.2, max_age=60.0):
+        # store arguments in object variables
+        self._interval = interval
+        self._far_interval = far_interval
+        self._near_distance = near_distance
+        self._min_change = min_change
+        self._max_age = max_age
+
+        # tolerate jitter of processing cycles (emission is due up to half a cycle early)
+        self._slack = tick_interval / 2.0
+
+        # initialize target states (identifier -> TargetSchedule)
+        self._targets = {}
+
+        # initialize counters and latency windows (seconds, cleared by get_statistics)
+        self._emitted_count = 0
+        self._suppressed_count = 0
+        self._alarm_count = 0
+        self._latencies = []
+        self._alarm_latencies = []
+
+    def __len__(self):
+        return len(self._targets)
+
+    def _is_near(self, relative_position):
+        return relative_position is not None and relative_position.distance <= self._near_distance
+
+    def is_due(self, identifier, last_seen, relative_position, now):
+        """
+        :param identifier: Identifier of target
+        :param last_seen: Monotonic time of newest data of target
+        :param relative_position: RelativePosition of target (None if position is unknown)
+        :param now: Monotonic time of processing cycle
+        :return: True if messages of target have to be generated in this cycle
+        """
+
+        target = self._targets.get(identifier)
+        if target is None or self._is_near(relative_position):
+            return True
+
+        # alarm level of target without position (Mode-C) only changes with new data
+        if relative_position is None and last_seen != target.emitted_last_seen:
+            return True
+
+        # targets without messages in last check are checked again after interval
+        reference_time = target.emitted_time
+        if target.alarm_level is None:
+            reference_time = target.checked_time
+
+        return now - reference_time >= self._get_interval(target, relative_position) - self._slack
+
+    def _get_interval(self, target, relative_position):
+        # far targets without alarm that have not moved noticeably
+        if target.alarm_level in (None, '0') and relative_position is not None and not self._is_near(relative_position):
+            if target.emitted_north is None or math.hypot(relative_position.north - target.emitted_north, relative_position.east - target.emitted_east) < self._min_change:
+                return self._far_interval
+
+        return self._interval
+
+    def decide(self, identifier, last_seen, relative_position, alarm_level, now):
+        """
+        :param identifier: Identifier of target
+        :param last_seen: Monotonic time of newest data of target
+        :param relative_position: RelativePosition of target (None if position is unknown)
+        :param alarm_level: Alarm level of generated messages (None if no messages have been generated)
+        :param now: Monotonic time of processing cycle
+        :return: True if generated messages have to be emitted
+        """
+
+        target = self._targets.get(identifier)
+        if target is None:
+            target = TargetSchedule()
+            self._targets[identifier] = target
+
+        if alarm_level is None:
+            emit = False
+
+        elif alarm_level != target.alarm_level:
+            # alarm threshold has been crossed (or target is new)
+            emit = True
+
+            if alarm_level != '0':
+                self._alarm_count += 1
+                self._alarm_latencies.append(now - last_seen)
+
+        else:
+            emit = now - target.emitted_time >= self._get_interval(target, relative_position) - self._slack
+
+        target.checked_time = now
+        target.alarm_level = alarm_level
+
+        if not emit:
+            if alarm_level is not None:
+                self._suppressed_count += 1
+
+            return False
+
+        # record latency of new data
+        if last_seen != target.emitted_last_seen:
+            self._latencies.append(now - last_seen)
+
+        target.emitted_time = now
+        target.emitted_last_seen = last_seen
+        if relative_position is not None:
+            target.emitted_north = relative_position.north
+            target.emitted_east = relative_position.east
+        self._emitted_count += 1
+
+        return True
+
+    def expire(self, now):
+        """
+        Removes states of targets that have not been checked for max_age seconds.
+
+        :param now: Monotonic time
+        :return: Number of removed targets
+        """
+
+        expired = [identifier for identifier, target in self._targets.items() if target.checked_time is None or now - target.checked_time > self._max_age]
+        for identifier in expired:
+            del self._targets[identifier]
+
+        return len(expired)
+
+    def get_statistics(self):
+        """
+        :return: Dict with number of emitted and suppressed target reports, number of alarm threshold crossings, and
+        percentiles (50, 90, 99, max) of latencies since last call in seconds (None if there are none)
+        """
+
+        latencies = sorted(self._latencies)
+        alarm_latencies = sorted(self._alarm_latencies)
+        self._latencies = []
+        self._alarm_latencies = []
+
+        return {
+            'emitted': self._emitted_count,
+            'suppressed': self._suppressed_count,
+            'alarms': self._alarm_count,
+            'latency': [percentile(latencies, fraction) for fraction in (0.5, 0.9, 0.99, 1.0)],
+            'alarm_latency': [percentile(alarm_latencies, fraction) for fraction in (0.5, 0.9, 0.99, 1.0)],
+        }
@@ -0,0 +1,135 @@
+from collections import namedtuple
+from configparser import ConfigParser, Error as ConfigParserError
+import logging
+import os
+import time
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+DEFAULT_FILE_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pcasconf.ini')
+
+# RSSI thresholds (modec_3, modec_2, modec_1) in dBm per Mode-C/S detection range
+MODEC_THRESHOLDS = {
+    1: (-29, -30, -31),     # ultra short
+    2: (-30, -31, -32),     # short
+    3: (-31, -32, -33),     # medium
+}
+MODEC_THRESHOLDS_LONG = (-32, -33, -34)
+
+
+PcasSettings = namedtuple('PcasSettings', ['my_icao', 'my_tail', 'modec_sep', 'modec_det', 'modec_thresholds'])
+PcasSettings.__doc__ = """
+    Immutable PCAS settings as given by pcasconf.ini. modec_thresholds holds the RSSI thresholds (modec_3, modec_2,
+    modec_1) that belong to the Mode-C/S detection range modec_det.
+    """
+
+# settings used as long as no configuration file could be read (values of the shipped pcasconf.ini)
+DEFAULT_SETTINGS = PcasSettings(my_icao='4b0652', my_tail='HBCKG', modec_sep=500.0, modec_det=1.0,
+                                modec_thresholds=MODEC_THRESHOLDS[1])
+
+
+def parse_pcas_settings(parser):
+    """
+    :param parser: ConfigParser that holds the contents of pcasconf.ini
+    :return: PcasSettings object
+    :raises ValueError: If a setting is missing or has an invalid value
+    """
+
+    try:
+        # value is written quoted by web form, e.g., my_ICAO: '4b0652,HBCKG'
+        modec_parts = parser.get('DEFAULT', 'my_ICAO').strip().strip('\'"').split(',')
+        modec_sep = float(parser.get('DEFAULT', 'modec_sep'))
+        modec_det = float(parser.get('DEFAULT', 'modec_det'))
+    except ConfigParserError as e:
+        raise ValueError(str(e))
+
+    if len(modec_parts) != 2:
+        raise ValueError('my_ICAO must have format <icao>,<tail>')
+
+    return PcasSettings(my_icao=modec_parts[0].strip(),
+                        my_tail=modec_parts[1].strip(),
+                        modec_sep=modec_sep,
+                        modec_det=modec_det,
+                        modec_thresholds=MODEC_THRESHOLDS.get(modec_det, MODEC_THRESHOLDS_LONG))
+
+
+def load_pcas_settings(file_name=DEFAULT_FILE_NAME):
+    """
+    :param file_name: Path of pcasconf.ini
+    :return: PcasSettings object
+    :raises ValueError: If file cannot be read or a setting is missing or has an invalid value
+    """
+
+    parser = ConfigParser()
+    try:
+        if not parser.read(file_name):
+            raise ValueError('Cannot read {}'.format(file_name))
+    except ConfigParserError as e:
+        raise ValueError(str(e))
+
+    return parse_pcas_settings(parser)
+
+
+class PcasSettingsLoader(object):
+    """
+    Holds the current PcasSettings and reloads them when the modification time of the configuration file changes
+    (checked at most once per check interval) or when a reload has been requested, e.g., by a SIGHUP handler.
+
+    If the file cannot be loaded, the previous settings are kept.
+    """
+
+    def __init__(self, file_name=DEFAULT_FILE_NAME, check_interval=1.0):
+        # configure logging
+        self._logger = logging.getLogger('PcasSettingsLoader')
+
+        # store arguments in object variables
+        self._file_name = file_name
+        self._check_interval = check_interval
+
+        # initialize state
+        self._settings = DEFAULT_SETTINGS
+        self._mtime = None
+        self._next_check = 0.0
+        self._reload_requested = False
+
+        self._load()
+
+    def _get_mtime(self):
+        try:
+            return os.stat(self._file_name).st_mtime
+        except OSError:
+            return None
+
+    def _load(self):
+        self._mtime = self._get_mtime()
+
+        try:
+            self._settings = load_pcas_settings(self._file_name)
+            self._logger.info('Loaded settings {}'.format(self._settings))
+        except ValueError as e:
+            self._logger.warn('Keeping settings {} ({})'.format(self._settings, e))
+
+    def request_reload(self):
+        """
+        Reloads settings with next call of get(). Safe to be used as signal handler.
+        """
+
+        self._reload_requested = True
+
+    def get(self):
+        """
+        :return: Current PcasSettings object
+        """
+
+        now = time.monotonic()
+        if self._reload_requested or now >= self._next_check:
+            self._next_check = now + self._check_interval
+
+            if self._reload_requested or self._get_mtime() != self._mtime:
+                self._reload_requested = False
+                self._load()
+
+        return self._settings
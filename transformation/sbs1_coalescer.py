@@ -0,0 +1,79 @@
+import time
+
+import utils.sbs1_parser
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+# update categories of SBS1 message types (newer updates of the same category replace older ones)
+CATEGORY_IDENTIFICATION = 0
+CATEGORY_POSITION = 1
+CATEGORY_VELOCITY = 2
+CATEGORY_SURVEILLANCE = 3
+
+CATEGORIES = {
+    utils.sbs1_parser.MSG_IDENTIFICATION: CATEGORY_IDENTIFICATION,
+    utils.sbs1_parser.MSG_SURFACE_POSITION: CATEGORY_POSITION,
+    utils.sbs1_parser.MSG_AIRBORNE_POSITION: CATEGORY_POSITION,
+    utils.sbs1_parser.MSG_VELOCITY: CATEGORY_VELOCITY,
+    utils.sbs1_parser.MSG_SURVEILLANCE: CATEGORY_SURVEILLANCE,
+}
+
+
+class Sbs1Coalescer(object):
+    """
+    Collects parsed SBS1 messages between two processing cycles and keeps only the newest identification, position,
+    velocity and surveillance update of each aircraft. Updates are handed over in the order they have been received,
+    together with their timestamp, hence the aircraft table ends up in the same state as if every message had been
+    applied.
+
+    Not thread-safe, to be used from the asyncio loop only.
+    """
+
+    def __init__(self):
+        # initialize pending updates ((icao_id, category) -> (record, timestamp))
+        self._pending = {}
+
+        # initialize counters
+        self._received_count = 0
+        self._collapsed_count = 0
+        self._applied_count = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, record, timestamp=None):
+        """
+        :param record: SBS1 message as parsed by utils.sbs1_parser.parse_sbs1_message
+        :param timestamp: Monotonic time the message has been received at, current time if None
+        """
+
+        key = (record[1], CATEGORIES[record[0]])
+
+        # remove older update, newer one is appended (keeps order of newest updates, e.g., for altitude of MSG,3 and MSG,5)
+        if self._pending.pop(key, None) is not None:
+            self._collapsed_count += 1
+
+        self._pending[key] = (record, timestamp if timestamp is not None else time.monotonic())
+        self._received_count += 1
+
+    def drain(self):
+        """
+        :return: List of (record, timestamp) tuples of all pending updates, pending updates are cleared
+        """
+
+        updates = list(self._pending.values())
+        self._pending.clear()
+
+        self._applied_count += len(updates)
+
+        return updates
+
+    def get_statistics(self):
+        """
+        :return: Dict with number of received, collapsed (replaced by newer update) and applied updates
+        """
+
+        return {'received': self._received_count, 'collapsed': self._collapsed_count, 'applied': self._applied_count}
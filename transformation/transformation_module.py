@@ -11,6 +11,6 @@ class TransformationModule(InputModule, OutputModule):
     Generic transformation module class.
     """
 
-    def __init__(self, data_hub):
-        InputModule.__init__(self, data_hub=data_hub)
-        OutputModule.__init__(self)
+    def __init__(self, data_hub, batch_max_items=64, batch_max_latency=0.05, metrics=None):
+        InputModule.__init__(self, data_hub=data_hub, batch_max_items=batch_max_items, batch_max_latency=batch_max_latency, metrics=metrics)
+        OutputModule.__init__(self, metrics=metrics)
@@ -1,483 +1,297 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from geopy.distance import vincenty
 import logging
-import pynmea2
-import re
 import setproctitle
 import sys
 from threading import Lock
 import time
 import math
-import smbus
 import serial
-from configparser import ConfigParser
-
-from data_hub.data_hub_item import DataHubItem
+import signal
+
+from data_hub.data_hub_item import DataHubItem, SOURCE_TRANSFORMATION_FLARM
+from data_hub.data_hub_queue_bridge import DataHubQueueBridge
+from transformation.aircraft_store import AircraftStore
+from transformation.flarm_scheduler import FlarmScheduler, get_alarm_level
+from transformation.pcas_settings import PcasSettingsLoader
+from transformation.sbs1_coalescer import Sbs1Coalescer
 from transformation.transformation_module import TransformationModule
-import utils.conversion, utils.calculation
+from utils.baro_altitude import BaroAltitudeProvider, create_baro_sensor
+from utils.latency import LatencyProbe
+from utils.metrics import NULL_COUNTER, NULL_METRICS
+from utils.traffic_geometry import TrafficGeometry
+import utils.conversion, utils.calculation, utils.flarm_sentence, utils.nmea_parser, utils.ogn_parser, utils.sbs1_parser
 
 __author__ = "Serge Guex"
 __copyright__ = "Copyright 2017"
 __email__ = ""
 
-logging.basicConfig(filename='/home/pi/opt/flightbox/static/flightbox.txt',format='%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p',level=logging.INFO)
+# interval of SBS1 coalescing and FLARM scheduling statistics output (seconds)
+STATISTICS_INTERVAL = 60.0
+
 #portOUT = serial.Serial('/dev/ttyUSB0', 19200)
-parser = ConfigParser()
-parser.read('/home/pi/opt/flightbox/transformation/pcasconf.ini')
 
 @asyncio.coroutine
-def input_processor(loop, data_input_queue, aircraft, aircraft_lock, gnss_status, gnss_status_lock):
+def input_processor(loop, data_input_queue, sbs1_coalescer, aircraft_store, aircraft_lock, gnss_status, gnss_status_lock, latency_probe=None, metrics=NULL_METRICS):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.InputProcessor')
 
-    while True:
-        # get executor that can run in the background (and is asyncio-enabled)
-        executor = ThreadPoolExecutor(max_workers=1)
+    # check log level once instead of building debug strings for every item
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+    messages_in = metrics.counter('flightbox_messages_in_total', process='Sbs1OgnNmeaToFlarmTransformation')
+    sbs1_parse_errors = metrics.counter('flightbox_parse_errors_total', process='Sbs1OgnNmeaToFlarmTransformation', content_type='sbs1')
+    ogn_parse_errors = metrics.counter('flightbox_parse_errors_total', process='Sbs1OgnNmeaToFlarmTransformation', content_type='ogn')
+    nmea_parse_errors = metrics.counter('flightbox_parse_errors_total', process='Sbs1OgnNmeaToFlarmTransformation', content_type='nmea')
 
-        # get new item from data hub
-        data_hub_item = yield from loop.run_in_executor(executor, data_input_queue.get)
+    # start bridge that reads data hub queue in one long-lived thread
+    data_hub_queue_bridge = DataHubQueueBridge(loop, data_input_queue, name='Sbs1OgnNmeaToFlarmTransformation.QueueBridge')
+    data_hub_queue_bridge.start()
+
+    while True:
+        # get all items that have been received since last call
+        data_hub_items = yield from data_hub_queue_bridge.get()
 
         # check if item is a poison pill
-        if data_hub_item is None:
+        if data_hub_items is None:
             logger.debug('Received poison pill')
 
             # exit loop
             break
 
-        if type(data_hub_item) is DataHubItem:
-            logger.debug('Received ' + str(data_hub_item))
+        if latency_probe is not None:
+            latency_probe.record_items('input_to_transformation', data_hub_items)
+
+        messages_in.inc(len(data_hub_items))
+
+        for data_hub_item in data_hub_items:
+            if debug_enabled:
+                logger.debug('Received ' + str(data_hub_item))
 
             if data_hub_item.get_content_type() == 'nmea':
-                yield from handle_nmea_data(data_hub_item.get_content_data(), gnss_status, gnss_status_lock)
+                yield from handle_nmea_data(data_hub_item.get_content_data(), gnss_status, gnss_status_lock, data_hub_item.get_timestamp(), parse_errors=nmea_parse_errors)
 
             if data_hub_item.get_content_type() == 'sbs1':
-                yield from handle_sbs1_data(data_hub_item.get_content_data(), aircraft, aircraft_lock)
+                yield from handle_sbs1_data(data_hub_item.get_content_data(), sbs1_coalescer, data_hub_item.get_timestamp(), parse_errors=sbs1_parse_errors)
+
+            if data_hub_item.get_content_type() == 'sbs1_parsed':
+                # keep newest update per aircraft and category until next processing cycle
+                sbs1_coalescer.put(data_hub_item.get_content_data(), data_hub_item.get_timestamp())
 
             if data_hub_item.get_content_type() == 'ogn':
-                yield from handle_ogn_data(data_hub_item.get_content_data(), aircraft, aircraft_lock, gnss_status)
+                yield from handle_ogn_data(data_hub_item.get_content_data(), aircraft_store, aircraft_lock, gnss_status, parse_errors=ogn_parse_errors)
 
 
 @asyncio.coroutine
-def handle_sbs1_data(data, aircraft, aircraft_lock):
+def handle_sbs1_data(data, sbs1_coalescer, timestamp, parse_errors=NULL_COUNTER):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.Sbs1Handler')
 
     try:
-        fields = data.split(',')
-
-        msg_type = fields[1]
+        record = utils.sbs1_parser.parse_sbs1_message(data)
 
         # check if message is of interest
-        if len(fields) > 16 and msg_type in ['1', '2', '3', '4', '5']:
-            aircraft_type = fields[2]
-            signallevel = fields[3]
-            icao_id = fields[4] #FFFFFF no ADSB records 
-            callsign = fields[10].strip()
-            altitude = fields[11]
-            horizontal_speed = fields[12]
-            course = fields[13]
-            latitude = fields[14]
-            longitude = fields[15]
-            vertical_speed = fields[16]           
-
-            with aircraft_lock:
-                # initialize empty AircraftInfo object if required
-                if icao_id not in aircraft.keys():
-                    aircraft[icao_id] = AircraftInfo()
-                    aircraft[icao_id].identifier = icao_id
-                    aircraft[icao_id].datatype = 'A'
-
-                # save timestamp
-                aircraft[icao_id].last_seen = time.time()
-            
-            if msg_type == '1':
-                logger.debug("A/C identification: {} callsign={}".format(icao_id, callsign))
-
-                with aircraft_lock:
-                    aircraft[icao_id].callsign = callsign
+        if record is not None:
+            # keep newest update per aircraft and category until next processing cycle
+            sbs1_coalescer.put(record, timestamp)
 
-            # handle ground and airborne position data
-            elif msg_type == '2' or msg_type == '3':
-                position_type = ''
-                if msg_type == '2':
-                    position_type = 'Ground'
-                elif msg_type == '3':
-                    position_type = 'Airborne'
+    except ValueError:
+        logger.warn('Problem during SBS1 data parsing')
+        parse_errors.inc()
+    except:
+        logger.exception(sys.exc_info()[0])
 
-                logger.debug('{} position: {} lat={} lon={} alt={}'.format(position_type, icao_id, latitude, longitude, altitude))
 
-                with aircraft_lock:
-                    aircraft[icao_id].latitude = float(latitude)
-                    aircraft[icao_id].longitude = float(longitude)
-                    aircraft[icao_id].altitude = float(altitude)
+def handle_sbs1_record(record, aircraft_store, timestamp=None):
+    """
+    Applies SBS1 message to aircraft table, caller has to hold aircraft lock.
 
-            # handle velocity data
-            elif msg_type == '4':
-                logger.debug('Vector: {} h_speed={} course={} v_speed={}'.format(icao_id, horizontal_speed, course, vertical_speed))
+    :param record: SBS1 message as parsed by utils.sbs1_parser.parse_sbs1_message
+    :param timestamp: Monotonic time the message has been received at, current time if None
+    """
 
-                with aircraft_lock:
-                    aircraft[icao_id].h_speed = float(horizontal_speed)
-                    aircraft[icao_id].v_speed = float(vertical_speed)
-                    aircraft[icao_id].course = float(course)
-
-            # handle aircraft identification data
-            # A0 = No Data          B0 = no Data
-            # A1 = Light            B1 = Glider
-            # A2 = Medium           B2 = Ballon
-            # A3 = Heavy            B3 = skydiver
-            # A4 = High-Vortex      B4 = ultralight
-            # A5 = Very heavy       B5 = reserved
-            # A6 = High perf./speed B6 = Drone
-            # A7 = Rotorcraft       B7 = Spacecraft
-
-            elif msg_type == '5':
-                logger.debug("A/C identification: {} type={} alt={}".format(icao_id, aircraft_type, altitude))
+    logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.Sbs1Handler')
 
-                with aircraft_lock:
-                    aircraft[icao_id].signallevel = float(signallevel)
-                    aircraft[icao_id].altitude = float(altitude)
-                    speed = 50
-                    if aircraft[icao_id].h_speed:
-                        speed = aircraft[icao_id].h_speed
-                    # set type to unknown
-                    acft_type = '0'
-                    if aircraft_type == 'A2' or aircraft_type == 'A3' or aircraft_type == 'A4' or aircraft_type == 'A5' or aircraft_type == 'A6':
-                        acft_type = '9'
-                    elif speed > 100:
-                        acft_type = '9'                        
-                    elif aircraft_type == 'A1':
-                        acft_type = '8'
-                    elif aircraft_type == 'A7':
-                        acft_type = '3'
-                    elif aircraft_type == 'B1':
-                        acft_type = '1'
-                    elif aircraft_type == 'B2':
-                        acft_type = 'B'
-                    else:
-                        acft_type = '8'
-                    
-                    aircraft[icao_id].aircraft_type = acft_type
-
-                    
-                    
-    except ValueError:
-        logger.warn('Problem during SBS1 data parsing')
-    except:
-        logger.exception(sys.exc_info()[0])
+    msg_type = record[0]
+    icao_id = record[1] #FFFFFF no ADSB records 
+
+    # get AircraftInfo object (initialized if required) and save timestamp
+    current_aircraft = aircraft_store.update(icao_id, 'A', timestamp)
+
+    if msg_type == utils.sbs1_parser.MSG_IDENTIFICATION:
+        callsign = record[2]
+
+        logger.debug("A/C identification: {} callsign={}".format(icao_id, callsign))
+
+        current_aircraft.callsign = callsign
+
+    # handle ground and airborne position data
+    elif msg_type == utils.sbs1_parser.MSG_SURFACE_POSITION or msg_type == utils.sbs1_parser.MSG_AIRBORNE_POSITION:
+        latitude, longitude, altitude = record[2:5]
+
+        position_type = ''
+        if msg_type == utils.sbs1_parser.MSG_SURFACE_POSITION:
+            position_type = 'Ground'
+        elif msg_type == utils.sbs1_parser.MSG_AIRBORNE_POSITION:
+            position_type = 'Airborne'
+
+        logger.debug('{} position: {} lat={} lon={} alt={}'.format(position_type, icao_id, latitude, longitude, altitude))
+
+        current_aircraft.latitude = latitude
+        current_aircraft.longitude = longitude
+        current_aircraft.altitude = altitude
+
+    # handle velocity data
+    elif msg_type == utils.sbs1_parser.MSG_VELOCITY:
+        horizontal_speed, vertical_speed, course = record[2:5]
+
+        logger.debug('Vector: {} h_speed={} course={} v_speed={}'.format(icao_id, horizontal_speed, course, vertical_speed))
+
+        current_aircraft.h_speed = horizontal_speed
+        current_aircraft.v_speed = vertical_speed
+        current_aircraft.course = course
+
+    # handle aircraft identification data
+    # A0 = No Data          B0 = no Data
+    # A1 = Light            B1 = Glider
+    # A2 = Medium           B2 = Ballon
+    # A3 = Heavy            B3 = skydiver
+    # A4 = High-Vortex      B4 = ultralight
+    # A5 = Very heavy       B5 = reserved
+    # A6 = High perf./speed B6 = Drone
+    # A7 = Rotorcraft       B7 = Spacecraft
+
+    elif msg_type == utils.sbs1_parser.MSG_SURVEILLANCE:
+        aircraft_type, signallevel, altitude = record[2:5]
+
+        logger.debug("A/C identification: {} type={} alt={}".format(icao_id, aircraft_type, altitude))
+
+        current_aircraft.signallevel = signallevel
+        current_aircraft.altitude = altitude
+        speed = 50
+        if current_aircraft.h_speed:
+            speed = current_aircraft.h_speed
+        # set type to unknown
+        acft_type = '0'
+        if aircraft_type == 'A2' or aircraft_type == 'A3' or aircraft_type == 'A4' or aircraft_type == 'A5' or aircraft_type == 'A6':
+            acft_type = '9'
+        elif speed > 100:
+            acft_type = '9'                        
+        elif aircraft_type == 'A1':
+            acft_type = '8'
+        elif aircraft_type == 'A7':
+            acft_type = '3'
+        elif aircraft_type == 'B1':
+            acft_type = '1'
+        elif aircraft_type == 'B2':
+            acft_type = 'B'
+        else:
+            acft_type = '8'
+        
+        current_aircraft.aircraft_type = acft_type
 
 
 @asyncio.coroutine
-def handle_ogn_data(data, aircraft, aircraft_lock, gnss_status):
+def handle_ogn_data(data, aircraft_store, aircraft_lock, gnss_status, parse_errors=NULL_COUNTER):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.OgnHandler')
 
     logger.debug('Processing OGN data: {}'.format(data))
 
     # check if own location is known (required for FLARM position calculation)
 
-    #data_parts: ['FLRDD50E2>APRS,qAR:/121255h0036.43N\\00432.58W^000/000/A=001397', '!W39!', 'id22DD50E2', '-039fpm', '+0.0rot', '40.0dB', '0e', '-1.5kHz', 'gps1x2']
+    #data: 'FLRDD50E2>APRS,qAR:/121255h0036.43N\\00432.58W^000/000/A=001397 !W39! id22DD50E2 -039fpm +0.0rot 40.0dB 0e -1.5kHz gps1x2'
     if gnss_status.longitude and gnss_status.latitude:
         try:
-            data_parts = data.split(' ')
-
-            # get first and second part
-            beacon_data = data_parts[0]
-			
-            # get remaining parts
-            position_data = data_parts[1:len(data_parts)]
-			
-			# beacon
-            m = re.match(r"^(.+?)>APRS,(.+?):/(\d{6})+h(\d{4}\.\d{2})(N|S)(.)(\d{5}\.\d{2})(E|W)(.)((\d{3})/(\d{3}))?/A=(\d{6})", beacon_data)            
-            			
-            if m:
-                ida = m.group(1)
-                identifier = ida[-6:]
-                receiver_name = m.group(2)
-                timestamp = m.group(3)
-
-                latitude = utils.conversion.ogn_coord_to_degrees(float(m.group(4)))
-
-                if m.group(5) == "S":
-                    latitude = -1.0 * latitude
+            beacon = utils.ogn_parser.parse_ogn_beacon(data)
 
-                symbol_table = m.group(6)
+            if beacon is None:
+                logger.warn('Problem parsing OGN beacon data: {}'.format(data.split(' ')[0]))
+                parse_errors.inc()
+                return
 
-                longitude = utils.conversion.ogn_coord_to_degrees(float(m.group(7)))
-                if m.group(8) == "W":
-                    longitude = -1.0 * longitude
+            identifier = beacon.identifier
 
-                symbol_code = m.group(9)
-
-                track = 0
-                h_speed = 0
-                if m.group(10) is not None:
-                    track = int(m.group(11))
-                    h_speed = int(m.group(12))
-
-                altitude = int(m.group(13))
-
-                if not identifier == 'FlightBox':
-                    with aircraft_lock:
-                        # initialize empty AircraftInfo object if required
-                        if identifier not in aircraft.keys():
-                            aircraft[identifier] = AircraftInfo()
-                            aircraft[identifier].identifier = identifier
-                            aircraft[identifier].datatype = 'F'
-
-                        # save data
-                        aircraft[identifier].last_seen = time.time()
-                        aircraft[identifier].latitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.latitude, latitude)
-                        aircraft[identifier].longitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.longitude, longitude)
-                        aircraft[identifier].altitude = altitude
-                        aircraft[identifier].h_speed = h_speed
-                        aircraft[identifier].course = track
-
-#                    logger.debug('{}: lat={}, lon={}, alt={}, course={:d}, h_speed={:d}'.format(identifier, aircraft[identifier].latitude, aircraft[identifier].longitude, aircraft[identifier].altitude, aircraft[identifier].course, aircraft[identifier].h_speed))
-
-                else:
-                    logger.info('Discarding receiver beacon')
-
-            else:
-                logger.warn('Problem parsing OGN beacon data: {}'.format(beacon_data))
-
-            # compile matching patterns: FLARM data
-            address_pattern = re.compile(r"id(\S{2})(\S{6})")
-            climb_rate_pattern = re.compile(r"([\+\-]\d+)fpm")
-            turn_rate_pattern = re.compile(r"([\+\-]\d+\.\d+)rot")
-            signal_strength_pattern = re.compile(r"(\d+\.\d+)dB")
-            error_count_pattern = re.compile(r"(\d+)e")
-            coordinates_extension_pattern = re.compile(r"\!W(.)(.)!")
-            hear_ID_pattern = re.compile(r"hear(\w{4})")
-            frequency_offset_pattern = re.compile(r"([\+\-]\d+\.\d+)kHz")
-            gps_status_pattern = re.compile(r"gps(\d+x\d+)")
-            software_version_pattern = re.compile(r"s(\d+\.\d+)")
-            hardware_version_pattern = re.compile(r"h(\d+)")
-            real_id_pattern = re.compile(r"r(\w{6})")
-            flightlevel_pattern = re.compile(r"FL(\d{3}\.\d{2})")
-
-            # compile matching patterns: receiver beacon data
-            ogn_decode_version_pattern = re.compile(r"v(\d\.\d\.\d\.\w+)")
-            load_pattern = re.compile(r"CPU:([\d\.]+)")
-            ram_pattern = re.compile(r"RAM:([\d\.]+)/([\d\.]+)(\w+)")
-            ntp_pattern = re.compile(r"NTP:([\d\.-]+)ms/([\d\.-]+)ppm")
-            temperature_pattern = re.compile(r"([\d\.+-]+)C")
-            rf_pattern = re.compile(r"RF:([\w\d\.+-/]+)")
-
-            for position_data_part in position_data:
-                address_match = address_pattern.match(position_data_part)
-                climb_rate_match = climb_rate_pattern.match(position_data_part)
-                turn_rate_match = turn_rate_pattern.match(position_data_part)
-                signal_strength_match = signal_strength_pattern.match(position_data_part)
-                error_count_match = error_count_pattern.match(position_data_part)
-                coordinates_extension_match = coordinates_extension_pattern.match(position_data_part)
-                hear_ID_match = hear_ID_pattern.match(position_data_part)
-                frequency_offset_match = frequency_offset_pattern.match(position_data_part)
-                gps_status_match = gps_status_pattern.match(position_data_part)
-                software_version_match = software_version_pattern.match(position_data_part)
-                hardware_version_match = hardware_version_pattern.match(position_data_part)
-                real_id_match = real_id_pattern.match(position_data_part)
-                flightlevel_match = flightlevel_pattern.match(position_data_part)
-
-                ogn_decode_version_match = ogn_decode_version_pattern.match(position_data_part)
-                load_match = load_pattern.match(position_data_part)
-                ram_match = ram_pattern.match(position_data_part)
-                ntp_match = ntp_pattern.match(position_data_part)
-                temperature_match = temperature_pattern.match(position_data_part)
-                rf_match = rf_pattern.match(position_data_part)
-
-                if address_match is not None:
-                    # Flarm ID type byte in APRS msg: PTTT TTII
-                    # P => stealth mode
-                    # TTTTT => aircraftType
-                    # II => IdType: 0=Random, 1=ICAO, 2=FLARM, 3=OGN
-                    # (see https://groups.google.com/forum/#!msg/openglidernetwork/lMzl5ZsaCVs/YirmlnkaJOYJ).
-                    address_type = int(address_match.group(1), 16) & 0b00000011
-                    aircraft_type = (int(address_match.group(1), 16) & 0b01111100) >> 2
-                    stealth = ((int(address_match.group(1), 16) & 0b10000000) >> 7 == 1)
-                    address = address_match.group(2)
-
-                    # save data
-                    aircraft[identifier].aircraft_type = aircraft_type
-
-                elif climb_rate_match is not None:
-                    climb_rate = int(climb_rate_match.group(1))
-
-                    # save data
-                    aircraft[identifier].v_speed = climb_rate
-
-                elif turn_rate_match is not None:
-                    turn_rate = float(turn_rate_match.group(1))
-
-                elif signal_strength_match is not None:
-                    signal_strength = float(signal_strength_match.group(1))
-
-                elif error_count_match is not None:
-                    error_count = int(error_count_match.group(1))
-
-                elif coordinates_extension_match is not None:
-                    # position precision enhancement is third decimal digit of minute
-                    lat_delta_degrees = int(coordinates_extension_match.group(1)) / 1000.0 / 60.0
-                    lon_delta_degrees = int(coordinates_extension_match.group(2)) / 1000.0 / 60.0
-
-                    latitude += lat_delta_degrees
-                    longitude += lon_delta_degrees
+            if not identifier == 'FlightBox':
+                with aircraft_lock:
+                    # get AircraftInfo object (initialized if required) and save timestamp
+                    current_aircraft = aircraft_store.update(identifier, 'F')
 
                     # save data
-                    aircraft[identifier].latitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.latitude, latitude)
-                    aircraft[identifier].longitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.longitude, longitude)
-
-                elif hear_ID_match is not None:
-                    pass
-                    # heared_aircraft_IDs.append(hear_ID_match.group(1))
+                    current_aircraft.latitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.latitude, beacon.latitude)
+                    current_aircraft.longitude = utils.calculation.lat_abs_from_rel_flarm_coordinate(gnss_status.longitude, beacon.longitude)
+                    current_aircraft.altitude = beacon.altitude
+                    current_aircraft.h_speed = beacon.h_speed
+                    current_aircraft.course = beacon.track
 
-                elif frequency_offset_match is not None:
-                    frequency_offset = float(frequency_offset_match.group(1))
+                    if beacon.aircraft_type is not None:
+                        current_aircraft.aircraft_type = beacon.aircraft_type
+                    if beacon.climb_rate is not None:
+                        current_aircraft.v_speed = beacon.climb_rate
 
-                elif gps_status_match is not None:
-                    gps_status = gps_status_match.group(1)
-
-                elif software_version_match is not None:
-                    software_version = float(software_version_match.group(1))
+            else:
+                logger.info('Discarding receiver beacon')
 
-                elif hardware_version_match is not None:
-                    hardware_version = int(hardware_version_match.group(1))
+            for unknown_token in beacon.unknown_tokens:
+                logger.warn('Problem parsing OGN position data ({}): {}'.format(unknown_token, data))
 
-                elif real_id_match is not None:
-                    real_id = real_id_match.group(1)
+            if beacon.error:
+                logger.warn('Problem during OGN data parsing ({})'.format(beacon.error))
+                parse_errors.inc()
 
-                elif flightlevel_match is not None:
-                    flightlevel = float(flightlevel_match.group(1))
+        except:
+            logger.exception(sys.exc_info()[0])
 
-                elif ogn_decode_version_match is not None:
-                    ogn_decode_version = ogn_decode_version_match.group(1)
 
-                elif load_match is not None:
-                    load = float(load_match.group(1))
+@asyncio.coroutine
+def handle_nmea_data(data, gnss_status, gnss_status_lock, timestamp, parse_errors=NULL_COUNTER):
+    logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.NmeaHandler')
 
-                elif ram_match is not None:
-                    ram_used = float(ram_match.group(1))
-                    ram_total = float(ram_match.group(2))
-                    ram_unit = ram_match.group(3)
+    try:
+        # parse GGA, GLL, VTG and RMC sentences of any talker (others are ignored)
+        record = utils.nmea_parser.parse_nmea_sentence(data)
+        if record is None:
+            return
 
-                elif ntp_match is not None:
-                    ntp_offset_ms = float(ntp_match.group(1))
-                    ntp_update_rate_ppm = float(ntp_match.group(2))
+        sentence_type = record[0]
 
-                elif temperature_match is not None:
-                    temperature_celsius = float(temperature_match.group(1))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('{}: {}'.format(sentence_type, record[1:]))
 
-                elif rf_match is not None:
-                    rf_info = rf_match.group(1)
+        with gnss_status_lock:
+            if sentence_type == utils.nmea_parser.SENTENCE_GGA:
+                latitude, longitude, altitude = record[1:4]
+                gnss_status.update_position(latitude, longitude, timestamp)
 
-                else:
-                    logger.warn('Problem parsing OGN position data ({}): {}'.format(position_data_part, position_data))
+                if altitude is not None:
+                    gnss_status.altitude = utils.conversion.meters_to_feet(altitude)
+                    gnss_status.altitude_time = timestamp
 
-        except ValueError:
-            logger.warn('Problem during OGN data parsing')
-            logger.exception(sys.exc_info()[0])
-        except:
-            logger.exception(sys.exc_info()[0])
+            elif sentence_type == utils.nmea_parser.SENTENCE_GLL:
+                latitude, longitude = record[1:3]
+                gnss_status.update_position(latitude, longitude, timestamp)
 
+            elif sentence_type == utils.nmea_parser.SENTENCE_VTG:
+                course, h_speed = record[1:3]
+                gnss_status.update_velocity(course, h_speed, timestamp)
 
-@asyncio.coroutine
-def handle_nmea_data(data, gnss_status, gnss_status_lock):
-    logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.NmeaHandler')
+            elif sentence_type == utils.nmea_parser.SENTENCE_RMC:
+                latitude, longitude, course, h_speed = record[1:5]
+                gnss_status.update_position(latitude, longitude, timestamp)
+                gnss_status.update_velocity(course, h_speed, timestamp)
 
-    try:
-        # check if message is of interest
-        if data.startswith('$GPGGA'):
-            message = pynmea2.parse(data)
-
-            logger.debug('GPGGA: lat={} {}, lon={} {}, alt={} {}, qual={:d}, n_sat={}, h_dop={}, geoidal_sep={} {}'.format(message.lat, message.lat_dir, message.lon, message.lon_dir, message.altitude, message.altitude_units, message.gps_qual, message.num_sats, message.horizontal_dil, message.geo_sep, message.geo_sep_units))
-
-            with gnss_status_lock:
-                lat = utils.conversion.nmea_coord_to_degrees(float(message.lat))
-                if message.lat_dir == 'N':
-                    gnss_status.latitude = lat
-                elif message.lat_dir == 'S':
-                    gnss_status.latitude = -1.0 * lat
-
-                lon = utils.conversion.nmea_coord_to_degrees(float(message.lon))
-                if message.lon_dir == 'W':
-                    gnss_status.longitude = -1.0 * lon
-                elif message.lon_dir == 'E':
-                    gnss_status.longitude = lon
-
-                alt_m = float(message.altitude)
-                if message.altitude_units == 'M':
-                    gnss_status.altitude = utils.conversion.meters_to_feet(alt_m)
-
-        elif data.startswith('$GPGLL'):
-            message = pynmea2.parse(data)
-
-#            logger.debug('GPGLL: lat={} {}, lon={} {}, status={}, pos_mode={}'.format(message.lat, message.lat_dir, message.lon, message.lon_dir, message.status, message.faa_mode))
-
-            with gnss_status_lock:
-                lat = utils.conversion.nmea_coord_to_degrees(float(message.lat))
-                if message.lat_dir == 'N':
-                    gnss_status.latitude = lat
-                elif message.lat_dir == 'S':
-                    gnss_status.latitude = -1.0 * lat
-
-                lon = utils.conversion.nmea_coord_to_degrees(float(message.lon))
-                if message.lon_dir == 'W':
-                    gnss_status.longitude = -1.0 * lon
-                elif message.lon_dir == 'E':
-                    gnss_status.longitude = lon
-
-        elif data.startswith('$GPVTG'):
-            fields = (data.split('*')[0]).split(',')
-
-            if len(fields) > 9:
-                cog_t = fields[1]
-                cog_m = fields[3]
-                h_speed_kt = fields[5]
-                h_speed_kph = fields[7]
-                pos_mode = fields[9]
-
-#                logger.debug('GPVTG: cog_t={}, cog_m={}, h_speed_kt={}, h_speed_kph={}, pos_mode={}'.format(cog_t, cog_m, h_speed_kt, h_speed_kph, pos_mode))
-
-                with gnss_status_lock:
-                    # check if values are available before converting
-                    if h_speed_kt:
-                        gnss_status.h_speed = float(h_speed_kt)
-                    if cog_t:
-                        gnss_status.course = float(cog_t)
+            gnss_status.last_update = timestamp
     except ValueError:
-        logger.info('Problem during NMEA data parsing (no fix?)')
+        logger.info('Problem during NMEA data parsing (invalid checksum or field)')
+        parse_errors.inc()
     except:
         logger.exception(sys.exc_info()[0])
 
 
-def generate_flarm_messages(gnss_status, aircraft):
-    logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.FlarmGenerator')
-
+def generate_flarm_messages(gnss_status, aircraft, pcas_settings, baro_altitude, relative_position):
     # define parameter limits (given by FLARM protocol)
     DISTANCE_M_MIN = -45000     #-32768 
     DISTANCE_M_MAX = 45000      #32767
 
-    modec_parts = parser.get('DEFAULT','my_ICAO').split(',')
-    # get icao and tail part
-    my_icao = modec_parts[0]
-    my_tail = modec_parts[1]
-    modec_sep = float(parser.get('DEFAULT','modec_sep'))
-    modec_det = float(parser.get('DEFAULT','modec_det'))
-
-    if modec_det == 1: # ultra short
-        modec_3= -29
-        modec_2= -30
-        modec_1= -31
-    elif modec_det == 2: # short
-        modec_3= -30
-        modec_2= -31
-        modec_1= -32        
-    elif modec_det == 3: # medium
-        modec_3= -31
-        modec_2= -32
-        modec_1= -33
-    else: # long
-        modec_3= -32
-        modec_2= -33
-        modec_1= -34   
-        
+    my_tail = pcas_settings.my_tail
+    modec_3, modec_2, modec_1 = pcas_settings.modec_thresholds
+
     # initialize message list
     flarm_messages = []
     adsb = False
@@ -510,21 +324,16 @@ def generate_flarm_messages(gnss_status, aircraft):
 #        flarm_messages.append(str(flarm_message_laa))
 #        logger.debug('FLARM no plane message: {}'.format(str(flarm_message_laa)))
 
-    if gnss_status.longitude and gnss_status.latitude and aircraft.longitude and aircraft.latitude:
+    if relative_position is not None:
         """ generate PFLAA message ADS-B"""
         # PFLAA,<AlarmLevel>,<RelativeNorth>,<RelativeEast>, <RelativeVertical>,<IDType>,<ID>,<Track>,<TurnRate>,<GroundSpeed>, <ClimbRate>,<AcftType>
         adsb = True
         
-        # calculate distance and bearing
-        gnss_coordinates = (gnss_status.latitude, gnss_status.longitude)
-        aircraft_coordinates = (aircraft.latitude, aircraft.longitude)
-        distance_m = vincenty(gnss_coordinates, aircraft_coordinates).meters
-        initial_bearing = utils.calculation.initial_bearing(gnss_status.latitude, gnss_status.longitude, aircraft.latitude, aircraft.longitude)
-        final_bearing = utils.calculation.final_bearing(gnss_status.latitude, gnss_status.longitude, aircraft.latitude, aircraft.longitude)
-        
-        # calculate relative distance (north, east)
-        distance_north_m = utils.calculation.distance_north(initial_bearing, distance_m)
-        distance_east_m = utils.calculation.distance_east(initial_bearing, distance_m)
+        # get distance, bearing and relative distance (north, east) as calculated for all aircraft of this cycle
+        distance_m = relative_position.distance
+        initial_bearing = relative_position.bearing
+        distance_north_m = relative_position.north
+        distance_east_m = relative_position.east
 
         # skip aircraft if distance is out of limits
         if not (distance_north_m >= DISTANCE_M_MIN and distance_north_m <= DISTANCE_M_MAX):
@@ -536,15 +345,11 @@ def generate_flarm_messages(gnss_status, aircraft):
         relative_north = '{:.0f}'.format(min(max(distance_north_m, DISTANCE_M_MIN), DISTANCE_M_MAX))
         relative_east = '{:.0f}'.format(min(max(distance_east_m, DISTANCE_M_MIN), DISTANCE_M_MAX))
 
-#        logger.debug('{}: dist={:.0f} m, initial_bearing={:.0f} deg, final_bearing={:.0f} deg, dist_n={:.0f} m, dist_e={:.0f} m'.format(aircraft.identifier, distance_m, initial_bearing, final_bearing, distance_north_m, distance_east_m))
+#        logger.debug('{}: dist={:.0f} m, initial_bearing={:.0f} deg, dist_n={:.0f} m, dist_e={:.0f} m'.format(aircraft.identifier, distance_m, initial_bearing, distance_north_m, distance_east_m))
 
-        relative_vertical = 0
-        if gnss_status.altitude and aircraft.altitude:
-            if aircraft.datatype == 'F':
-                relative_vertical = '{:.0f}'.format(min(max(utils.conversion.feet_to_meters(aircraft.altitude - gnss_status.altitude), DISTANCE_M_MIN), DISTANCE_M_MAX))
-            else:
-                relative_vertical = '{:.0f}'.format(min(max(utils.conversion.feet_to_meters(aircraft.altitude) - utils.calculation.altimeter(), DISTANCE_M_MIN), DISTANCE_M_MAX))
-                #relative_vertical = '{:.0f}'.format(min(max(utils.conversion.feet_to_meters(aircraft.altitude) - sensor.read_altitude(), DISTANCE_M_MIN), DISTANCE_M_MAX)) 
+        relative_vertical = '0'
+        if relative_position.vertical is not None:
+            relative_vertical = '{:.0f}'.format(min(max(relative_position.vertical, DISTANCE_M_MIN), DISTANCE_M_MAX))
         # indicate ICAO identifier
 		
         identifier_type = '1'
@@ -599,10 +404,9 @@ def generate_flarm_messages(gnss_status, aircraft):
             identifier = aircraft.identifier
 
 			
-        flarm_message_laa = pynmea2.ProprietarySentence('F', ['LAA', alarm_level, relative_north, relative_east, relative_vertical, identifier_type, identifier, track, turn_rate, ground_speed, climb_rate, acft_type])
+        flarm_message_laa = utils.flarm_sentence.encode_pflaa(alarm_level, relative_north, relative_east, relative_vertical, identifier_type, identifier, track, turn_rate, ground_speed, climb_rate, acft_type)
         #portOUT.write(str(flarm_message_laa).encode())
-        flarm_messages.append(str(flarm_message_laa))
-        logger.info('ADSB: {}'.format(str(flarm_message_laa)))
+        flarm_messages.append(flarm_message_laa)
 
 #        if gnss_status.altitude:
         if alarm == True:
@@ -624,9 +428,8 @@ def generate_flarm_messages(gnss_status, aircraft):
             # set relative distance to target
             relative_distance = '{:.0f}'.format(min(max(distance_m, 0), 2147483647))
 
-            flarm_message_laa = pynmea2.ProprietarySentence('F', ['LAU', rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_distance, identifier])
-            flarm_messages.append(str(flarm_message_laa))
-            logger.info('ADSB: {}'.format(str(flarm_message_laa)))
+            flarm_message_laa = utils.flarm_sentence.encode_pflau(rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_distance, identifier)
+            flarm_messages.append(flarm_message_laa)
             
         else:
             rx = '1'
@@ -644,10 +447,9 @@ def generate_flarm_messages(gnss_status, aircraft):
             relative_distance = ''
             identifier = ''
 
-            flarm_message_laa = pynmea2.ProprietarySentence('F', ['LAU', rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_distance, identifier])
+            flarm_message_laa = utils.flarm_sentence.encode_pflau(rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_distance, identifier)
 
-            flarm_messages.append(str(flarm_message_laa))
-            logger.debug('No plane message: {}'.format(str(flarm_message_laa)))
+            flarm_messages.append(flarm_message_laa)
 
 
     # check if positions are known
@@ -655,8 +457,12 @@ def generate_flarm_messages(gnss_status, aircraft):
         """ generate PFLAA message for MODE A/C"""
         # PFLAA,<AlarmLevel>,<RelativeNorth>,<RelativeEast>, <RelativeVertical>,<IDType>,<ID>,<Track>,<TurnRate>,<GroundSpeed>, <ClimbRate>,<AcftType>
 
+        # skip aircraft if own barometric altitude is unknown (Mode-C altitude is the only position information)
+        if baro_altitude is None:
+            return None
+
         #relative_vertical = '{:.0f}'.format(min(max(utils.conversion.feet_to_meters(aircraft.altitude - gnss_status.altitude), DISTANCE_M_MIN), DISTANCE_M_MAX))
-        relative_vertical = '{:.0f}'.format(min(max(utils.conversion.feet_to_meters(aircraft.altitude) - utils.calculation.altimeter(), DISTANCE_M_MIN), DISTANCE_M_MAX))
+        relative_vertical = '{:.0f}'.format(min(max(utils.conversion.feet_to_meters(aircraft.altitude) - baro_altitude, DISTANCE_M_MIN), DISTANCE_M_MAX))
 
         # skip aircraft if LAT is known or vertical is to high
         if aircraft.latitude or int(relative_vertical) > 1000:
@@ -707,10 +513,9 @@ def generate_flarm_messages(gnss_status, aircraft):
         climb_rate = ''
         acft_type = str(aircraft.aircraft_type)
         
-        flarm_message_laa = pynmea2.ProprietarySentence('F', ['LAA', alarm_level, relative_north, relative_east, relative_vertical, identifier_type, identifier, track, turn_rate, ground_speed, climb_rate, acft_type])
+        flarm_message_laa = utils.flarm_sentence.encode_pflaa(alarm_level, relative_north, relative_east, relative_vertical, identifier_type, identifier, track, turn_rate, ground_speed, climb_rate, acft_type)
         #portOUT.write(str(flarm_message_laa).encode())
-        flarm_messages.append(str(flarm_message_laa))
-        logger.info('Mode-C: {}'.format(str(flarm_message_laa)))
+        flarm_messages.append(flarm_message_laa)
 
         if alarm == True: 
             """ generate PFLAU message """
@@ -728,9 +533,8 @@ def generate_flarm_messages(gnss_status, aircraft):
             relative_bearing = ''
             
 
-            flarm_message_laa = pynmea2.ProprietarySentence('F', ['LAU', rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_north, identifier])
-            flarm_messages.append(str(flarm_message_laa))
-            logger.info('Mode-C: {}'.format(str(flarm_message_laa)))    
+            flarm_message_laa = utils.flarm_sentence.encode_pflau(rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_north, identifier)
+            flarm_messages.append(flarm_message_laa)
 
 
     if len(flarm_messages) > 0:
@@ -738,76 +542,211 @@ def generate_flarm_messages(gnss_status, aircraft):
 
     return None
 
+
+def log_flarm_messages(flarm_messages, source):
+    """
+    Logs FLARM messages of one target that are handed over to the data hub (messages without alarm at debug level).
+
+    :param flarm_messages: FLARM messages as generated by generate_flarm_messages
+    :param source: Source of target shown in log ('ADSB' or 'Mode-C')
+    """
+
+    logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.FlarmGenerator')
+
+    for flarm_message in flarm_messages:
+        sentence = flarm_message.decode('ascii').rstrip()
+
+        # PFLAU without alarm (alarm level is fifth field) indicates that no aircraft is close
+        if sentence.startswith('$PFLAU,') and sentence.split(',')[5] == '0':
+            logger.debug('No plane message: {}'.format(sentence))
+        else:
+            logger.info('{}: {}'.format(source, sentence))
+
+
 @asyncio.coroutine
-def data_processor(loop, data_hub, aircraft, aircraft_lock, gnss_status, gnss_status_lock):
+def data_processor(loop, data_hub_batcher, pcas_settings_loader, baro_altitude_provider, sbs1_coalescer, flarm_scheduler, tick_interval, aircraft_store, aircraft_lock, gnss_status, gnss_status_lock, latency_probe=None, metrics=NULL_METRICS):
     logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation.DataProcessor')
 
+    # check log level once instead of building debug strings for every aircraft
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+    tick_duration = metrics.timer('flightbox_tick_duration_seconds', process='Sbs1OgnNmeaToFlarmTransformation')
+
+    # initialize geometry engine (reused in every cycle)
+    traffic_geometry = TrafficGeometry()
+
+    # initialize time of next statistics output
+    statistics_time = time.monotonic() + STATISTICS_INTERVAL
+
     while True:
         logger.debug('Processing data:')
 
+        tick_start = time.monotonic()
+
+        # get current PCAS settings (reloaded if configuration file has changed)
+        pcas_settings = pcas_settings_loader.get()
+
+        # get latest filtered barometric altitude (sampled in background, None if unknown)
+        baro_altitude = None
+        if baro_altitude_provider is not None:
+            baro_altitude = baro_altitude_provider.get_altitude()
+
         with gnss_status_lock:
             logger.debug('GNSS: lat={}, lon={}, alt={}, h_s={}, h={}'.format(gnss_status.latitude, gnss_status.longitude, gnss_status.altitude, gnss_status.h_speed, gnss_status.course))
 
+        # get newest SBS1 updates per aircraft and category since last cycle
+        sbs1_updates = sbs1_coalescer.drain()
+
         with aircraft_lock:
-            for icao_id in sorted(aircraft.keys()):
-                current_aircraft = aircraft[icao_id]
+            # apply SBS1 updates (one lock acquisition per cycle instead of several per message)
+            for record, timestamp in sbs1_updates:
+                handle_sbs1_record(record, aircraft_store, timestamp)
+
+            # delete entries of aircraft that have not been seen for a while (only least recently seen entries are checked)
+            aircraft_store.expire()
+
+            # get all remaining aircraft
+            aircraft_snapshot = aircraft_store.snapshot()
+
+            # calculate relative positions of all aircraft with known position in one pass
+            relative_positions = {}
+            if gnss_status.latitude and gnss_status.longitude:
+                traffic_geometry.clear()
+
+                for current_aircraft in aircraft_snapshot:
+                    if current_aircraft.latitude and current_aircraft.longitude:
+                        # FLARM altitudes are compared with GNSS altitude, ADS-B altitudes with barometric altitude
+                        altitude = None
+                        reference_altitude = None
+                        if gnss_status.altitude and current_aircraft.altitude:
+                            altitude = utils.conversion.feet_to_meters(current_aircraft.altitude)
+                            if current_aircraft.datatype == 'F':
+                                reference_altitude = utils.conversion.feet_to_meters(gnss_status.altitude)
+                            else:
+                                reference_altitude = baro_altitude
 
-                age_in_seconds = time.time() - current_aircraft.last_seen
+                        traffic_geometry.add(current_aircraft.identifier, current_aircraft.latitude, current_aircraft.longitude, altitude, reference_altitude)
 
-                logger.debug('{}: cs={}, lat={}, lon={}, alt={}, h_s={}, v_s={}, h={}, a={:.0f}'.format(icao_id, current_aircraft.callsign, current_aircraft.latitude, current_aircraft.longitude, current_aircraft.altitude, current_aircraft.h_speed, current_aircraft.v_speed, current_aircraft.course, age_in_seconds))
+                relative_positions = traffic_geometry.compute(gnss_status.latitude, gnss_status.longitude)
+
+            now = time.monotonic()
+
+            for current_aircraft in aircraft_snapshot:
+                relative_position = relative_positions.get(current_aircraft.identifier)
+
+                # skip aircraft that neither may have crossed an alarm threshold nor are due for emission
+                if not flarm_scheduler.is_due(current_aircraft.identifier, current_aircraft.last_seen, relative_position, now):
+                    continue
+
+                if debug_enabled:
+                    age_in_seconds = time.monotonic() - current_aircraft.last_seen
+                    logger.debug('{}: cs={}, lat={}, lon={}, alt={}, h_s={}, v_s={}, h={}, a={:.0f}'.format(current_aircraft.identifier, current_aircraft.callsign, current_aircraft.latitude, current_aircraft.longitude, current_aircraft.altitude, current_aircraft.h_speed, current_aircraft.v_speed, current_aircraft.course, age_in_seconds))
 
                 # generate FLARM messages
-                flarm_messages = generate_flarm_messages(gnss_status=gnss_status, aircraft=current_aircraft)
-                if flarm_messages:
+                flarm_messages = generate_flarm_messages(gnss_status=gnss_status, aircraft=current_aircraft, pcas_settings=pcas_settings, baro_altitude=baro_altitude, relative_position=relative_position)
+
+                # emit messages on change of alarm level immediately, otherwise at rate of target
+                if flarm_scheduler.decide(current_aircraft.identifier, current_aircraft.last_seen, relative_position, get_alarm_level(flarm_messages), now):
                     for flarm_message in flarm_messages:
-                        data_hub_item = DataHubItem('flarm', flarm_message)
-                        data_hub.put(data_hub_item)
+                        data_hub_item = DataHubItem('flarm', flarm_message, source_id=SOURCE_TRANSFORMATION_FLARM)
+                        data_hub_batcher.put(data_hub_item)
 
-                # delete entries of aircraft that have not been seen for a while
-                if age_in_seconds > 30.0:
-                    del aircraft[icao_id]
+                    # log messages that are actually handed over (most generated messages are not due)
+                    log_flarm_messages(flarm_messages, 'ADSB' if relative_position is not None else 'Mode-C')
 
-        yield from asyncio.sleep(1)
+        # hand over all FLARM messages of this cycle right away (no batching delay for alarms)
+        data_hub_batcher.flush()
 
+        tick_end = time.monotonic()
+        tick_duration.observe(tick_end - tick_start)
+
+        if latency_probe is not None:
+            latency_probe.record('tick', tick_end - tick_start)
+
+        if time.monotonic() >= statistics_time:
+            statistics = sbs1_coalescer.get_statistics()
+            logger.info('SBS1 updates: received={}, collapsed={}, applied={}'.format(statistics['received'], statistics['collapsed'], statistics['applied']))
+
+            statistics = flarm_scheduler.get_statistics()
+            logger.info('FLARM targets: emitted={}, suppressed={}, alarms={}, latency p50/p90/p99/max={} s, alarm latency p50/p90/p99/max={} s'.format(statistics['emitted'], statistics['suppressed'], statistics['alarms'], format_latencies(statistics['latency']), format_latencies(statistics['alarm_latency'])))
+
+            # forget emission state of targets that are gone
+            flarm_scheduler.expire(time.monotonic())
+
+            statistics_time += STATISTICS_INTERVAL
+
+        yield from asyncio.sleep(tick_interval)
+
+
+def format_latencies(latencies):
+    return '/'.join('-' if latency is None else '{:.3f}'.format(latency) for latency in latencies)
 
-class AircraftInfo(object):
-    def __init__(self):   
-        self.aircraft_type = '0'
-        self.signallevel = 0
-        self.identifier = None
-        self.callsign = None
-        self.latitude = None
-        self.longitude = None
-        self.altitude = None
-        self.h_speed = None
-        self.v_speed = None
-        self.course = None
-        self.last_seen = None
-        self.datatype = None
 
 class GnssStatus(object):
+    """
+    Own-ship position (degrees), altitude (feet), ground speed (knots) and course. Monotonic times of the last update
+    of each group of values are kept, values are only replaced if they are known.
+    """
+
     def __init__(self):
         self.latitude = None
         self.longitude = None
         self.altitude = None
         self.h_speed = None
         self.course = None
+        self.position_time = None
+        self.altitude_time = None
+        self.velocity_time = None
         self.last_update = None
 
+    def update_position(self, latitude, longitude, timestamp):
+        if latitude is not None and longitude is not None:
+            self.latitude = latitude
+            self.longitude = longitude
+            self.position_time = timestamp
+
+    def update_velocity(self, course, h_speed, timestamp):
+        if h_speed is not None:
+            self.h_speed = h_speed
+            self.velocity_time = timestamp
+        if course is not None:
+            self.course = course
+            self.velocity_time = timestamp
+
 
 class Sbs1OgnNmeaToFlarmTransformation(TransformationModule):
-    def __init__(self, data_hub):
+    """
+    Transformation module that combines SBS1 (ADS-B), OGN (FLARM) and own-ship NMEA data into FLARM sentences.
+
+    If latency_directory is set, the age of received items is recorded as stage 'input_to_transformation' and the
+    duration of processing cycles as stage 'tick' (see utils/latency.py). Received messages, parse errors, generated
+    FLARM messages and the duration of processing cycles are counted in metrics (see utils/metrics.py), if given.
+    """
+
+    def __init__(self, data_hub, batch_max_items=64, batch_max_latency=0.05, baro_sensor_type='bmp180', baro_sample_rate=2.0, tick_interval=0.2, target_interval=1.0, far_target_interval=3.0, near_distance=10000.0, latency_directory=None, metrics=None):
         # call parent constructor
-        super().__init__(data_hub=data_hub)
+        super().__init__(data_hub=data_hub, batch_max_items=batch_max_items, batch_max_latency=batch_max_latency, metrics=metrics)
+
+        # store arguments in object variables
+        self._baro_sensor_type = baro_sensor_type
+        self._baro_sample_rate = baro_sample_rate
+        self._tick_interval = tick_interval
+        self._target_interval = target_interval
+        self._far_target_interval = far_target_interval
+        self._near_distance = near_distance
+        self._latency_directory = latency_directory
 
         # configure logging
         self._logger = logging.getLogger('Sbs1OgnNmeaToFlarmTransformation')
         self._logger.info('Initializing')
 
         # initialize aircraft data structure
-        self._aircraft = {}
+        self._aircraft_store = AircraftStore()
         self._aircraft_lock = Lock()
 
+        # initialize collection of SBS1 updates between processing cycles
+        self._sbs1_coalescer = Sbs1Coalescer()
+
         # initialize gnss data structure
         self._gnss_status = GnssStatus()
         self._gnss_status_lock = Lock()
@@ -820,10 +759,34 @@ class Sbs1OgnNmeaToFlarmTransformation(TransformationModule):
         # get asyncio loop
         loop = asyncio.get_event_loop()
 
+        # create batcher that collects FLARM messages of one processing cycle into a frame
+        data_hub_batcher = self.create_batcher(loop=loop)
+
+        # load PCAS settings once, reload on change of configuration file or SIGHUP (no reboot required)
+        pcas_settings_loader = PcasSettingsLoader()
+        loop.add_signal_handler(signal.SIGHUP, pcas_settings_loader.request_reload)
+
+        # sample barometric sensor in background thread (created here to run in transformation process)
+        baro_altitude_provider = None
+        try:
+            baro_sensor = create_baro_sensor(self._baro_sensor_type)
+            if baro_sensor is not None:
+                baro_altitude_provider = BaroAltitudeProvider(baro_sensor, sample_rate=self._baro_sample_rate)
+                baro_altitude_provider.start()
+        except Exception as e:
+            self._logger.warn('Barometric altitude not available ({})'.format(e))
+
+        # decide per processing cycle which targets are emitted
+        flarm_scheduler = FlarmScheduler(interval=self._target_interval, far_interval=self._far_target_interval, near_distance=self._near_distance, tick_interval=self._tick_interval)
+
+        latency_probe = None
+        if self._latency_directory is not None:
+            latency_probe = LatencyProbe(self._latency_directory, 'transformation_sbs1ognnmea_flarm')
+
         # compile task list that will run in loop
         tasks = asyncio.gather(
-            asyncio.async(input_processor(loop=loop, data_input_queue=self._data_input_queue, aircraft=self._aircraft, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock)),
-            asyncio.async(data_processor(loop=loop, data_hub=self._data_hub, aircraft=self._aircraft, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock))
+            asyncio.async(input_processor(loop=loop, data_input_queue=self._data_input_queue, sbs1_coalescer=self._sbs1_coalescer, aircraft_store=self._aircraft_store, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock, latency_probe=latency_probe, metrics=self._metrics)),
+            asyncio.async(data_processor(loop=loop, data_hub_batcher=data_hub_batcher, pcas_settings_loader=pcas_settings_loader, baro_altitude_provider=baro_altitude_provider, sbs1_coalescer=self._sbs1_coalescer, flarm_scheduler=flarm_scheduler, tick_interval=self._tick_interval, aircraft_store=self._aircraft_store, aircraft_lock=self._aircraft_lock, gnss_status=self._gnss_status, gnss_status_lock=self._gnss_status_lock, latency_probe=latency_probe, metrics=self._metrics))
         )
 
         try:
@@ -837,10 +800,13 @@ class Sbs1OgnNmeaToFlarmTransformation(TransformationModule):
         finally:
             loop.stop()
 
+        if latency_probe is not None:
+            latency_probe.close()
+
         # close data input queue
         self._data_input_queue.close()
 
         self._logger.info('Terminating')
 
     def get_desired_content_types(self):
-        return(['sbs1', 'ogn', 'nmea'])
+        return(['sbs1', 'sbs1_parsed', 'ogn', 'nmea'])
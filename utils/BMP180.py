@@ -9,7 +9,6 @@
 #
 #--------------------------------------
 
-import smbus
 import time
 from ctypes import c_short
 from ctypes import c_byte
@@ -17,8 +16,18 @@ from ctypes import c_ubyte
 
 DEVICE = 0x77 # Default device I2C address RY module
 
-bus = smbus.SMBus(1) # Rev 2 Pi uses 1 
- 
+BUS_NUMBER = 1 # Rev 2 Pi uses 1
+
+_bus = None
+
+def getBus():
+  # open I2C bus on first use (importing this module does not require smbus)
+  global _bus
+  if _bus is None:
+    import smbus
+    _bus = smbus.SMBus(BUS_NUMBER)
+  return _bus
+
 def convertToString(data):
   # Simple function to convert binary data into
   # a string
@@ -35,12 +44,25 @@ def getUshort(data, index):
 def readBmp180Id(addr=DEVICE):
   # Chip ID Register Address
   REG_ID     = 0xD0
-  (chip_id, chip_version) = bus.read_i2c_block_data(addr, REG_ID, 2)
+  (chip_id, chip_version) = getBus().read_i2c_block_data(addr, REG_ID, 2)
   return (chip_id, chip_version)
   
-def readBmp180All(addr=DEVICE):
+def readBmp180Calibration(addr=DEVICE):
   # Register Addresses
   REG_CALIB  = 0xAA
+
+  # Read calibration data from EEPROM
+  cal = getBus().read_i2c_block_data(addr, REG_CALIB, 22)
+
+  # Convert byte data to word values
+  # (AC1, AC2, AC3, AC4, AC5, AC6, B1, B2, MB, MC, MD)
+  return (getShort(cal, 0), getShort(cal, 2), getShort(cal, 4),
+          getUshort(cal, 6), getUshort(cal, 8), getUshort(cal, 10),
+          getShort(cal, 12), getShort(cal, 14), getShort(cal, 16),
+          getShort(cal, 18), getShort(cal, 20))
+
+def readBmp180All(addr=DEVICE, calibration=None):
+  # Register Addresses
   REG_MEAS   = 0xF4
   REG_MSB    = 0xF6
   REG_LSB    = 0xF7
@@ -50,22 +72,13 @@ def readBmp180All(addr=DEVICE):
   # Oversample setting
   OVERSAMPLE = 3    # 0 - 3
   
-  # Read calibration data
-  # Read calibration data from EEPROM
-  cal = bus.read_i2c_block_data(addr, REG_CALIB, 22)
+  # Read calibration data (calibration is constant, callers should read it once and pass it in)
+  if calibration is None:
+    calibration = readBmp180Calibration(addr)
 
-  # Convert byte data to word values
-  AC1 = getShort(cal, 0)
-  AC2 = getShort(cal, 2)
-  AC3 = getShort(cal, 4)
-  AC4 = getUshort(cal, 6)
-  AC5 = getUshort(cal, 8)
-  AC6 = getUshort(cal, 10)
-  B1  = getShort(cal, 12)
-  B2  = getShort(cal, 14)
-  MB  = getShort(cal, 16)
-  MC  = getShort(cal, 18)
-  MD  = getShort(cal, 20)
+  (AC1, AC2, AC3, AC4, AC5, AC6, B1, B2, MB, MC, MD) = calibration
+
+  bus = getBus()
 
   # Read temperature
   bus.write_byte_data(addr, REG_MEAS, CRV_TEMP)
@@ -0,0 +1,200 @@
+"""baro_altitude: Barometric altitude service that samples a pressure sensor in a background thread."""
+
+from collections import deque
+import logging
+import random
+from threading import Event, Thread
+import time
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+class Bmp180Sensor(object):
+    """
+    BMP180 pressure sensor on I2C bus. Calibration data is read once when the sensor is opened.
+    """
+
+    def __init__(self, address=None):
+        # import sensor driver only if sensor is used (requires smbus)
+        import utils.BMP180 as BMP180
+        self._bmp180 = BMP180
+
+        # store arguments in object variables
+        self._address = address if address is not None else BMP180.DEVICE
+
+        # read calibration data from EEPROM
+        self._calibration = BMP180.readBmp180Calibration(self._address)
+
+    def read_altitude(self):
+        """
+        :return: Pressure altitude in meters (blocks for temperature and pressure conversion)
+        """
+
+        temperature, pressure, altitude = self._bmp180.readBmp180All(self._address, self._calibration)
+
+        return altitude
+
+
+class FakeBaroSensor(object):
+    """
+    Sensor replacement that returns a configurable altitude with optional Gaussian noise and outliers.
+    """
+
+    def __init__(self, altitude=500.0, noise=0.0, outlier_probability=0.0, outlier_offset=300.0, read_duration=0.0, seed=None):
+        # store arguments in object variables
+        self._altitude = altitude
+        self._noise = noise
+        self._outlier_probability = outlier_probability
+        self._outlier_offset = outlier_offset
+        self._read_duration = read_duration
+
+        # initialize random number generator
+        self._random = random.Random(seed)
+
+    def set_altitude(self, altitude):
+        self._altitude = altitude
+
+    def read_altitude(self):
+        """
+        :return: Pressure altitude in meters
+        """
+
+        # emulate conversion time of real sensor
+        if self._read_duration > 0.0:
+            time.sleep(self._read_duration)
+
+        altitude = self._altitude + self._random.gauss(0.0, self._noise) if self._noise > 0.0 else self._altitude
+
+        if self._random.random() < self._outlier_probability:
+            altitude += self._outlier_offset
+
+        return altitude
+
+
+def create_baro_sensor(sensor_type):
+    """
+    :param sensor_type: 'bmp180', 'fake', or 'none'
+    :return: Sensor object, or None for sensor type 'none'
+    """
+
+    if sensor_type == 'bmp180':
+        return Bmp180Sensor()
+    elif sensor_type == 'fake':
+        return FakeBaroSensor()
+    elif sensor_type == 'none':
+        return None
+
+    raise ValueError('Unknown barometric sensor type {}'.format(sensor_type))
+
+
+class BaroAltitudeFilter(object):
+    """
+    Median filter over the last samples (removes single outliers) followed by an exponential moving average.
+    """
+
+    def __init__(self, window=5, alpha=0.3):
+        # store arguments in object variables
+        self._alpha = alpha
+
+        # initialize state
+        self._samples = deque(maxlen=window)
+        self._value = None
+
+    def update(self, sample):
+        """
+        :param sample: Raw altitude sample
+        :return: Filtered altitude
+        """
+
+        self._samples.append(sample)
+
+        median = sorted(self._samples)[len(self._samples) // 2]
+
+        if self._value is None:
+            self._value = median
+        else:
+            self._value += self._alpha * (median - self._value)
+
+        return self._value
+
+
+class BaroAltitudeProvider(object):
+    """
+    Samples a barometric sensor in a daemon thread with a fixed rate and publishes the filtered altitude together with
+    the monotonic timestamp of the sample. Readers never block on the sensor.
+    """
+
+    def __init__(self, sensor, sample_rate=2.0, window=5, alpha=0.3, max_age=5.0):
+        # configure logging
+        self._logger = logging.getLogger('BaroAltitudeProvider')
+
+        # store arguments in object variables
+        self._sensor = sensor
+        self._interval = 1.0 / sample_rate
+        self._max_age = max_age
+
+        # initialize filter
+        self._filter = BaroAltitudeFilter(window=window, alpha=alpha)
+
+        # latest (altitude, timestamp) tuple (replaced as a whole, hence no lock is required)
+        self._latest = (None, None)
+
+        # initialize sampling thread (daemon thread does not block process termination)
+        self._stop_event = Event()
+        self._thread = Thread(target=self._run, name='BaroAltitudeProvider')
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def sample(self):
+        """
+        Takes one sample and publishes the filtered altitude.
+        """
+
+        try:
+            altitude = self._sensor.read_altitude()
+        except Exception as e:
+            self._logger.warn('Cannot read barometric sensor ({})'.format(e))
+            return
+
+        self._latest = (self._filter.update(altitude), time.monotonic())
+
+    def _run(self):
+        next_sample = time.monotonic()
+
+        while not self._stop_event.is_set():
+            self.sample()
+
+            # keep constant rate, skip samples if sensor is slower than rate
+            next_sample += self._interval
+            now = time.monotonic()
+            if next_sample < now:
+                next_sample = now
+
+            self._stop_event.wait(next_sample - now)
+
+    def get(self):
+        """
+        :return: Tuple of latest filtered altitude in meters and its monotonic timestamp, (None, None) before first sample
+        """
+
+        return self._latest
+
+    def get_altitude(self):
+        """
+        :return: Latest filtered altitude in meters, or None if no sample is available or latest sample is too old
+        """
+
+        altitude, timestamp = self._latest
+
+        if timestamp is None or time.monotonic() - timestamp > self._max_age:
+            return None
+
+        return altitude
@@ -1,11 +1,10 @@
 """calculation: Collection of helper functions for calculating certain parameters."""
 
 import math
-import smbus
-from time import sleep
-import utils.BMP180 as BMP180
 
 def altimeter():
+    # blocking I2C read (calibration and conversion), use utils.baro_altitude.BaroAltitudeProvider in processing loops
+    import utils.BMP180 as BMP180
     temperature,pressure,altitude = BMP180.readBmp180All()
     return altitude
 
@@ -131,6 +130,53 @@ def lon_abs_from_rel_flarm_coordinate(abs_location_coordinate, rel_flarm_coordin
     return abs_from_rel_flarm_coordinate(abs_location_coordinate, rel_flarm_coordinate, 20)
 
 
+def lat_rel_from_abs_flarm_coordinate(abs_flarm_coordinate):
+    """
+    :param abs_flarm_coordinate: See function rel_from_abs_flarm_coordinate
+    :return: See function rel_from_abs_flarm_coordinate
+    """
+    return rel_from_abs_flarm_coordinate(abs_flarm_coordinate, 19)
+
+
+def lon_rel_from_abs_flarm_coordinate(abs_flarm_coordinate):
+    """
+    :param abs_flarm_coordinate: See function rel_from_abs_flarm_coordinate
+    :return: See function rel_from_abs_flarm_coordinate
+    """
+    return rel_from_abs_flarm_coordinate(abs_flarm_coordinate, 20)
+
+
+def rel_from_abs_flarm_coordinate(abs_flarm_coordinate, data_bit_width):
+    """
+    :param abs_flarm_coordinate: Absolute coordinate of FLARM position in degrees
+    :param data_bit_width: Bit width of FLARM position data (should be 19 for latitude and 20 for longitude)
+    :return: Relative coordinate in degrees as returned by ogn-decode if receiver location has been configured to 0
+    (inverse of function abs_from_rel_flarm_coordinate)
+    """
+
+    # set FLARM constants
+    INT_CONVERSION_FACTOR = 1e7
+    LSB_TRUNCATION_BIT_WIDTH = 7
+
+    # convert degrees to truncated integer representation (only data_bit_width bits are transmitted)
+    abs_flarm_coordinate_int_truncated = int(abs_flarm_coordinate * INT_CONVERSION_FACTOR / (2 ** LSB_TRUNCATION_BIT_WIDTH))
+    rel_flarm_coordinate_int_truncated = abs_flarm_coordinate_int_truncated & ((2 ** data_bit_width) - 1)
+
+    # interpret transmitted bits as two's complement (relative to location 0)
+    if rel_flarm_coordinate_int_truncated >= (2 ** (data_bit_width - 1)):
+        rel_flarm_coordinate_int_truncated -= (2 ** data_bit_width)
+
+    # add truncated LSBs again (center of truncated range, rounded towards zero when converted back)
+    rel_flarm_coordinate_int = rel_flarm_coordinate_int_truncated * (2 ** LSB_TRUNCATION_BIT_WIDTH)
+    if rel_flarm_coordinate_int < 0:
+        rel_flarm_coordinate_int -= (2 ** (LSB_TRUNCATION_BIT_WIDTH - 1))
+    else:
+        rel_flarm_coordinate_int += (2 ** (LSB_TRUNCATION_BIT_WIDTH - 1))
+
+    # convert back to degrees
+    return rel_flarm_coordinate_int / INT_CONVERSION_FACTOR
+
+
 def abs_from_rel_flarm_coordinate(abs_location_coordinate, rel_flarm_coordinate, data_bit_width):
     """
     :param abs_location_coordinate: Absolute coordinate of FLARM receivers's location in degrees
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+"""fake_gnss_device: Pseudo terminal that behaves like a serial GNSS receiver, e.g., for running the serial GNSS input
+without hardware. Sentences of an NMEA log are replayed epoch by epoch (an epoch starts with the first sentence type
+of the log, e.g., RMC) at a given rate.
+
+Run from repository root: python3 -m utils.fake_gnss_device [log] (prints name of pseudo terminal)"""
+
+import argparse
+import fcntl
+import logging
+import os
+import threading
+import time
+import tty
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'data', 'gnss_nmea.txt')
+
+
+def load_epochs(file_name):
+    """
+    :param file_name: NMEA log (one sentence per line)
+    :return: List of epochs, each epoch is a bytes object of its sentences (terminated by CR LF)
+    """
+
+    with open(file_name, 'rb') as log_file:
+        sentences = [line.strip() for line in log_file if line.strip()]
+
+    epochs = []
+    if not sentences:
+        return epochs
+
+    # an epoch starts with the sentence type of the first sentence (without talker identifier)
+    epoch_start = sentences[0][3:6]
+    epoch = []
+    for sentence in sentences:
+        if sentence[3:6] == epoch_start and epoch:
+            epochs.append(b''.join(epoch))
+            epoch = []
+        epoch.append(sentence + b'\r\n')
+    epochs.append(b''.join(epoch))
+
+    return epochs
+
+
+class FakeGnssDevice(object):
+    """
+    Pseudo terminal (pty) that is opened like a serial port (see get_port). Epochs are written in a background thread
+    every interval seconds, additional data (e.g., partial or corrupted sentences) can be injected with write().
+    """
+
+    def __init__(self, epochs, interval=0.1, repeat=True):
+        # configure logging
+        self._logger = logging.getLogger('FakeGnssDevice')
+
+        # store arguments in object variables
+        self._epochs = epochs
+        self._interval = interval
+        self._repeat = repeat
+
+        # open pseudo terminal without echo and line processing (slave side is kept open, so that the device does not
+        # vanish while the reader reconnects)
+        self._master_fd, self._slave_fd = os.openpty()
+        tty.setraw(self._slave_fd)
+        self._port = os.ttyname(self._slave_fd)
+
+        # drop data instead of blocking if nobody reads (like a serial line)
+        flags = fcntl.fcntl(self._master_fd, fcntl.F_GETFL)
+        fcntl.fcntl(self._master_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+        # initialize counters
+        self._epoch_count = 0
+        self._byte_count = 0
+        self._dropped_count = 0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def get_port(self):
+        return self._port
+
+    def write(self, data):
+        """
+        :param data: Bytes written to device as is (remainder is dropped if buffer of pseudo terminal is full)
+        :return: Number of written bytes
+        """
+
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self._master_fd, view)
+            except BlockingIOError:
+                self._dropped_count += len(view)
+                break
+
+            view = view[written:]
+            self._byte_count += written
+
+        return len(data) - len(view)
+
+    def _run(self):
+        next_time = time.monotonic()
+
+        while not self._stop_event.is_set():
+            for epoch in self._epochs:
+                # keep rate independent of write duration
+                delay = next_time - time.monotonic()
+                if delay > 0 and self._stop_event.wait(delay):
+                    return
+                next_time += self._interval
+
+                try:
+                    self.write(epoch)
+                except OSError as e:
+                    self._logger.warn('Could not write to pseudo terminal ({})'.format(e))
+                    return
+
+                self._epoch_count += 1
+
+            if not self._repeat:
+                return
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='FakeGnssDevice')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
+
+    def get_epoch_count(self):
+        return self._epoch_count
+
+    def get_byte_count(self):
+        return self._byte_count
+
+    def get_dropped_count(self):
+        return self._dropped_count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Fake serial GNSS receiver (pseudo terminal) replaying an NMEA log.')
+    arg_parser.add_argument('log', nargs='?', default=DEFAULT_LOG, help='NMEA log')
+    arg_parser.add_argument('--rate', dest='rate', type=float, default=10.0, help='epochs per second')
+    args = arg_parser.parse_args()
+
+    fake_gnss_device = FakeGnssDevice(load_epochs(args.log), interval=1.0 / args.rate)
+    fake_gnss_device.start()
+
+    print(fake_gnss_device.get_port())
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake_gnss_device.close()
+
+
+if __name__ == "__main__":
+    main()
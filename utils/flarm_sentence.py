@@ -0,0 +1,72 @@
+"""flarm_sentence: Encoder of FLARM sentences (PFLAA, PFLAU) into bytes that are ready to be sent to clients.
+
+Output is identical to pynmea2.ProprietarySentence('F', ['LAA', ...]).render(newline=True) encoded as ASCII, i.e.,
+fields are joined with commas, followed by the XOR checksum of all characters between '$' and '*' and CR LF."""
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+# checksum suffixes ('*XX' plus line terminator) of all possible checksums
+CHECKSUM_SUFFIXES = [('*%02X\r\n' % checksum).encode('ascii') for checksum in range(256)]
+
+
+def checksum(data, initial=0):
+    """
+    :param data: Bytes to calculate checksum for (without '$' and '*')
+    :param initial: Checksum of preceding data
+    :return: XOR of all bytes
+    """
+
+    result = initial
+    for byte in data:
+        result ^= byte
+
+    return result
+
+
+class SentenceEncoder(object):
+    """
+    Encoder of one proprietary sentence type. Prefix and its checksum are calculated once.
+    """
+
+    __slots__ = ('_prefix', '_prefix_checksum')
+
+    def __init__(self, identifier):
+        """
+        :param identifier: Sentence identifier without '$', e.g., 'PFLAA'
+        """
+
+        self._prefix = ('$' + identifier + ',').encode('ascii')
+        self._prefix_checksum = checksum(self._prefix[1:])
+
+    def encode(self, fields):
+        """
+        :param fields: Sequence of fields (str)
+        :return: Sentence as bytes including checksum and CR LF
+        """
+
+        body = ','.join(fields).encode('ascii')
+
+        return self._prefix + body + CHECKSUM_SUFFIXES[checksum(body, self._prefix_checksum)]
+
+
+PFLAA_ENCODER = SentenceEncoder('PFLAA')
+PFLAU_ENCODER = SentenceEncoder('PFLAU')
+
+
+def encode_pflaa(alarm_level, relative_north, relative_east, relative_vertical, identifier_type, identifier, track, turn_rate, ground_speed, climb_rate, acft_type):
+    """
+    :return: PFLAA sentence (data on other aircraft) as bytes
+    """
+
+    return PFLAA_ENCODER.encode((alarm_level, relative_north, relative_east, relative_vertical, identifier_type, identifier, track, turn_rate, ground_speed, climb_rate, acft_type))
+
+
+def encode_pflau(rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_distance, identifier):
+    """
+    :return: PFLAU sentence (operating status and priority intruder) as bytes
+    """
+
+    return PFLAU_ENCODER.encode((rx, tx, gps, power, alarm_level, relative_bearing, alarm_type, relative_vertical, relative_distance, identifier))
@@ -0,0 +1,183 @@
+"""latency: Latency histograms of pipeline stages, e.g., time from reception of a message by an input module until it is
+handled by the transformation.
+
+Latencies are differences of monotonic times (time.monotonic() is system-wide on Linux, i.e., timestamps of data hub
+items can be compared across processes). Each process records the histograms of its stages with a LatencyProbe, which
+writes them as JSON file into a common directory, where they are collected by read_latency_files()."""
+
+import bisect
+import json
+import os
+import time
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+# upper bounds of histogram buckets in seconds (10 per decade from 10 us to 100 s, last bucket is unbounded)
+BUCKET_BOUNDS = tuple(round(10.0 ** (exponent / 10.0), 12) for exponent in range(-50, 21))
+
+# percentiles that are reported by LatencyHistogram.to_dict()
+PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('p999', 0.999))
+
+LATENCY_FILE_SUFFIX = '.latency.json'
+
+
+class LatencyHistogram(object):
+    """
+    Histogram of latencies in logarithmic buckets (precision of about 25%), plus count, sum and maximum.
+    """
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, latency):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, latency)] += 1
+        self.count += 1
+        self.sum += latency
+        if latency > self.max:
+            self.max = latency
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def subtract(self, other):
+        """
+        :param other: Earlier state of this histogram
+        :return: New histogram of latencies recorded since other (maximum is the one of this histogram)
+        """
+
+        difference = LatencyHistogram()
+        difference.counts = [count - other_count for count, other_count in zip(self.counts, other.counts)]
+        difference.count = self.count - other.count
+        difference.sum = self.sum - other.sum
+        difference.max = self.max
+
+        return difference
+
+    def percentile(self, fraction):
+        """
+        :param fraction: Fraction of recorded latencies, e.g., 0.99
+        :return: Upper bound of bucket that contains the given fraction of latencies (maximum for last bucket), None if
+        histogram is empty
+        """
+
+        if self.count == 0:
+            return None
+
+        rank = fraction * self.count
+        cumulative_count = 0
+        for index, count in enumerate(self.counts):
+            cumulative_count += count
+            if count and cumulative_count >= rank:
+                if index < len(BUCKET_BOUNDS):
+                    return min(BUCKET_BOUNDS[index], self.max)
+                break
+
+        return self.max
+
+    def to_dict(self):
+        result = {'count': self.count, 'sum': self.sum, 'max': self.max, 'mean': self.sum / self.count if self.count else None}
+        for name, fraction in PERCENTILES:
+            result[name] = self.percentile(fraction)
+
+        # only non-empty buckets as pairs of upper bound (None: unbounded) and count
+        result['buckets'] = [[BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else None, count] for index, count in enumerate(self.counts) if count]
+
+        return result
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        for bound, count in data['buckets']:
+            index = len(BUCKET_BOUNDS) if bound is None else bisect.bisect_left(BUCKET_BOUNDS, bound)
+            histogram.counts[index] += count
+        histogram.count = data['count']
+        histogram.sum = data['sum']
+        histogram.max = data['max']
+
+        return histogram
+
+
+class LatencyProbe(object):
+    """
+    Latency histograms of the stages of one process. Histograms are cumulative and written to
+    <directory>/<name>.latency.json at most every interval seconds (checked in record_items()) and on close().
+    """
+
+    def __init__(self, directory, name, interval=1.0):
+        # store arguments in object variables
+        self._path = os.path.join(directory, name + LATENCY_FILE_SUFFIX)
+        self._name = name
+        self._interval = interval
+
+        # initialize histograms (stage -> LatencyHistogram)
+        self._histograms = {}
+        self._next_write_time = time.monotonic() + interval
+
+    def record(self, stage, latency):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms[stage] = LatencyHistogram()
+
+        histogram.record(latency)
+
+    def record_items(self, stage, data_hub_items, now=None):
+        """
+        Records the age of all data hub items (time since generation) at time now (monotonic time).
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms[stage] = LatencyHistogram()
+
+        for data_hub_item in data_hub_items:
+            histogram.record(now - data_hub_item.get_timestamp())
+
+        if now >= self._next_write_time:
+            self.write()
+            self._next_write_time = now + self._interval
+
+    def write(self):
+        data = {'name': self._name, 'pid': os.getpid(), 'time': time.monotonic(), 'stages': dict([(stage, histogram.to_dict()) for stage, histogram in self._histograms.items()])}
+
+        # replace file atomically (readers never see partial files)
+        temporary_path = self._path + '.tmp'
+        with open(temporary_path, 'w') as latency_file:
+            json.dump(data, latency_file, sort_keys=True)
+        os.replace(temporary_path, self._path)
+
+    def close(self):
+        self.write()
+
+
+def read_latency_files(directory):
+    """
+    :param directory: Directory of latency files of all processes
+    :return: Dictionary of process name to dictionary of stage to LatencyHistogram
+    """
+
+    result = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(LATENCY_FILE_SUFFIX):
+            continue
+
+        with open(os.path.join(directory, file_name)) as latency_file:
+            data = json.load(latency_file)
+
+        result[data['name']] = dict([(stage, LatencyHistogram.from_dict(histogram)) for stage, histogram in data['stages'].items()])
+
+    return result
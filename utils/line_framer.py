@@ -0,0 +1,199 @@
+"""line_framer: Splitting of byte streams (e.g., TCP or serial data) into lines, keeping partial lines between chunks."""
+
+import logging
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+class LineFramer(object):
+    """
+    Splits chunks of a byte stream into lines that are terminated by LF (a preceding CR is removed). The complete
+    lines of a chunk are split with one bytes.split() call (per line interpreter overhead dominates on CPython, hence
+    this is faster than scanning them one by one); only the trailing partial line of a chunk is kept in a bytearray
+    until the rest of the line is received. Lines are selected on the raw bytes (see _select), only desired lines are
+    decoded.
+
+    Lines longer than max_line_length are discarded.
+    """
+
+    def __init__(self, max_line_length=4096, name='LineFramer'):
+        # configure logging
+        self._logger = logging.getLogger(name)
+
+        # store arguments in object variables
+        self._max_line_length = max_line_length
+
+        # initialize partial line buffer
+        self._partial_line = bytearray()
+        self._skipping = False
+
+        # initialize counters
+        self._line_count = 0
+        self._filtered_count = 0
+        self._discarded_count = 0
+
+    def _discard_partial_line(self):
+        self._logger.warn('Discarding line that exceeds {} bytes'.format(self._max_line_length))
+        self._partial_line = bytearray()
+        self._discarded_count += 1
+
+        # skip rest of line
+        self._skipping = True
+
+    def _take_partial_line(self, data):
+        """
+        :param data: Received chunk (bytes or bytearray)
+        :return: Tuple of line that has been completed by chunk (bytes without LF, or None) and position of remaining
+        data in chunk (None if chunk has been consumed completely)
+        """
+
+        start = 0
+
+        # skip rest of discarded line
+        if self._skipping:
+            newline = data.find(b'\n')
+            if newline < 0:
+                return None, None
+
+            self._skipping = False
+            start = newline + 1
+
+        if not self._partial_line:
+            return None, start
+
+        # complete partial line of previous chunk
+        newline = data.find(b'\n', start)
+        if newline < 0:
+            self._keep_partial_line(data, start)
+            return None, None
+
+        self._partial_line += memoryview(data)[start:newline]
+        line = bytes(self._partial_line)
+        self._partial_line = bytearray()
+
+        self._line_count += 1
+
+        return line, newline + 1
+
+    def _keep_partial_line(self, data, start):
+        if start < len(data):
+            self._partial_line += memoryview(data)[start:]
+            if len(self._partial_line) > self._max_line_length:
+                self._discard_partial_line()
+
+    def _select(self, lines):
+        """
+        :param lines: List of lines without LF (bytes, may end with CR)
+        :return: List of desired lines
+        """
+
+        return lines
+
+    def _filter(self, messages, lines):
+        selected_lines = self._select(lines)
+        self._filtered_count += len(lines) - len(selected_lines)
+
+        try:
+            messages.extend([line.decode('ascii').rstrip('\r') for line in selected_lines])
+        except UnicodeDecodeError:
+            # decode line by line to keep valid lines
+            for line in selected_lines:
+                try:
+                    messages.append(line.decode('ascii').rstrip('\r'))
+                except UnicodeDecodeError:
+                    self._logger.warn('Discarding line with invalid characters')
+                    self._discarded_count += 1
+
+    def feed(self, data):
+        """
+        :param data: Received chunk (bytes or bytearray)
+        :return: List of decoded lines of desired message types
+        """
+
+        messages = []
+
+        line, start = self._take_partial_line(data)
+        if line is not None:
+            self._filter(messages, [line])
+        if start is None:
+            return messages
+
+        # split all complete lines of chunk (last element is empty part after final line terminator)
+        end = data.rfind(b'\n', start) + 1
+        if end > start:
+            lines = data[start:end].split(b'\n')
+            del lines[-1]
+
+            self._line_count += len(lines)
+            self._filter(messages, lines)
+
+            start = end
+
+        # keep trailing partial line
+        self._keep_partial_line(data, start)
+
+        return messages
+
+    def get_line_count(self):
+        return self._line_count
+
+    def get_filtered_count(self):
+        return self._filtered_count
+
+    def get_discarded_count(self):
+        return self._discarded_count
+
+
+class Sbs1LineFramer(LineFramer):
+    """
+    Line framer for SBS1 (BaseStation) streams, e.g., port 30003 of dump1090. Message types (second field) are
+    checked on the raw bytes, only lines of the desired types are decoded.
+    """
+
+    def __init__(self, message_types=None, max_line_length=4096, name='Sbs1LineFramer'):
+        # call parent constructor
+        super().__init__(max_line_length=max_line_length, name=name)
+
+        # store prefixes of second field for desired message types (None: all types)
+        self._message_type_prefixes = None
+        if message_types is not None:
+            self._message_type_prefixes = tuple(message_type.encode('ascii') + b',' for message_type in message_types)
+
+    def _select(self, lines):
+        # check message type (second field)
+        message_type_prefixes = self._message_type_prefixes
+        if message_type_prefixes is None:
+            return [line for line in lines if b',' in line]
+
+        # lines without comma cannot match (search for prefix starts at beginning of line)
+        return [line for line in lines if line.startswith(message_type_prefixes, line.find(b',') + 1)]
+
+
+class NmeaLineFramer(LineFramer):
+    """
+    Line framer for NMEA streams, e.g., of a serial GNSS receiver. Sentence types are checked on the raw bytes, only
+    sentences of the desired types are decoded. Sentence types are given without talker identifier (e.g., 'GGA', any
+    talker) or with talker identifier (e.g., 'GPGSV').
+    """
+
+    def __init__(self, sentence_types=None, max_line_length=4096, name='NmeaLineFramer'):
+        # call parent constructor
+        super().__init__(max_line_length=max_line_length, name=name)
+
+        # store desired sentence types (None: all sentences)
+        self._sentence_types = None
+        self._addresses = None
+        if sentence_types is not None:
+            self._sentence_types = frozenset(sentence_type.encode('ascii') for sentence_type in sentence_types if len(sentence_type) == 3)
+            self._addresses = frozenset(sentence_type.encode('ascii') for sentence_type in sentence_types if len(sentence_type) != 3)
+
+    def _select(self, lines):
+        sentence_types = self._sentence_types
+        addresses = self._addresses
+        if sentence_types is None:
+            return [line for line in lines if line.startswith(b'$')]
+
+        # check sentence type with and without talker identifier
+        return [line for line in lines if line.startswith(b'$') and (line[3:6] in sentence_types or line[1:6] in addresses)]
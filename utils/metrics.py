@@ -0,0 +1,355 @@
+"""metrics: Runtime metrics of all FlightBox processes (counters, gauges and timers), exported in Prometheus text format.
+
+The MetricsRegistry is created by the main process and inherited by all module processes. Each series (metric name and
+labels, e.g., the process) is registered once by the process that updates it and gets its own values in shared memory,
+i.e., updates are plain writes without locks. Series of the same name and labels in several processes are summed up
+when collected. If metrics are disabled, modules get the NULL_METRICS registry, whose metrics do nothing."""
+
+import logging
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+import os
+import struct
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8: fall back to anonymous shared memory inherited by sub-processes
+    shared_memory = None
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+METRIC_COUNTER = 'counter'
+METRIC_GAUGE = 'gauge'
+METRIC_TIMER = 'summary'
+
+# all metrics with type and help text (names are fixed, labels distinguish processes, clients, etc.)
+METRICS = {
+    'flightbox_messages_in_total': (METRIC_COUNTER, 'Messages received by a module'),
+    'flightbox_messages_out_total': (METRIC_COUNTER, 'Messages handed over by a module (to data hub, subscribers or clients)'),
+    'flightbox_messages_dropped_total': (METRIC_COUNTER, 'Messages dropped for slow subscribers or clients'),
+    'flightbox_parse_errors_total': (METRIC_COUNTER, 'Messages that could not be parsed'),
+    'flightbox_queue_depth': (METRIC_GAUGE, 'Frames (items or batches) waiting in a data hub queue'),
+    'flightbox_queue_bytes': (METRIC_GAUGE, 'Bytes of the data hub ring buffer not yet read by a subscriber'),
+    'flightbox_tick_duration_seconds': (METRIC_TIMER, 'Duration of processing cycles'),
+    'flightbox_clients': (METRIC_GAUGE, 'Connected clients'),
+    'flightbox_client_sent_bytes_total': (METRIC_COUNTER, 'Bytes written to a client'),
+}
+METRIC_NAMES = tuple(sorted(METRICS))
+
+# shared memory layout: header, series descriptors, values (two per series, timers use both for count and sum)
+HEADER = struct.Struct('<Q')            # number of registered series
+DESCRIPTOR = struct.Struct('<H126s')    # metric code (index in METRIC_NAMES + 1), labels (UTF-8, zero padded)
+VALUE = struct.Struct('<d')
+VALUES_PER_SERIES = 2
+
+DEFAULT_MAX_SERIES = 1024
+
+
+def format_labels(labels):
+    """
+    :param labels: Dictionary of label names to values
+    :return: Labels in Prometheus text format without braces, sorted by name, e.g., 'client="10.0.0.2",process="Foo"'
+    """
+
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in sorted(labels.items()))
+
+
+def format_value(value):
+    if value == int(value):
+        return '{:d}'.format(int(value))
+
+    return repr(value)
+
+
+class Counter(object):
+    """
+    Monotonically increasing value of one series.
+    """
+
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, values, index):
+        self._values = values
+        self._index = index
+
+    def inc(self, amount=1):
+        self._values[self._index] += amount
+
+    def get(self):
+        return self._values[self._index]
+
+
+class Gauge(object):
+    """
+    Current value of one series, e.g., number of clients.
+    """
+
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, values, index):
+        self._values = values
+        self._index = index
+
+    def set(self, value):
+        self._values[self._index] = value
+
+    def inc(self, amount=1):
+        self._values[self._index] += amount
+
+    def dec(self, amount=1):
+        self._values[self._index] -= amount
+
+    def get(self):
+        return self._values[self._index]
+
+
+class Timer(object):
+    """
+    Count and sum of durations (seconds) of one series, exported as summary without quantiles.
+    """
+
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, values, index):
+        self._values = values
+        self._index = index
+
+    def observe(self, duration):
+        values = self._values
+        values[self._index] += 1
+        values[self._index + 1] += duration
+
+    def get(self):
+        return self._values[self._index], self._values[self._index + 1]
+
+
+class NullCounter(object):
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        pass
+
+    def get(self):
+        return 0
+
+
+class NullGauge(object):
+    __slots__ = ()
+
+    def set(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def get(self):
+        return 0
+
+
+class NullTimer(object):
+    __slots__ = ()
+
+    def observe(self, duration):
+        pass
+
+    def get(self):
+        return 0, 0.0
+
+
+NULL_COUNTER = NullCounter()
+NULL_GAUGE = NullGauge()
+NULL_TIMER = NullTimer()
+
+METRIC_CLASSES = {METRIC_COUNTER: (Counter, NULL_COUNTER), METRIC_GAUGE: (Gauge, NULL_GAUGE), METRIC_TIMER: (Timer, NULL_TIMER)}
+
+
+class MetricsRegistry(object):
+    """
+    Series of all processes in shared memory. Series are registered with counter(), gauge() or timer() in the process
+    that updates them (registering the same series again in that process returns the same object). If all max_series
+    series are in use, further series are not exported.
+    """
+
+    enabled = True
+
+    def __init__(self, max_series=DEFAULT_MAX_SERIES):
+        # configure logging
+        self._logger = logging.getLogger('MetricsRegistry')
+
+        # store arguments in object variables
+        self._max_series = max_series
+
+        # calculate layout
+        self._values_offset = HEADER.size + max_series * DESCRIPTOR.size
+
+        # allocate shared memory
+        total_size = self._values_offset + max_series * VALUES_PER_SERIES * VALUE.size
+        if shared_memory:
+            self._shared_memory = shared_memory.SharedMemory(create=True, size=total_size)
+            self._raw_array = None
+        else:
+            self._shared_memory = None
+            self._raw_array = RawArray('B', total_size)
+        self._map_buffer()
+
+        # lock protects registration of series (updates of values are not locked)
+        self._lock = multiprocessing.Lock()
+
+        # initialize series registered by this process ((name, labels) -> metric object)
+        self._series = {}
+        self._pid = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+
+        # memory views cannot be pickled (re-mapped in child process), series are registered per process
+        del state['_buffer']
+        del state['_values']
+        state['_series'] = {}
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._map_buffer()
+
+    def _map_buffer(self):
+        if self._shared_memory:
+            self._buffer = self._shared_memory.buf
+        else:
+            self._buffer = memoryview(self._raw_array).cast('B')
+
+        self._values = self._buffer[self._values_offset:].cast('d')
+
+    def _register(self, metric_type, name, labels):
+        if METRICS.get(name, (None,))[0] != metric_type:
+            raise ValueError('Unknown {} metric {}'.format(metric_type, name))
+
+        # series of parent process (inherited by fork) are updated by the parent only
+        if self._pid != os.getpid():
+            self._series = {}
+            self._pid = os.getpid()
+
+        label_string = format_labels(labels)
+        metric = self._series.get((name, label_string))
+        if metric is not None:
+            return metric
+
+        encoded_labels = label_string.encode('utf-8')
+        if len(encoded_labels) > DESCRIPTOR.size - 2:
+            raise ValueError('Labels of metric {} are too long: {}'.format(name, label_string))
+
+        metric_class, null_metric = METRIC_CLASSES[metric_type]
+
+        with self._lock:
+            series_count = HEADER.unpack_from(self._buffer, 0)[0]
+            if series_count >= self._max_series:
+                self._logger.warning('Maximum number of metric series reached, not exporting {}{{{}}}'.format(name, label_string))
+                return null_metric
+
+            # descriptor is complete before series is counted (collect() does not lock)
+            DESCRIPTOR.pack_into(self._buffer, HEADER.size + series_count * DESCRIPTOR.size, METRIC_NAMES.index(name) + 1, encoded_labels)
+            HEADER.pack_into(self._buffer, 0, series_count + 1)
+
+        metric = self._series[(name, label_string)] = metric_class(self._values, series_count * VALUES_PER_SERIES)
+
+        return metric
+
+    def counter(self, name, **labels):
+        return self._register(METRIC_COUNTER, name, labels)
+
+    def gauge(self, name, **labels):
+        return self._register(METRIC_GAUGE, name, labels)
+
+    def timer(self, name, **labels):
+        return self._register(METRIC_TIMER, name, labels)
+
+    def collect(self):
+        """
+        :return: Dictionary of metric name to dictionary of labels (see format_labels) to list of values (value, or
+        count and sum of timers), summed up over all processes
+        """
+
+        result = {}
+        series_count = HEADER.unpack_from(self._buffer, 0)[0]
+
+        for index in range(series_count):
+            code, encoded_labels = DESCRIPTOR.unpack_from(self._buffer, HEADER.size + index * DESCRIPTOR.size)
+            name = METRIC_NAMES[code - 1]
+            values = self._values[index * VALUES_PER_SERIES:(index + 1) * VALUES_PER_SERIES].tolist()
+
+            series = result.setdefault(name, {})
+            label_string = encoded_labels.rstrip(b'\0').decode('utf-8')
+            if label_string in series:
+                series[label_string] = [value + other_value for value, other_value in zip(series[label_string], values)]
+            else:
+                series[label_string] = values
+
+        return result
+
+    def close(self):
+        # release mapping in this process (metrics stay available for others)
+        self._series = {}
+        self._values.release()
+        self._buffer.release()
+
+        if self._shared_memory:
+            self._shared_memory.close()
+
+    def unlink(self):
+        # free shared memory (only called by the process that created the registry)
+        if self._shared_memory:
+            self._shared_memory.unlink()
+
+
+class NullMetricsRegistry(object):
+    """
+    Registry of disabled metrics: all series are null objects whose updates do nothing.
+    """
+
+    enabled = False
+
+    def counter(self, name, **labels):
+        return NULL_COUNTER
+
+    def gauge(self, name, **labels):
+        return NULL_GAUGE
+
+    def timer(self, name, **labels):
+        return NULL_TIMER
+
+    def collect(self):
+        return {}
+
+
+NULL_METRICS = NullMetricsRegistry()
+
+
+def render_metrics(metrics):
+    """
+    :param metrics: Collected metrics (see MetricsRegistry.collect)
+    :return: Metrics in Prometheus text exposition format (version 0.0.4)
+    """
+
+    lines = []
+    for name in sorted(metrics):
+        metric_type, help_text = METRICS[name]
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} {}'.format(name, metric_type))
+
+        for label_string, values in sorted(metrics[name].items()):
+            labels = '{' + label_string + '}' if label_string else ''
+            if metric_type == METRIC_TIMER:
+                lines.append('{}_count{} {}'.format(name, labels, format_value(values[0])))
+                lines.append('{}_sum{} {}'.format(name, labels, format_value(values[1])))
+            else:
+                lines.append('{}{} {}'.format(name, labels, format_value(values[0])))
+
+    return '\n'.join(lines) + '\n'
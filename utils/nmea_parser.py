@@ -0,0 +1,123 @@
+"""nmea_parser: Minimal parser for own-ship NMEA sentences (GGA, GLL, VTG, RMC) of any talker (GP, GN, GL, GA, ...).
+
+Sentences are only accepted with a valid checksum. Tuples only contain the fields that are used for the own position
+(first element is the sentence type, values are None if not available, e.g., without fix):
+    GGA: ('GGA', latitude, longitude, altitude_m)
+    GLL: ('GLL', latitude, longitude)
+    VTG: ('VTG', course, h_speed_kt)
+    RMC: ('RMC', latitude, longitude, course, h_speed_kt)"""
+
+import utils.conversion
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+SENTENCE_GGA = 'GGA'
+SENTENCE_GLL = 'GLL'
+SENTENCE_VTG = 'VTG'
+SENTENCE_RMC = 'RMC'
+
+# sentence types that are parsed (others are ignored)
+SENTENCE_TYPES = (SENTENCE_GGA, SENTENCE_GLL, SENTENCE_VTG, SENTENCE_RMC)
+
+
+def get_sentence_type(sentence):
+    """
+    :param sentence: NMEA sentence, e.g., '$GNGGA,...'
+    :return: Sentence type without talker identifier (e.g., 'GGA'), None if sentence has no standard address field
+    """
+
+    if len(sentence) < 7 or sentence[0] != '$' or sentence[6] != ',':
+        return None
+
+    return sentence[3:6]
+
+
+def verify_checksum(sentence):
+    """
+    :param sentence: NMEA sentence including checksum, e.g., '$GNVTG,,,,,,,,,N*2E'
+    :return: Sentence without '$' and checksum
+    :raises ValueError: If checksum is missing or does not match
+    """
+
+    star = sentence.rfind('*')
+    if star < 0 or len(sentence) < star + 3:
+        raise ValueError('Missing checksum')
+
+    body = sentence[1:star]
+
+    checksum = 0
+    for byte in body.encode('ascii'):
+        checksum ^= byte
+
+    if checksum != int(sentence[star + 1:star + 3], 16):
+        raise ValueError('Checksum mismatch')
+
+    return body
+
+
+def _coordinate(value, direction, negative_direction):
+    if not value:
+        return None
+
+    degrees = utils.conversion.nmea_coord_to_degrees(float(value))
+    if direction == negative_direction:
+        degrees = -degrees
+
+    return degrees
+
+
+def _number(value):
+    if not value:
+        return None
+
+    return float(value)
+
+
+def parse_nmea_sentence(sentence):
+    """
+    :param sentence: NMEA sentence, e.g., '$GNGGA,120003.70,4727.01211,N,00833.70872,E,1,12,0.79,435.2,M,47.3,M,,*4F'
+    :return: Tuple as described in module documentation, or None if sentence is not of interest
+    :raises ValueError: If checksum is invalid or a field cannot be converted
+    """
+
+    # check if sentence is of interest before validating checksum
+    sentence_type = get_sentence_type(sentence)
+    if sentence_type not in SENTENCE_TYPES:
+        return None
+
+    fields = verify_checksum(sentence).split(',')
+
+    if sentence_type == SENTENCE_GGA:
+        # position is only valid with fix (quality > 0)
+        if len(fields) < 11 or not fields[6] or fields[6] == '0':
+            return (SENTENCE_GGA, None, None, None)
+
+        altitude = None
+        if fields[10] == 'M':
+            altitude = _number(fields[9])
+
+        return (SENTENCE_GGA, _coordinate(fields[2], fields[3], 'S'), _coordinate(fields[4], fields[5], 'W'), altitude)
+
+    elif sentence_type == SENTENCE_GLL:
+        # status is only given by NMEA 2.3 and later
+        if len(fields) < 5 or (len(fields) > 6 and fields[6] != 'A'):
+            return (SENTENCE_GLL, None, None)
+
+        return (SENTENCE_GLL, _coordinate(fields[1], fields[2], 'S'), _coordinate(fields[3], fields[4], 'W'))
+
+    elif sentence_type == SENTENCE_VTG:
+        if len(fields) < 6:
+            return (SENTENCE_VTG, None, None)
+
+        return (SENTENCE_VTG, _number(fields[1]), _number(fields[5]))
+
+    elif sentence_type == SENTENCE_RMC:
+        if len(fields) < 9 or fields[2] != 'A':
+            return (SENTENCE_RMC, None, None, None, None)
+
+        return (SENTENCE_RMC, _coordinate(fields[3], fields[4], 'S'), _coordinate(fields[5], fields[6], 'W'), _number(fields[8]), _number(fields[7]))
+
+    return None
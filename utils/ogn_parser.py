@@ -0,0 +1,209 @@
+"""ogn_parser: Parser for OGN (APRS) beacons as generated by ogn-decode."""
+
+import re
+
+import utils.conversion
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+# beacon pattern: identifier, receiver, timestamp, position, track/speed, altitude
+BEACON_PATTERN = re.compile(r"^(.+?)>APRS,(.+?):/(\d{6})+h(\d{4}\.\d{2})(N|S)(.)(\d{5}\.\d{2})(E|W)(.)((\d{3})/(\d{3}))?/A=(\d{6})")
+
+# token patterns in order of precedence (name, pattern, characters a matching token can start with)
+DIGITS = '0123456789'
+TOKEN_PATTERNS = [
+    # FLARM data
+    ('address', re.compile(r"id(\S{2})(\S{6})"), 'i'),
+    ('climb_rate', re.compile(r"([\+\-]\d+)fpm"), '+-'),
+    ('turn_rate', re.compile(r"([\+\-]\d+\.\d+)rot"), '+-'),
+    ('signal_strength', re.compile(r"(\d+\.\d+)dB"), DIGITS),
+    ('error_count', re.compile(r"(\d+)e"), DIGITS),
+    ('coordinates_extension', re.compile(r"\!W(.)(.)!"), '!'),
+    ('hear_id', re.compile(r"hear(\w{4})"), 'h'),
+    ('frequency_offset', re.compile(r"([\+\-]\d+\.\d+)kHz"), '+-'),
+    ('gps_status', re.compile(r"gps(\d+x\d+)"), 'g'),
+    ('software_version', re.compile(r"s(\d+\.\d+)"), 's'),
+    ('hardware_version', re.compile(r"h(\d+)"), 'h'),
+    ('real_id', re.compile(r"r(\w{6})"), 'r'),
+    ('flightlevel', re.compile(r"FL(\d{3}\.\d{2})"), 'F'),
+    # receiver beacon data
+    ('ogn_decode_version', re.compile(r"v(\d\.\d\.\d\.\w+)"), 'v'),
+    ('load', re.compile(r"CPU:([\d\.]+)"), 'C'),
+    ('ram', re.compile(r"RAM:([\d\.]+)/([\d\.]+)(\w+)"), 'R'),
+    ('ntp', re.compile(r"NTP:([\d\.-]+)ms/([\d\.-]+)ppm"), 'N'),
+    ('temperature', re.compile(r"([\d\.+-]+)C"), DIGITS + '.+-'),
+    ('rf', re.compile(r"RF:([\w\d\.+-/]+)"), 'R'),
+]
+
+
+def _convert_address(m):
+    # Flarm ID type byte in APRS msg: PTTT TTII
+    # P => stealth mode
+    # TTTTT => aircraftType
+    # II => IdType: 0=Random, 1=ICAO, 2=FLARM, 3=OGN
+    # (see https://groups.google.com/forum/#!msg/openglidernetwork/lMzl5ZsaCVs/YirmlnkaJOYJ).
+    type_byte = int(m.group(1), 16)
+
+    return (type_byte & 0b00000011, (type_byte & 0b01111100) >> 2, (type_byte & 0b10000000) >> 7 == 1, m.group(2))
+
+
+def _convert_coordinates_extension(m):
+    # position precision enhancement is third decimal digit of minute
+    return (int(m.group(1)) / 1000.0 / 60.0, int(m.group(2)) / 1000.0 / 60.0)
+
+
+TOKEN_CONVERTERS = {
+    'address': _convert_address,
+    'climb_rate': lambda m: int(m.group(1)),
+    'turn_rate': lambda m: float(m.group(1)),
+    'signal_strength': lambda m: float(m.group(1)),
+    'error_count': lambda m: int(m.group(1)),
+    'coordinates_extension': _convert_coordinates_extension,
+    'hear_id': lambda m: m.group(1),
+    'frequency_offset': lambda m: float(m.group(1)),
+    'gps_status': lambda m: m.group(1),
+    'software_version': lambda m: float(m.group(1)),
+    'hardware_version': lambda m: int(m.group(1)),
+    'real_id': lambda m: m.group(1),
+    'flightlevel': lambda m: float(m.group(1)),
+    'ogn_decode_version': lambda m: m.group(1),
+    'load': lambda m: float(m.group(1)),
+    'ram': lambda m: (float(m.group(1)), float(m.group(2)), m.group(3)),
+    'ntp': lambda m: (float(m.group(1)), float(m.group(2))),
+    'temperature': lambda m: float(m.group(1)),
+    'rf': lambda m: m.group(1),
+}
+
+# dispatch table: first character of token -> candidate patterns in order of precedence (a pattern cannot match a token
+# that starts with another character, hence the result equals trying all patterns in order)
+PATTERNS_BY_FIRST_CHARACTER = {}
+for _name, _pattern, _first_characters in TOKEN_PATTERNS:
+    for _character in _first_characters:
+        PATTERNS_BY_FIRST_CHARACTER.setdefault(_character, []).append((_name, _pattern, TOKEN_CONVERTERS[_name]))
+
+# cache of parsed tokens (most tokens, like error count or GPS status, repeat frequently)
+TOKEN_CACHE_SIZE = 4096
+_token_cache = {}
+
+
+class OgnBeacon(object):
+    """
+    Parsed OGN beacon. Latitude and longitude are the relative FLARM coordinates in degrees as returned by ogn-decode
+    (including the position precision enhancement). Fields that are not part of the beacon are None.
+    """
+
+    __slots__ = ('identifier', 'receiver_name', 'timestamp', 'latitude', 'longitude', 'symbol_table', 'symbol_code',
+                 'track', 'h_speed', 'altitude', 'address_type', 'aircraft_type', 'stealth', 'address', 'climb_rate',
+                 'turn_rate', 'signal_strength', 'error_count', 'hear_ids', 'frequency_offset', 'gps_status',
+                 'software_version', 'hardware_version', 'real_id', 'flightlevel', 'receiver_status', 'unknown_tokens',
+                 'error')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+        self.hear_ids = []
+        self.receiver_status = {}
+        self.unknown_tokens = []
+
+
+def parse_token(token):
+    """
+    :param token: Space-separated part of beacon that follows the position
+    :return: Tuple of pattern name and converted value, pattern name is None for unknown tokens
+    :raises ValueError: If the value of a matching token cannot be converted
+    """
+
+    result = _token_cache.get(token)
+    if result is not None:
+        if result[0] == 'error':
+            raise ValueError(result[1])
+
+        return result
+
+    result = (None, None)
+    for name, pattern, converter in PATTERNS_BY_FIRST_CHARACTER.get(token[:1], ()):
+        m = pattern.match(token)
+        if m is not None:
+            try:
+                result = (name, converter(m))
+            except ValueError as e:
+                result = ('error', str(e))
+            break
+
+    if len(_token_cache) >= TOKEN_CACHE_SIZE:
+        _token_cache.clear()
+    _token_cache[token] = result
+
+    if result[0] == 'error':
+        raise ValueError(result[1])
+
+    return result
+
+
+def parse_ogn_beacon(data):
+    """
+    :param data: OGN beacon, e.g., 'FLRDD50E2>APRS,qAR:/121255h0036.43N\\00432.58W^000/000/A=001397 !W39! id22DD50E2 -039fpm'
+    :return: OgnBeacon object, or None if beacon part cannot be parsed. Tokens are evaluated in order until a token
+    value cannot be converted, which is indicated in the error field.
+    """
+
+    data_parts = data.split(' ')
+
+    m = BEACON_PATTERN.match(data_parts[0])
+    if m is None:
+        return None
+
+    beacon = OgnBeacon()
+    beacon.identifier = m.group(1)[-6:]
+    beacon.receiver_name = m.group(2)
+    beacon.timestamp = m.group(3)
+
+    latitude = utils.conversion.ogn_coord_to_degrees(float(m.group(4)))
+    if m.group(5) == "S":
+        latitude = -1.0 * latitude
+
+    beacon.symbol_table = m.group(6)
+
+    longitude = utils.conversion.ogn_coord_to_degrees(float(m.group(7)))
+    if m.group(8) == "W":
+        longitude = -1.0 * longitude
+
+    beacon.symbol_code = m.group(9)
+
+    beacon.track = 0
+    beacon.h_speed = 0
+    if m.group(10) is not None:
+        beacon.track = int(m.group(11))
+        beacon.h_speed = int(m.group(12))
+
+    beacon.altitude = int(m.group(13))
+
+    for token in data_parts[1:]:
+        try:
+            name, value = parse_token(token)
+        except ValueError as e:
+            beacon.error = str(e)
+            break
+
+        if name is None:
+            beacon.unknown_tokens.append(token)
+        elif name == 'address':
+            beacon.address_type, beacon.aircraft_type, beacon.stealth, beacon.address = value
+        elif name == 'coordinates_extension':
+            latitude += value[0]
+            longitude += value[1]
+        elif name == 'hear_id':
+            beacon.hear_ids.append(value)
+        elif name in ['ogn_decode_version', 'load', 'ram', 'ntp', 'temperature', 'rf']:
+            beacon.receiver_status[name] = value
+        else:
+            setattr(beacon, name, value)
+
+    beacon.latitude = latitude
+    beacon.longitude = longitude
+
+    return beacon
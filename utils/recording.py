@@ -0,0 +1,389 @@
+"""recording: Segment files of recorded data hub items.
+
+A segment starts with a header (magic, version, compression, wall clock and monotonic time at creation), followed by
+blocks. Each block has a header (stored size, raw size, number of records, minimum and maximum timestamp) and
+holds records as stored in the data hub ring buffer (length-prefixed DataHubItem.to_bytes()), compressed as a whole
+with gzip or zstd (optional). Blocks can therefore be decompressed independently.
+
+A sparse index file (segment name plus '.idx') holds the timestamp and file offset of one block at least every
+index_interval seconds, so that a reader can seek to any time without scanning the whole segment. The index can be
+rebuilt from the block headers (build_index)."""
+
+import bisect
+import gzip
+import logging
+import mmap
+import os
+import struct
+import time
+
+from data_hub.data_hub_item import HEADER as ITEM_HEADER
+from data_hub.data_hub_ring_buffer import RECORD_HEADER, decode_record, encode_record
+
+try:
+    import zstandard
+except ImportError:
+    # zstd compression is optional
+    zstandard = None
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+MAGIC = b'FBREC'
+VERSION = 1
+
+SEGMENT_HEADER = struct.Struct('<5sBBdd')   # magic, version, compression code, wall clock time, monotonic time
+BLOCK_HEADER = struct.Struct('<IIIdd')      # stored size, raw size, record count, minimum and maximum timestamp
+INDEX_ENTRY = struct.Struct('<dQ')          # minimum timestamp of block, file offset of block
+
+SEGMENT_SUFFIX = '.fbr'
+INDEX_SUFFIX = '.idx'
+
+COMPRESSION_CODES = {'none': 0, 'gzip': 1, 'zstd': 2}
+COMPRESSION_NAMES = dict([(code, compression) for compression, code in COMPRESSION_CODES.items()])
+
+
+def compress(data, compression):
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    elif compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+
+    return data
+
+
+def decompress(data, compression):
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    elif compression == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    return data
+
+
+def check_compression(compression):
+    """
+    :raises ValueError: If compression is unknown or not available
+    """
+
+    if compression not in COMPRESSION_CODES:
+        raise ValueError('Unknown compression {}'.format(compression))
+
+    if compression == 'zstd' and zstandard is None:
+        raise ValueError('zstd compression requires the zstandard package')
+
+
+def list_segments(directory):
+    """
+    :param directory: Recording directory
+    :return: Paths of all segments, ordered by creation
+    """
+
+    return sorted(os.path.join(directory, file_name) for file_name in os.listdir(directory) if file_name.endswith(SEGMENT_SUFFIX))
+
+
+class RecordingBlock(object):
+    """
+    Records collected for one block (built in the loop thread, written by RecordingWriter.write_block).
+    """
+
+    __slots__ = ('records', 'size', 'count', 'min_timestamp', 'max_timestamp')
+
+    def __init__(self):
+        self.records = []
+        self.size = 0
+        self.count = 0
+        self.min_timestamp = None
+        self.max_timestamp = None
+
+    def add(self, data_hub_item):
+        record = encode_record(data_hub_item)
+        self.records.append(record)
+        self.size += len(record)
+        self.count += 1
+
+        # items of different producers are not strictly ordered by timestamp
+        timestamp = data_hub_item.get_timestamp()
+        if self.min_timestamp is None:
+            self.min_timestamp = timestamp
+            self.max_timestamp = timestamp
+        elif timestamp < self.min_timestamp:
+            self.min_timestamp = timestamp
+        elif timestamp > self.max_timestamp:
+            self.max_timestamp = timestamp
+
+
+class RecordingWriter(object):
+    """
+    Writes blocks into segments in directory. A new segment is started when the current one covers segment_duration
+    seconds or exceeds segment_size bytes.
+
+    write_block() is blocking (compression and file I/O) and is meant to be called from one worker thread.
+    """
+
+    def __init__(self, directory, compression='none', segment_duration=3600.0, segment_size=64 * 1024 * 1024, index_interval=10.0, prefix='flightbox'):
+        self._logger = logging.getLogger('Recording.Writer')
+
+        check_compression(compression)
+
+        # store arguments in object variables
+        self._directory = directory
+        self._compression = compression
+        self._segment_duration = segment_duration
+        self._segment_size = segment_size
+        self._index_interval = index_interval
+        self._prefix = prefix
+
+        # initialize current segment
+        self._segment_file = None
+        self._index_file = None
+        self._segment_path = None
+        self._segment_number = 0
+        self._segment_start_timestamp = None
+        self._last_index_timestamp = None
+
+        # initialize counters
+        self._record_count = 0
+        self._raw_byte_count = 0
+        self._stored_byte_count = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self):
+        self._segment_number += 1
+        self._segment_path = os.path.join(self._directory, '{}-{}-{:04d}{}'.format(self._prefix, time.strftime('%Y%m%d-%H%M%S'), self._segment_number, SEGMENT_SUFFIX))
+
+        self._segment_file = open(self._segment_path, 'wb')
+        self._segment_file.write(SEGMENT_HEADER.pack(MAGIC, VERSION, COMPRESSION_CODES[self._compression], time.time(), time.monotonic()))
+
+        self._index_file = open(self._segment_path + INDEX_SUFFIX, 'wb')
+
+        self._segment_start_timestamp = None
+        self._last_index_timestamp = None
+
+        self._logger.info('Recording to {}'.format(self._segment_path))
+
+    def _close_segment(self):
+        if self._segment_file is None:
+            return
+
+        self._segment_file.close()
+        self._index_file.close()
+        self._segment_file = None
+        self._index_file = None
+
+    def write_block(self, block):
+        """
+        :param block: RecordingBlock
+        """
+
+        if block.count == 0:
+            return
+
+        # rotate segment
+        if self._segment_file is not None:
+            if self._segment_file.tell() >= self._segment_size or block.min_timestamp - self._segment_start_timestamp >= self._segment_duration:
+                self._close_segment()
+
+        if self._segment_file is None:
+            self._open_segment()
+
+        if self._segment_start_timestamp is None:
+            self._segment_start_timestamp = block.min_timestamp
+
+        raw_data = b''.join(block.records)
+        stored_data = compress(raw_data, self._compression)
+
+        offset = self._segment_file.tell()
+        self._segment_file.write(BLOCK_HEADER.pack(len(stored_data), len(raw_data), block.count, block.min_timestamp, block.max_timestamp))
+        self._segment_file.write(stored_data)
+        self._segment_file.flush()
+
+        # add index entry for first block of each index interval
+        if self._last_index_timestamp is None or block.min_timestamp - self._last_index_timestamp >= self._index_interval:
+            self._index_file.write(INDEX_ENTRY.pack(block.min_timestamp, offset))
+            self._index_file.flush()
+            self._last_index_timestamp = block.min_timestamp
+
+        self._record_count += block.count
+        self._raw_byte_count += len(raw_data)
+        self._stored_byte_count += BLOCK_HEADER.size + len(stored_data)
+
+    def close(self):
+        self._close_segment()
+
+    def get_segment_path(self):
+        return self._segment_path
+
+    def get_statistics(self):
+        return {'segments': self._segment_number, 'records': self._record_count, 'raw_bytes': self._raw_byte_count, 'stored_bytes': self._stored_byte_count}
+
+
+def build_index(segment_path, index_interval=10.0):
+    """
+    Rebuilds the index of a segment from its block headers (e.g., if the index file is missing).
+
+    :return: List of tuples of timestamp and file offset
+    """
+
+    index = []
+    last_index_timestamp = None
+
+    with RecordingReader(segment_path, use_index=False) as reader:
+        for offset, block_header in reader.iter_block_headers():
+            min_timestamp = block_header[3]
+            if last_index_timestamp is None or min_timestamp - last_index_timestamp >= index_interval:
+                index.append((min_timestamp, offset))
+                last_index_timestamp = min_timestamp
+
+    with open(segment_path + INDEX_SUFFIX, 'wb') as index_file:
+        for timestamp, offset in index:
+            index_file.write(INDEX_ENTRY.pack(timestamp, offset))
+
+    return index
+
+
+class RecordingReader(object):
+    """
+    Reads a segment via mmap. Incomplete blocks at the end (e.g., after a power loss) are ignored.
+    """
+
+    def __init__(self, segment_path, use_index=True):
+        # store arguments in object variables
+        self._segment_path = segment_path
+
+        self._file = open(segment_path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        if self._size < SEGMENT_HEADER.size:
+            self._file.close()
+            raise ValueError('Segment {} is too short'.format(segment_path))
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, compression_code, self._wall_time, self._monotonic_time = SEGMENT_HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError('{} is not a FlightBox recording'.format(segment_path))
+
+        self._compression = COMPRESSION_NAMES[compression_code]
+        check_compression(self._compression)
+
+        # load index (timestamps and offsets in separate lists for bisect)
+        self._index_timestamps = []
+        self._index_offsets = []
+        index_path = segment_path + INDEX_SUFFIX
+        if use_index and os.path.exists(index_path):
+            with open(index_path, 'rb') as index_file:
+                index_data = index_file.read()
+
+            for position in range(0, len(index_data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size):
+                timestamp, offset = INDEX_ENTRY.unpack_from(index_data, position)
+                self._index_timestamps.append(timestamp)
+                self._index_offsets.append(offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def get_compression(self):
+        return self._compression
+
+    def to_wall_time(self, timestamp):
+        """
+        :param timestamp: Monotonic timestamp of a recorded item
+        :return: Wall clock time (seconds since epoch) of timestamp
+        """
+
+        return self._wall_time + (timestamp - self._monotonic_time)
+
+    def iter_block_headers(self, offset=SEGMENT_HEADER.size):
+        """
+        :return: Iterator of tuples of file offset and block header (stored size, raw size, record count, minimum and
+        maximum timestamp) of all complete blocks from offset on
+        """
+
+        while offset + BLOCK_HEADER.size <= self._size:
+            block_header = BLOCK_HEADER.unpack_from(self._mmap, offset)
+            if offset + BLOCK_HEADER.size + block_header[0] > self._size:
+                # incomplete block
+                return
+
+            yield offset, block_header
+            offset += BLOCK_HEADER.size + block_header[0]
+
+    def find_offset(self, timestamp):
+        """
+        :param timestamp: Monotonic timestamp
+        :return: File offset of last indexed block that starts at or before timestamp
+        """
+
+        position = bisect.bisect_right(self._index_timestamps, timestamp) - 1
+        if position < 0:
+            return SEGMENT_HEADER.size
+
+        return self._index_offsets[position]
+
+    def iter_records(self, start=None, end=None):
+        """
+        :param start: Monotonic timestamp of first record (None: beginning of segment)
+        :param end: Monotonic timestamp after last record (None: end of segment)
+        :return: Iterator of tuples of timestamp and record (length-prefixed DataHubItem.to_bytes() as memoryview)
+        """
+
+        offset = SEGMENT_HEADER.size if start is None else self.find_offset(start)
+
+        for offset, block_header in self.iter_block_headers(offset):
+            stored_size, raw_size, count, min_timestamp, max_timestamp = block_header
+
+            # skip blocks without matching records without decompressing them
+            if start is not None and max_timestamp < start:
+                continue
+            if end is not None and min_timestamp >= end:
+                return
+
+            # copy block out of mapping (records must not keep the mapping open)
+            data_start = offset + BLOCK_HEADER.size
+            data = memoryview(decompress(self._mmap[data_start:data_start + stored_size], self._compression))
+
+            position = 0
+            while position < raw_size:
+                record_size = RECORD_HEADER.size + RECORD_HEADER.unpack_from(data, position)[0]
+                record = data[position:position + record_size]
+                position += record_size
+
+                timestamp = ITEM_HEADER.unpack_from(record, RECORD_HEADER.size)[2]
+                if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+                    continue
+
+                yield timestamp, record
+
+    def iter_items(self, start=None, end=None):
+        """
+        :return: Iterator of recorded DataHubItems (see iter_records)
+        """
+
+        for timestamp, record in self.iter_records(start, end):
+            yield decode_record(record)
+
+    def get_time_range(self):
+        """
+        :return: Tuple of minimum and maximum monotonic timestamp of all records (None if segment is empty)
+        """
+
+        min_timestamp = None
+        max_timestamp = None
+        for offset, block_header in self.iter_block_headers():
+            if min_timestamp is None or block_header[3] < min_timestamp:
+                min_timestamp = block_header[3]
+            if max_timestamp is None or block_header[4] > max_timestamp:
+                max_timestamp = block_header[4]
+
+        return min_timestamp, max_timestamp
@@ -0,0 +1,50 @@
+"""sbs1_parser: Parser for SBS1 (BaseStation) messages that converts them into compact tuples.
+
+Tuples only contain the fields that are populated for the respective message type (first element):
+    MSG,1: (1, icao_id, callsign)
+    MSG,2: (2, icao_id, latitude, longitude, altitude)
+    MSG,3: (3, icao_id, latitude, longitude, altitude)
+    MSG,4: (4, icao_id, h_speed, v_speed, course)
+    MSG,5: (5, icao_id, aircraft_type, signallevel, altitude)"""
+
+__author__ = "Thorsten Biermann"
+__copyright__ = "Copyright 2015, Thorsten Biermann"
+__email__ = "thorsten.biermann@gmail.com"
+
+
+MSG_IDENTIFICATION = 1
+MSG_SURFACE_POSITION = 2
+MSG_AIRBORNE_POSITION = 3
+MSG_VELOCITY = 4
+MSG_SURVEILLANCE = 5
+
+# message types that are parsed (others are ignored)
+MESSAGE_TYPES = ['1', '2', '3', '4', '5']
+
+
+def parse_sbs1_message(message):
+    """
+    :param message: SBS1 message, e.g., 'MSG,3,1,1,4B1805,1,2017/06/25,12:34:56.789,2017/06/25,12:34:56.789,,6525,,,47.45631,8.55513,,,0,0,0,0'
+    :return: Tuple as described in module documentation, or None if message is not of interest
+    :raises ValueError: If a field of the message type cannot be converted
+    """
+
+    fields = message.split(',')
+
+    # check if message is of interest
+    if len(fields) <= 16:
+        return None
+
+    msg_type = fields[1]
+    icao_id = fields[4]
+
+    if msg_type == '3' or msg_type == '2':
+        return (int(msg_type), icao_id, float(fields[14]), float(fields[15]), float(fields[11]))
+    elif msg_type == '4':
+        return (MSG_VELOCITY, icao_id, float(fields[12]), float(fields[16]), float(fields[13]))
+    elif msg_type == '1':
+        return (MSG_IDENTIFICATION, icao_id, fields[10].strip())
+    elif msg_type == '5':
+        return (MSG_SURVEILLANCE, icao_id, fields[2], float(fields[3]), float(fields[11]))
+
+    return None
@@ -0,0 +1,167 @@
+"""traffic_geometry: Relative positions of all aircraft with respect to own position, computed in one pass per tick.
+
+Positions are projected onto the local tangent plane of the own position with the Gauss mid-latitude formulas on the
+WGS84 ellipsoid: distances use the meridian and prime vertical radii of curvature at the mean latitude, and the mean
+azimuth is corrected by the convergence of meridians to obtain the initial bearing. Within the FLARM range of 45 km,
+distances deviate by less than 1e-4 (relative) from geopy's vincenty distance, and bearings by less than 0.01 deg from
+the ellipsoidal initial azimuth, or by less than 0.2 deg from the spherical initial bearing of
+utils.calculation.initial_bearing (see benchmarks/benchmark_traffic_geometry.py)."""
+
+from collections import namedtuple
+import math
+
+try:
+    import numpy
+except ImportError:
+    # pure-Python fallback
+    numpy = None
+
+__author__ = "Serge Guex"
+__copyright__ = "Copyright 2017"
+__email__ = ""
+
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+
+
+RelativePosition = namedtuple('RelativePosition', ['north', 'east', 'vertical', 'distance', 'bearing'])
+RelativePosition.__doc__ = """
+    Position of an aircraft relative to own position: north, east, vertical and distance in meters, initial bearing in
+    degrees (0 to 360). Vertical is None if target or reference altitude is unknown.
+    """
+
+
+def _relative_positions_python(own_latitude, own_longitude, latitudes, longitudes):
+    own_latitude_rad = math.radians(own_latitude)
+    own_longitude_rad = math.radians(own_longitude)
+
+    results = []
+    for latitude, longitude in zip(latitudes, longitudes):
+        latitude_rad = math.radians(latitude)
+
+        diff_latitude_rad = latitude_rad - own_latitude_rad
+        diff_longitude_rad = (math.radians(longitude) - own_longitude_rad + math.pi) % (2.0 * math.pi) - math.pi
+
+        # radii of curvature at mean latitude
+        mean_latitude_rad = 0.5 * (own_latitude_rad + latitude_rad)
+        sin_mean_latitude = math.sin(mean_latitude_rad)
+        w = 1.0 - WGS84_E2 * sin_mean_latitude * sin_mean_latitude
+        meridian_radius = WGS84_A * (1.0 - WGS84_E2) / (w * math.sqrt(w))
+        prime_vertical_radius = WGS84_A / math.sqrt(w)
+
+        # mean azimuth and distance on local plane
+        mean_north = diff_latitude_rad * meridian_radius
+        mean_east = diff_longitude_rad * prime_vertical_radius * math.cos(mean_latitude_rad)
+        distance = math.hypot(mean_north, mean_east)
+
+        # initial azimuth at own position (correct mean azimuth by half of meridian convergence)
+        bearing_rad = math.atan2(mean_east, mean_north) - 0.5 * diff_longitude_rad * sin_mean_latitude
+
+        results.append((distance * math.cos(bearing_rad), distance * math.sin(bearing_rad), distance, math.degrees(bearing_rad) % 360.0))
+
+    return results
+
+
+def _relative_positions_numpy(own_latitude, own_longitude, latitudes, longitudes):
+    own_latitude_rad = math.radians(own_latitude)
+    own_longitude_rad = math.radians(own_longitude)
+
+    latitude_rad = numpy.radians(numpy.asarray(latitudes, dtype=numpy.float64))
+
+    diff_latitude_rad = latitude_rad - own_latitude_rad
+    diff_longitude_rad = (numpy.radians(numpy.asarray(longitudes, dtype=numpy.float64)) - own_longitude_rad + math.pi) % (2.0 * math.pi) - math.pi
+
+    # radii of curvature at mean latitude
+    mean_latitude_rad = 0.5 * (own_latitude_rad + latitude_rad)
+    sin_mean_latitude = numpy.sin(mean_latitude_rad)
+    w = 1.0 - WGS84_E2 * sin_mean_latitude * sin_mean_latitude
+    meridian_radius = WGS84_A * (1.0 - WGS84_E2) / (w * numpy.sqrt(w))
+    prime_vertical_radius = WGS84_A / numpy.sqrt(w)
+
+    # mean azimuth and distance on local plane
+    mean_north = diff_latitude_rad * meridian_radius
+    mean_east = diff_longitude_rad * prime_vertical_radius * numpy.cos(mean_latitude_rad)
+    distance = numpy.hypot(mean_north, mean_east)
+
+    # initial azimuth at own position (correct mean azimuth by half of meridian convergence)
+    bearing_rad = numpy.arctan2(mean_east, mean_north) - 0.5 * diff_longitude_rad * sin_mean_latitude
+
+    north = distance * numpy.cos(bearing_rad)
+    east = distance * numpy.sin(bearing_rad)
+    bearing = numpy.degrees(bearing_rad) % 360.0
+
+    return zip(north.tolist(), east.tolist(), distance.tolist(), bearing.tolist())
+
+
+def relative_positions(own_latitude, own_longitude, latitudes, longitudes, use_numpy=True):
+    """
+    :param own_latitude: Own latitude in degrees
+    :param own_longitude: Own longitude in degrees
+    :param latitudes: Sequence of aircraft latitudes in degrees
+    :param longitudes: Sequence of aircraft longitudes in degrees
+    :param use_numpy: Use vectorised NumPy implementation if NumPy is available
+    :return: Iterable of (north, east, distance, bearing) tuples in order of aircraft
+    """
+
+    if use_numpy and numpy is not None:
+        return _relative_positions_numpy(own_latitude, own_longitude, latitudes, longitudes)
+
+    return _relative_positions_python(own_latitude, own_longitude, latitudes, longitudes)
+
+
+class TrafficGeometry(object):
+    """
+    Collects the positions of all aircraft of one processing cycle and computes their relative positions in one pass.
+    """
+
+    def __init__(self, use_numpy=True):
+        # store arguments in object variables
+        self._use_numpy = use_numpy
+
+        # initialize columns
+        self.clear()
+
+    def clear(self):
+        self._keys = []
+        self._latitudes = []
+        self._longitudes = []
+        self._verticals = []
+
+    def add(self, key, latitude, longitude, altitude=None, reference_altitude=None):
+        """
+        :param key: Identifier of aircraft
+        :param latitude: Latitude in degrees
+        :param longitude: Longitude in degrees
+        :param altitude: Altitude of aircraft in meters, or None if unknown
+        :param reference_altitude: Own altitude in meters the aircraft's altitude is compared with, or None if unknown
+        """
+
+        self._keys.append(key)
+        self._latitudes.append(latitude)
+        self._longitudes.append(longitude)
+
+        if altitude is None or reference_altitude is None:
+            self._verticals.append(None)
+        else:
+            self._verticals.append(altitude - reference_altitude)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def compute(self, own_latitude, own_longitude):
+        """
+        :param own_latitude: Own latitude in degrees
+        :param own_longitude: Own longitude in degrees
+        :return: Dict of aircraft identifier to RelativePosition
+        """
+
+        if not self._keys:
+            return {}
+
+        positions = relative_positions(own_latitude, own_longitude, self._latitudes, self._longitudes, use_numpy=self._use_numpy)
+
+        return {key: RelativePosition(north, east, vertical, distance, bearing)
+                for key, vertical, (north, east, distance, bearing) in zip(self._keys, self._verticals, positions)}